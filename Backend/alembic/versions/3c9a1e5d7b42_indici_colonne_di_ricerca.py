@@ -0,0 +1,43 @@
+"""indici sulle colonne di ricerca
+
+Revision ID: 3c9a1e5d7b42
+Revises: fbb0f4d38706
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9a1e5d7b42'
+down_revision: Union[str, None] = 'fbb0f4d38706'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fallisce se in inventory esistono codici duplicati: vanno sistemati prima
+    op.create_index(op.f('ix_inventory_code'), 'inventory', ['code'], unique=True)
+    op.create_index(op.f('ix_user_email'), 'user', ['email'], unique=False)
+    op.create_index(op.f('ix_billofmaterials_parentProductID'), 'billofmaterials', ['parentProductID'], unique=False)
+    op.create_index('ix_productionorder_productID_status_date', 'productionorder', ['productID', 'status', 'date'], unique=False)
+    op.create_index(op.f('ix_productionorder_status'), 'productionorder', ['status'], unique=False)
+    op.create_index(op.f('ix_productionorder_parentProductionOrderDetailsID'), 'productionorder', ['parentProductionOrderDetailsID'], unique=False)
+    op.create_index(op.f('ix_productionorderdetails_productionOrderID'), 'productionorderdetails', ['productionOrderID'], unique=False)
+    op.create_index(op.f('ix_productionorderdetails_productID'), 'productionorderdetails', ['productID'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_productionorderdetails_productID'), table_name='productionorderdetails')
+    op.drop_index(op.f('ix_productionorderdetails_productionOrderID'), table_name='productionorderdetails')
+    op.drop_index(op.f('ix_productionorder_parentProductionOrderDetailsID'), table_name='productionorder')
+    op.drop_index(op.f('ix_productionorder_status'), table_name='productionorder')
+    op.drop_index('ix_productionorder_productID_status_date', table_name='productionorder')
+    op.drop_index(op.f('ix_billofmaterials_parentProductID'), table_name='billofmaterials')
+    op.drop_index(op.f('ix_user_email'), table_name='user')
+    op.drop_index(op.f('ix_inventory_code'), table_name='inventory')
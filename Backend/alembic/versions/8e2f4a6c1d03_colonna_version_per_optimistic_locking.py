@@ -0,0 +1,32 @@
+"""colonna version per optimistic locking
+
+Revision ID: 8e2f4a6c1d03
+Revises: 3c9a1e5d7b42
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e2f4a6c1d03'
+down_revision: Union[str, None] = '3c9a1e5d7b42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('inventory', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('productionorder', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('productionorderdetails', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('productionorderdetails', 'version')
+    op.drop_column('productionorder', 'version')
+    op.drop_column('inventory', 'version')
@@ -0,0 +1,31 @@
+"""priorita e scadenza ordini
+
+Revision ID: a4c8e2f6b103
+Revises: e7b3f1a9c264
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c8e2f6b103'
+down_revision: Union[str, None] = 'e7b3f1a9c264'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('productionorder', sa.Column('priority', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('productionorder', sa.Column('dueDate', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('productionorder', 'dueDate')
+    op.drop_column('productionorder', 'priority')
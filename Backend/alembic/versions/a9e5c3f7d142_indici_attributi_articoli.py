@@ -0,0 +1,30 @@
+"""indici attributi articoli
+
+Revision ID: a9e5c3f7d142
+Revises: f3b9d1c5a728
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+import attributes
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9e5c3f7d142'
+down_revision: Union[str, None] = 'f3b9d1c5a728'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # datas non JSON diventa {"notes": ...}, poi un indice json_extract per attributo dichiarato
+    attributes.install(op.get_bind())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    attributes.uninstall(op.get_bind())
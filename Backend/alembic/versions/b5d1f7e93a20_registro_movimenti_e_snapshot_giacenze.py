@@ -0,0 +1,69 @@
+"""registro movimenti e snapshot giacenze
+
+Revision ID: b5d1f7e93a20
+Revises: 8e2f4a6c1d03
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d1f7e93a20'
+down_revision: Union[str, None] = '8e2f4a6c1d03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('inventorymovement',
+    sa.Column('ID', sa.Integer(), nullable=False),
+    sa.Column('timestamp', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('itemID', sa.Integer(), nullable=False),
+    sa.Column('kind', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('on_hand_delta', sa.Integer(), nullable=False),
+    sa.Column('locked_delta', sa.Integer(), nullable=False),
+    sa.Column('productionOrderID', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('ID')
+    )
+    op.create_index(op.f('ix_inventorymovement_timestamp'), 'inventorymovement', ['timestamp'], unique=False)
+    op.create_index(op.f('ix_inventorymovement_itemID'), 'inventorymovement', ['itemID'], unique=False)
+    op.create_table('stocksnapshot',
+    sa.Column('ID', sa.Integer(), nullable=False),
+    sa.Column('timestamp', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('lastMovementID', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('ID')
+    )
+    op.create_index(op.f('ix_stocksnapshot_timestamp'), 'stocksnapshot', ['timestamp'], unique=False)
+    op.create_table('stocksnapshotline',
+    sa.Column('ID', sa.Integer(), nullable=False),
+    sa.Column('snapshotID', sa.Integer(), nullable=False),
+    sa.Column('itemID', sa.Integer(), nullable=False),
+    sa.Column('quantity_on_hand', sa.Integer(), nullable=False),
+    sa.Column('quantity_locked', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('ID')
+    )
+    op.create_index('ix_stocksnapshotline_snapshotID_itemID', 'stocksnapshotline', ['snapshotID', 'itemID'], unique=False)
+
+    # Le giacenze già presenti diventano il movimento di apertura del registro
+    op.execute(
+        "INSERT INTO inventorymovement (timestamp, itemID, kind, on_hand_delta, locked_delta) "
+        "SELECT strftime('%Y-%m-%dT%H:%M:%f000', 'now'), ID, 'opening', quantity_on_hand, quantity_locked "
+        "FROM inventory"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_stocksnapshotline_snapshotID_itemID', table_name='stocksnapshotline')
+    op.drop_table('stocksnapshotline')
+    op.drop_index(op.f('ix_stocksnapshot_timestamp'), table_name='stocksnapshot')
+    op.drop_table('stocksnapshot')
+    op.drop_index(op.f('ix_inventorymovement_itemID'), table_name='inventorymovement')
+    op.drop_index(op.f('ix_inventorymovement_timestamp'), table_name='inventorymovement')
+    op.drop_table('inventorymovement')
@@ -0,0 +1,53 @@
+"""immagini in archivio blob
+
+Revision ID: c6e0a2d4f817
+Revises: a4c8e2f6b103
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+import base64
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+import blobs
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6e0a2d4f817'
+down_revision: Union[str, None] = 'a4c8e2f6b103'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+inventory = sa.table('inventory', sa.column('ID', sa.Integer), sa.column('image', sa.String))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Le data URL escono dalla tabella una alla volta: in memoria c'è una sola immagine
+    conn = op.get_bind()
+    ids = conn.execute(sa.select(inventory.c.ID).where(inventory.c.image.like('data:%'))).scalars().all()
+    for item_id in ids:
+        image = conn.execute(sa.select(inventory.c.image).where(inventory.c.ID == item_id)).scalar()
+        try:
+            blob_hash = blobs.normalize_image(image, validate=False)
+        except blobs.BlobError:
+            # Data URL illeggibile: l'immagine era comunque inutilizzabile
+            blob_hash = None
+        conn.execute(inventory.update().where(inventory.c.ID == item_id).values(image=blob_hash))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    conn = op.get_bind()
+    rows = conn.execute(sa.select(inventory.c.ID, inventory.c.image)
+                        .where(inventory.c.image.is_not(None))).all()
+    for item_id, blob_hash in rows:
+        if not blobs.exists(blob_hash):
+            continue
+        path = blobs.path_of(blob_hash)
+        with open(path, 'rb') as f:
+            data = base64.b64encode(f.read()).decode('ascii')
+        conn.execute(inventory.update().where(inventory.c.ID == item_id)
+                     .values(image=f"data:{blobs.media_type(path)};base64,{data}"))
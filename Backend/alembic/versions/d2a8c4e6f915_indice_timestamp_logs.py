@@ -0,0 +1,28 @@
+"""indice timestamp logs
+
+Revision ID: d2a8c4e6f915
+Revises: b5d1f7e93a20
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a8c4e6f915'
+down_revision: Union[str, None] = 'b5d1f7e93a20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_logs_timestamp'), 'logs', ['timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_logs_timestamp'), table_name='logs')
@@ -0,0 +1,30 @@
+"""indice ricerca full-text articoli
+
+Revision ID: f3b9d1c5a728
+Revises: c6e0a2d4f817
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+import search
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b9d1c5a728'
+down_revision: Union[str, None] = 'c6e0a2d4f817'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Tabella FTS5, trigger e indicizzazione delle righe esistenti
+    search.install(op.get_bind())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    search.uninstall(op.get_bind())
@@ -0,0 +1,172 @@
+import os
+from typing import Callable, Dict, List
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, case, func, literal, select, union_all, update
+from sqlalchemy.orm.exc import StaleDataError
+from sqlmodel import Session
+
+from models import Inventory, ProductionOrder, ProductionOrderDetails
+import changes
+import ledger
+import order_tree
+from order_tree import OPEN_STATUSES
+
+# Allocazione di un carico di magazzino: la quantità in arrivo avanza gli
+# ordini aperti del prodotto e blocca i dettagli che lo usano come
+# componente. I candidati arrivano da una sola query, l'ordine di servizio
+# lo decide la politica, le modifiche sono un UPDATE (executemany) per
+# tabella e il commit è uno solo.
+ALLOCATION_POLICY = os.environ.get("LITEERP_ALLOCATION_POLICY", "lifo")
+
+orders_table = ProductionOrder.__table__
+details_table = ProductionOrderDetails.__table__
+
+# Politica -> ORDER BY sulle colonne dei candidati (kind, ID, orderID,
+# required, done, version, status, date, priority, dueDate)
+POLICIES: Dict[str, Callable] = {}
+
+
+def register_policy(name: str, order_by: Callable):
+    POLICIES[name] = order_by
+
+
+register_policy("lifo", lambda c: [c.date.desc(), c.orderID.desc()])
+register_policy("fifo", lambda c: [c.date, c.orderID])
+register_policy("priority", lambda c: [c.priority.desc(), c.date, c.orderID])
+register_policy("due_date", lambda c: [func.coalesce(c.dueDate, c.date), c.orderID])
+
+
+def check_policy(policy: str):
+    if policy not in POLICIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid allocation policy: {policy}. Valid policies are: {list(POLICIES)}")
+
+
+def candidates(session: Session, product_id: int, policy: str) -> list:
+    # Ordini da avanzare e dettagli da bloccare, con gli indici su productID
+    orders = (select(literal("order").label("kind"), ProductionOrder.ID.label("ID"),
+                     ProductionOrder.ID.label("orderID"),
+                     ProductionOrder.quantityRequested.label("required"),
+                     ProductionOrder.quantityProduced.label("done"),
+                     ProductionOrder.version.label("version"), ProductionOrder.status,
+                     ProductionOrder.date, ProductionOrder.priority, ProductionOrder.dueDate)
+              .where(ProductionOrder.productID == product_id)
+              .where(ProductionOrder.status.in_(OPEN_STATUSES))
+              .where(ProductionOrder.quantityRequested > ProductionOrder.quantityProduced))
+    details = (select(literal("detail"), ProductionOrderDetails.ID,
+                      ProductionOrderDetails.productionOrderID,
+                      ProductionOrderDetails.quantityRequired,
+                      ProductionOrderDetails.quantityLocked,
+                      ProductionOrderDetails.version, ProductionOrder.status,
+                      ProductionOrder.date, ProductionOrder.priority, ProductionOrder.dueDate)
+               .join(ProductionOrder, ProductionOrder.ID == ProductionOrderDetails.productionOrderID)
+               .where(ProductionOrderDetails.productID == product_id)
+               .where(ProductionOrderDetails.quantityLocked < ProductionOrderDetails.quantityRequired)
+               .where(ProductionOrder.status.in_(OPEN_STATUSES)))
+    rows = union_all(orders, details).subquery()
+    return session.execute(select(rows).order_by(*POLICIES[policy](rows.c))).all()
+
+
+def allocate(rows: list, quantity: int):
+    # Come prima: la stessa quantità avanza gli ordini e blocca i dettagli,
+    # in giacenza libera resta quello che non è stato bloccato
+    produced = []
+    locked = []
+    to_produce = to_lock = quantity
+    for row in rows:
+        amount = min(row.required - row.done, to_produce if row.kind == "order" else to_lock)
+        if amount <= 0:
+            continue
+        if row.kind == "order":
+            produced.append((row, amount))
+            to_produce -= amount
+        else:
+            locked.append((row, amount))
+            to_lock -= amount
+    return produced, locked, to_lock
+
+
+def _update_many(session: Session, table, column: str, allocations: list):
+    # Un solo UPDATE per tabella; la version nel WHERE fa da optimistic lock
+    values = {column: table.c[column] + bindparam("amount"), "version": table.c.version + 1}
+    if table is orders_table:
+        values["status"] = case(
+            (table.c.quantityProduced + bindparam("amount") >= table.c.quantityRequested, "Completed"),
+            else_=table.c.status)
+    result = session.execute(
+        update(table)
+        .where(table.c.ID == bindparam("row_id"))
+        .where(table.c.version == bindparam("row_version"))
+        .values(**values),
+        [{"row_id": row.ID, "row_version": row.version, "amount": amount}
+         for row, amount in allocations])
+    if result.rowcount != len(allocations):
+        raise StaleDataError(f"{table.name}: rows changed by a concurrent update")
+
+
+def allocate_addition(session: Session, item: Inventory, quantity: int,
+                      policy: str = ALLOCATION_POLICY) -> dict:
+    # Tutto tranne il commit: lo usano il carico singolo e i movimenti in
+    # blocco. Un ordine non completabile solleva HTTPException prima di
+    # qualsiasi modifica.
+    check_policy(policy)
+    produced, locked, remaining = allocate(candidates(session, item.ID, policy), quantity)
+
+    completed = [row for row, amount in produced if row.done + amount >= row.required]
+    for row in completed:
+        order_tree.check_status_transition(row.status, "Completed")
+
+    if produced:
+        _update_many(session, orders_table, "quantityProduced", produced)
+        for row, amount in produced:
+            fields = {"quantityProduced": row.done + amount}
+            if row.done + amount >= row.required:
+                fields["status"] = "Completed"
+            changes.record(session, "orders", row.ID, "update", fields, row.version + 1)
+    if completed:
+        # I sotto-ordini ancora aperti si chiudono con l'ordine padre
+        ids = [row.ID for row in completed]
+        tree = order_tree.subtree_query(ids)
+        descendants = session.execute(
+            select(tree.c.ID, tree.c.version)
+            .where(tree.c.status != "Completed")
+            .where(tree.c.ID.not_in(ids))).all()
+        if descendants:
+            session.execute(update(orders_table)
+                            .where(orders_table.c.ID.in_([row.ID for row in descendants]))
+                            .values(status="Completed", version=orders_table.c.version + 1))
+            for row in descendants:
+                changes.record(session, "orders", row.ID, "update",
+                               {"status": "Completed"}, row.version + 1)
+    if locked:
+        _update_many(session, details_table, "quantityLocked", locked)
+        for row, amount in locked:
+            changes.record(session, "details", row.ID, "update",
+                           {"quantityLocked": row.done + amount}, row.version + 1)
+
+    ledger.record(session, item, "add", on_hand_delta=quantity)
+    for row, amount in locked:
+        ledger.record(session, item, "lock", -amount, amount, row.orderID)
+    item.quantity_locked += quantity - remaining
+    item.quantity_on_hand += remaining
+    session.add(item)
+
+    return {
+        "policy": policy,
+        "orders": [{"productionOrderID": row.ID, "quantity": amount,
+                    "completed": row.done + amount >= row.required}
+                   for row, amount in produced],
+        "details": [{"productionOrderDetailsID": row.ID, "productionOrderID": row.orderID,
+                     "quantity": amount} for row, amount in locked],
+        "free": remaining,
+    }
+
+
+def apply_addition(session: Session, item: Inventory, quantity: int,
+                   policy: str = ALLOCATION_POLICY) -> dict:
+    result = allocate_addition(session, item, quantity, policy)
+    session.commit()
+    session.refresh(item)
+    return {"item": item, **result}
@@ -0,0 +1,126 @@
+import json
+import os
+from typing import Dict, List, Optional
+
+from sqlalchemy import Index, func, literal_column, text
+
+from models import Inventory
+
+# Attributi degli articoli: Inventory.datas è un oggetto JSON libero, ma le
+# chiavi dichiarate qui hanno un tipo controllato in scrittura e un indice
+# su espressione (json_extract) in SQLite, così GET /inventory/?attr.supplier=
+# filtra in SQL usando l'indice. LITEERP_ATTRIBUTES: "nome:tipo,nome:tipo".
+TYPES = {"str": str, "int": int, "float": float, "bool": bool}
+DEFAULT_ATTRIBUTES = "supplier:str,material:str,bin:str"
+FILTER_PREFIX = "attr."
+
+
+class InvalidAttributes(ValueError):
+    pass
+
+
+def parse_declarations(value: str) -> Dict[str, type]:
+    declared = {}
+    for part in value.split(","):
+        name, _, type_name = part.strip().partition(":")
+        if not name:
+            continue
+        if not name.isidentifier() or type_name not in TYPES:
+            raise ValueError(f"Invalid attribute declaration: {part!r}")
+        declared[name] = TYPES[type_name]
+    return declared
+
+
+ATTRIBUTES = parse_declarations(os.environ.get("LITEERP_ATTRIBUTES", DEFAULT_ATTRIBUTES))
+
+
+def extract(name: str):
+    # Il percorso va scritto nell'SQL come letterale: con un parametro
+    # l'espressione non coincide più con quella dell'indice
+    return func.json_extract(Inventory.datas, literal_column(f"'$.{name}'"))
+
+
+def index_name(name: str) -> str:
+    return f"ix_inventory_attr_{name}"
+
+
+def install(connection):
+    # Idempotente. Le righe con datas non JSON farebbero fallire l'indice:
+    # il testo originale viene conservato sotto la chiave "notes".
+    if connection.dialect.name != "sqlite":
+        return
+    # inspect().get_indexes salta gli indici su espressione
+    existing = set(connection.execute(text(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'inventory'")).scalars())
+    missing = [name for name in ATTRIBUTES if index_name(name) not in existing]
+    if not missing:
+        return
+    connection.execute(text("UPDATE inventory SET datas = NULL WHERE trim(datas) = ''"))
+    connection.execute(text("UPDATE inventory SET datas = json_object('notes', datas) "
+                            "WHERE datas IS NOT NULL AND NOT json_valid(datas)"))
+    for name in missing:
+        Index(index_name(name), extract(name)).create(connection)
+
+
+def uninstall(connection):
+    for name in ATTRIBUTES:
+        connection.execute(text(f"DROP INDEX IF EXISTS {index_name(name)}"))
+
+
+def _check_type(name: str, value, expected: type):
+    # bool è una sottoclasse di int, e un intero è un float valido
+    if expected is float and isinstance(value, int) and not isinstance(value, bool):
+        return
+    if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+        raise InvalidAttributes(f"Attribute '{name}' must be of type {expected.__name__}")
+
+
+def validate(datas: Optional[str]) -> Optional[str]:
+    # Valore di Inventory.datas in ingresso: oggetto JSON, chiavi dichiarate
+    # del tipo giusto (null ammesso), le altre libere
+    if datas is None or not datas.strip():
+        return None
+    try:
+        values = json.loads(datas)
+    except ValueError:
+        raise InvalidAttributes("Attributes must be a JSON object")
+    if not isinstance(values, dict):
+        raise InvalidAttributes("Attributes must be a JSON object")
+    return dump(values)
+
+
+def dump(values: dict) -> str:
+    for name, expected in ATTRIBUTES.items():
+        if values.get(name) is not None:
+            _check_type(name, values[name], expected)
+    return json.dumps(values, ensure_ascii=False)
+
+
+def parse_value(name: str, value: str):
+    expected = ATTRIBUTES[name]
+    try:
+        if expected is bool:
+            if value.lower() not in ("true", "false", "1", "0"):
+                raise ValueError(value)
+            return value.lower() in ("true", "1")
+        return expected(value)
+    except ValueError:
+        raise InvalidAttributes(f"Attribute '{name}' must be of type {expected.__name__}")
+
+
+def filters(params) -> List:
+    # Parametri di query attr.<nome>=<valore>, in AND; solo chiavi dichiarate,
+    # così il filtro usa sempre un indice
+    clauses = []
+    for key, value in params.items():
+        if not key.startswith(FILTER_PREFIX):
+            continue
+        name = key[len(FILTER_PREFIX):]
+        if name not in ATTRIBUTES:
+            raise InvalidAttributes(f"Unknown attribute '{name}'")
+        clauses.append(extract(name) == parse_value(name, value))
+    return clauses
+
+
+def schema() -> Dict[str, str]:
+    return {name: expected.__name__ for name, expected in ATTRIBUTES.items()}
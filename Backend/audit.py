@@ -0,0 +1,261 @@
+import asyncio
+import json
+import logging
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event, insert, inspect
+from sqlalchemy.orm import Session
+
+from auth import decode_access_token
+from ledger import now
+from models import InventoryMovement, Logs, StockSnapshot, StockSnapshotLine
+
+logger = logging.getLogger("liteerp.audit")
+
+# Gli eventi di audit finiscono in una coda in memoria limitata; un task in
+# background li scrive in Logs a blocchi (executemany) ogni AUDIT_FLUSH_MS
+# millisecondi o appena ci sono AUDIT_BATCH_SIZE eventi.
+AUDIT_QUEUE_SIZE = int(os.environ.get("LITEERP_AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.environ.get("LITEERP_AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_MS = int(os.environ.get("LITEERP_AUDIT_FLUSH_MS", "200"))
+# Con la coda piena la richiesta attende al massimo questo tempo, poi
+# l'evento viene scartato e conteggiato
+AUDIT_PUT_TIMEOUT_MS = int(os.environ.get("LITEERP_AUDIT_PUT_TIMEOUT_MS", "50"))
+
+MUTATING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+SKIPPED_FIELDS = {"password", "version"}
+# Movimenti e snapshot derivano da una modifica di Inventory già nel log
+SKIPPED_MODELS = (Logs, StockSnapshot, StockSnapshotLine, InventoryMovement)
+MAX_VALUE_LENGTH = 200
+
+_current_event: ContextVar[Optional[dict]] = ContextVar("audit_event", default=None)
+
+
+def _value(value):
+    # Testi lunghi (note, attributi in datas): nel log ne basta l'inizio
+    if isinstance(value, str) and len(value) > MAX_VALUE_LENGTH:
+        return value[:MAX_VALUE_LENGTH] + "..."
+    return value
+
+
+def _diff(obj, action: str) -> dict:
+    state = inspect(obj)
+    fields = {}
+    for attr in state.mapper.column_attrs:
+        if attr.key in SKIPPED_FIELDS:
+            continue
+        if action == "update":
+            history = state.attrs[attr.key].history
+            if not history.has_changes():
+                continue
+            old = history.deleted[0] if history.deleted else None
+            new = history.added[0] if history.added else None
+            fields[attr.key] = [_value(old), _value(new)]
+        else:
+            fields[attr.key] = _value(getattr(obj, attr.key))
+    return {"entity": type(obj).__name__, "ID": getattr(obj, "ID", None),
+            "action": action, "fields": fields}
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session: Session, flush_context):
+    # Dopo il flush gli ID sono assegnati ma la history non è ancora azzerata
+    audit_event = _current_event.get()
+    if audit_event is None:
+        return
+    changes = audit_event["pending"]
+    for action, objects in (("create", session.new), ("update", session.dirty),
+                            ("delete", session.deleted)):
+        for obj in objects:
+            if isinstance(obj, SKIPPED_MODELS):
+                continue
+            change = _diff(obj, action)
+            if action != "update" or change["fields"]:
+                changes.append(change)
+
+
+def record_change(entity: str, ID, action: str, fields: dict):
+    # Per le modifiche fatte con UPDATE/DELETE diretti, che l'ORM non vede
+    audit_event = _current_event.get()
+    if audit_event is not None:
+        audit_event["pending"].append(
+            {"entity": entity, "ID": ID, "action": action, "fields": fields})
+
+
+@contextmanager
+def summarized(entity: str, action: str):
+    # Operazioni massive (import): le singole righe non entrano nel log della
+    # richiesta, che riceve invece una sola voce con il riepilogo riempito dal
+    # chiamante. Va usato nel thread che esegue l'operazione: il ContextVar
+    # viene sospeso solo lì.
+    audit_event = _current_event.get()
+    summary = {}
+    token = _current_event.set(None)
+    try:
+        yield summary
+    finally:
+        _current_event.reset(token)
+        if audit_event is not None and summary:
+            audit_event["changes"].append(
+                {"entity": entity, "ID": None, "action": action, "fields": summary})
+
+
+# Nel log finiscono solo le modifiche confermate: un rollback (per esempio
+# prima di un nuovo tentativo di run_with_retry) le scarta
+@event.listens_for(Session, "after_commit")
+def _confirm_changes(session: Session):
+    audit_event = _current_event.get()
+    if audit_event is not None:
+        audit_event["changes"].extend(audit_event["pending"])
+        audit_event["pending"].clear()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session: Session):
+    audit_event = _current_event.get()
+    if audit_event is not None:
+        audit_event["pending"].clear()
+
+
+class AuditLog:
+
+    def __init__(self, queue_size: int, batch_size: int, flush_ms: int, put_timeout_ms: int):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self.put_timeout = put_timeout_ms / 1000
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._batch_ready: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, async_engine):
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._batch_ready = asyncio.Event()
+        self._task = asyncio.create_task(self._run(async_engine))
+
+    async def stop(self, async_engine):
+        if self._task is None:
+            return
+        # Niente cancel a metà scrittura: None in coda chiude il writer dopo
+        # aver scritto tutto quello che lo precede
+        task, self._task = self._task, None
+        await self._queue.put(None)
+        self._batch_ready.set()
+        await task
+
+    async def submit(self, entry: dict):
+        if self._task is None:
+            return
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            # Backpressure: la richiesta aspetta un po' che il writer liberi spazio
+            try:
+                await asyncio.wait_for(self._queue.put(entry), self.put_timeout)
+            except asyncio.TimeoutError:
+                self.dropped += 1
+                return
+        if self._queue.qsize() >= min(self.batch_size, self.queue_size):
+            self._batch_ready.set()
+
+    def _drain(self, limit: int) -> list:
+        batch = []
+        while len(batch) < limit and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self, async_engine):
+        while True:
+            first = await self._queue.get()
+            if first is None:
+                return
+            self._batch_ready.clear()
+            if self._queue.qsize() < min(self.batch_size, self.queue_size) - 1:
+                try:
+                    await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            batch = [first] + self._drain(self.batch_size - 1)
+            stopping = batch[-1] is None
+            if stopping:
+                batch.pop()
+            await self._write(async_engine, batch)
+            if stopping:
+                return
+
+    async def _write(self, async_engine, batch: list):
+        try:
+            async with async_engine.begin() as conn:
+                await conn.execute(insert(Logs), batch)
+            self.written += len(batch)
+        except Exception:
+            self.failed += len(batch)
+            logger.exception("Cannot write %d audit events", len(batch))
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+audit_log = AuditLog(AUDIT_QUEUE_SIZE, AUDIT_BATCH_SIZE, AUDIT_FLUSH_MS, AUDIT_PUT_TIMEOUT_MS)
+
+
+def _executed_by(scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer":
+                payload = decode_access_token(token)
+                return payload.get("sub") if payload else None
+    return None
+
+
+class AuditMiddleware:
+    # Middleware ASGI: registra ogni chiamata che modifica dati
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in MUTATING_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        audit_event = {"changes": [], "pending": []}
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        token = _current_event.set(audit_event)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _current_event.reset(token)
+            segments = scope["path"].strip("/").split("/")
+            message = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "entity": segments[0],
+                "entityID": int(segments[1]) if len(segments) > 1 and segments[1].isdigit() else None,
+                "changes": audit_event["changes"],
+            }
+            await audit_log.submit({
+                "timestamp": now(),
+                "message": json.dumps(message, default=str),
+                "executed_by": _executed_by(scope),
+            })
@@ -1,17 +1,97 @@
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
+from typing import Optional
+from collections import OrderedDict
+import threading
+import time
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlmodel import Session, select
-from models import User  # la tua User
-from database import get_session
+from pydantic import BaseModel
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models import TableVersion, User  # la tua User
+from database import get_async_session
 
 SECRET_KEY = "super-secret-key"  # cambialo!
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+USER_CACHE_TTL_SECONDS = 60
+USER_CACHE_MAX_SIZE = 1024
+USERS_TABLE = "users"
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/login")
 
+
+class Principal(BaseModel):
+    # L'utente autenticato come lo vedono le dipendenze: niente hash della password
+    ID: int
+    email: str
+
+
+class UserCache:
+    # Cache LRU con TTL dei principal autenticati, indicizzata per "sub".
+    # Ogni voce ricorda il contatore "users" di TableVersion con cui è stata
+    # letta ed è valida finché il contatore noto al processo è lo stesso.
+    # Il contatore arriva dal change hub (commit di questo processo e poll
+    # periodico di TableVersion), così una hit non tocca il database: una
+    # modifica fatta da un altro worker si vede entro un giro di poll.
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.version: Optional[int] = None
+        self._entries: "OrderedDict[str, tuple[float, int, Principal]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sub: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(sub)
+            if entry is None or entry[0] < time.monotonic() or entry[1] != self.version:
+                if entry is not None:
+                    del self._entries[sub]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(sub)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, sub: str, user: User, version: int) -> Principal:
+        principal = Principal(ID=user.ID, email=user.email)
+        with self._lock:
+            self._observe(version)
+            self._entries[sub] = (time.monotonic() + self.ttl, version, principal)
+            self._entries.move_to_end(sub)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return principal
+
+    def observe(self, versions: dict):
+        # Chiamato dal change hub con i contatori di TableVersion
+        if USERS_TABLE in versions:
+            with self._lock:
+                self._observe(versions[USERS_TABLE])
+
+    def _observe(self, version: int):
+        # Il contatore cresce soltanto: un valore più vecchio (letto prima
+        # di un commit già visto) non deve riabilitare voci superate
+        if self.version is None or version > self.version:
+            self.version = version
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+user_cache = UserCache(USER_CACHE_TTL_SECONDS, USER_CACHE_MAX_SIZE)
+
+
+async def users_version(session: AsyncSession) -> int:
+    # Incrementato da changes._bump_table_versions a ogni commit che tocca User
+    statement = select(TableVersion.version).where(TableVersion.name == USERS_TABLE)
+    return (await session.exec(statement)).first() or 0
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=15))
@@ -24,7 +104,7 @@ def decode_access_token(token: str):
     except JWTError:
         return None
 
-def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)) -> User:
+async def get_current_user(token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(get_async_session)) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -37,9 +117,23 @@ def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Dep
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    
-    statement = select(User).where(User.email == email)
-    user = session.exec(statement).first()
+
+    principal = user_cache.get(email)
+    if principal is not None:
+        return principal
+
+    # Il contatore si legge prima dell'utente: al peggio la voce è già vecchia
+    version = await users_version(session)
+
+    # I token recenti portano anche l'ID: lookup per chiave primaria
+    user_id = payload.get("uid")
+    if user_id is not None:
+        user = await session.get(User, user_id)
+        if user is not None and user.email != email:
+            user = None
+    else:
+        statement = select(User).where(User.email == email)
+        user = (await session.exec(statement)).first()
     if user is None:
         raise credentials_exception
-    return user
\ No newline at end of file
+    return user_cache.put(email, user, version)
@@ -0,0 +1,177 @@
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlmodel import Session
+
+from changes import hub, read_versions
+from models import BillOfMaterials, Inventory
+
+TABLES = ("inventory", "bom")
+
+
+class AvailabilityIndex:
+    # Per ogni prodotto con distinta base: quante unità si possono costruire
+    # con la giacenza attuale e quale componente le limita. I semilavorati
+    # contano con la loro giacenza più quanto se ne può costruire.
+    # Si carica con due query e si aggiorna dagli eventi del change hub,
+    # ricalcolando solo gli antenati degli articoli toccati. Come bom_engine
+    # è per processo e legato ai contatori "inventory" e "bom" di
+    # TableVersion: un commit di un altro worker fa ricaricare tutto alla
+    # lettura successiva.
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._on_hand: Dict[int, Tuple[int, int]] = {}   # ID -> (quantità, version)
+        self._edges: Dict[int, Tuple[int, int, int]] = {}  # bom ID -> (parent, child, quantità)
+        self._children: Dict[int, Dict[int, int]] = {}   # parent -> child -> quantità
+        self._parents: Dict[int, Set[int]] = {}
+        self._buildable: Dict[int, Tuple[int, Optional[int]]] = {}
+        self._versions: Dict[str, int] = {}
+
+    def _load(self, session: Session):
+        # Contatori prima dei dati, senza autoflush (vedi bom_engine._load)
+        with self._lock, session.no_autoflush:
+            versions = read_versions(session, TABLES)
+            if self._loaded and self._versions == versions:
+                return
+            self._on_hand = {row.ID: (row.quantity_on_hand, row.version) for row in session.exec(
+                select(Inventory.ID, Inventory.quantity_on_hand, Inventory.version))}
+            self._edges = {row.ID: (row.parentProductID, row.childProductID, row.quantity)
+                           for row in session.exec(select(
+                               BillOfMaterials.ID, BillOfMaterials.parentProductID,
+                               BillOfMaterials.childProductID, BillOfMaterials.quantity))}
+            self._rebuild_graph()
+            self._buildable = {}
+            self._refresh(set(self._children))
+            self._versions = versions
+            self._loaded = True
+
+    def _rebuild_graph(self):
+        self._children = {}
+        self._parents = {}
+        for parent, child, quantity in self._edges.values():
+            children = self._children.setdefault(parent, {})
+            children[child] = children.get(child, 0) + quantity
+            self._parents.setdefault(child, set()).add(parent)
+
+    def _ancestors(self, product_ids) -> Set[int]:
+        found = set()
+        stack = list(product_ids)
+        while stack:
+            for parent in self._parents.get(stack.pop(), ()):
+                if parent not in found:
+                    found.add(parent)
+                    stack.append(parent)
+        return found
+
+    def _refresh(self, parents: Set[int]):
+        # Ricalcola dal basso verso l'alto: un prodotto dopo i suoi componenti
+        for parent in parents:
+            self._buildable.pop(parent, None)
+        for parent in parents:
+            if parent in self._children:
+                self._compute(parent, set())
+
+    def _compute(self, parent: int, path: Set[int]) -> int:
+        if parent in self._buildable:
+            return self._buildable[parent][0]
+        if parent in path:
+            # La distinta base non ammette cicli (bom_engine.check_edge)
+            return 0
+        path.add(parent)
+        best, limiting = None, None
+        for child, quantity in sorted(self._children[parent].items()):
+            if quantity <= 0:
+                continue
+            available = self._on_hand.get(child, (0, 0))[0]
+            if child in self._children:
+                available += self._compute(child, path)
+            count = max(available, 0) // quantity
+            if best is None or count < best:
+                best, limiting = count, child
+        path.discard(parent)
+        self._buildable[parent] = (best or 0, limiting)
+        return best or 0
+
+    def apply(self, events: list, versions: dict):
+        # Chiamato dal change hub dopo ogni commit di questo processo
+        versions = {name: version for name, version in versions.items() if name in TABLES}
+        if not versions:
+            return
+        with self._lock:
+            if not self._loaded:
+                return
+            skipped = any(version != self._versions[name] + 1 for name, version in versions.items())
+            if skipped or any(e["op"] == "reset" for e in events):
+                # Commit di altri processi nel mezzo, o import senza eventi
+                # per riga: si ricarica alla lettura
+                self.reset()
+                return
+            self._versions.update(versions)
+            touched = set()
+            graph_changed = False
+            for e in events:
+                if e["entity"] == "inventory":
+                    if e["op"] == "delete":
+                        self._on_hand.pop(e["ID"], None)
+                        touched.add(e["ID"])
+                    elif "quantity_on_hand" in e["fields"]:
+                        current = self._on_hand.get(e["ID"])
+                        version = e["version"] or 0
+                        # Eventi di commit concorrenti possono arrivare in ordine sparso
+                        if current is None or version >= current[1]:
+                            self._on_hand[e["ID"]] = (e["fields"]["quantity_on_hand"], version)
+                            touched.add(e["ID"])
+                elif e["entity"] == "bom":
+                    old = self._edges.pop(e["ID"], None)
+                    if old is not None:
+                        touched.add(old[1])
+                        touched.add(old[0])
+                    if e["op"] != "delete":
+                        fields = e["fields"]
+                        parent, child, quantity = old or (None, None, None)
+                        edge = (fields.get("parentProductID", parent),
+                                fields.get("childProductID", child),
+                                fields.get("quantity", quantity))
+                        if None not in edge:
+                            self._edges[e["ID"]] = edge
+                            touched.add(edge[0])
+                    graph_changed = True
+            if graph_changed:
+                self._rebuild_graph()
+                for parent in [p for p in self._buildable if p not in self._children]:
+                    del self._buildable[parent]
+            if touched:
+                self._refresh(self._ancestors(touched) | (touched & set(self._children)))
+
+    def get(self, session: Session, parent_id: int) -> Optional[dict]:
+        with self._lock:
+            self._load(session)
+            if parent_id not in self._buildable:
+                return None
+            return self._entry(parent_id)
+
+    def all(self, session: Session) -> List[dict]:
+        with self._lock:
+            self._load(session)
+            return [self._entry(parent_id) for parent_id in sorted(self._buildable)]
+
+    def _entry(self, parent_id: int) -> dict:
+        buildable, limiting = self._buildable[parent_id]
+        return {"productID": parent_id, "buildable": buildable, "limitingProductID": limiting}
+
+    def reset(self):
+        with self._lock:
+            self._loaded = False
+            self._on_hand = {}
+            self._edges = {}
+            self._children = {}
+            self._parents = {}
+            self._buildable = {}
+            self._versions = {}
+
+
+availability_index = AvailabilityIndex()
+hub.subscribe(availability_index.apply)
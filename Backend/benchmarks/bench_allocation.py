@@ -0,0 +1,128 @@
+"""Allocazione di un carico su migliaia di richieste aperte: vecchio ciclo contro allocation.
+
+"old" è la vecchia apply_inventory_addition (due query, un UPDATE per riga
+al flush), "new" è allocation.apply_addition (una query, un executemany per
+tabella). Riporta tempo e numero di statement SQL per carico.
+
+Uso (dalla cartella Backend):
+
+    python -m benchmarks.bench_allocation --demands 5000 --quantity 1000 --loads 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event  # noqa: E402
+from sqlmodel import Session, SQLModel, select  # noqa: E402
+
+import allocation  # noqa: E402
+import ledger  # noqa: E402
+from database import make_engine  # noqa: E402
+from models import Inventory, ProductionOrder, ProductionOrderDetails  # noqa: E402
+from routers import production_order  # noqa: E402
+
+PRODUCT = 1
+COMPONENT = 2
+
+
+def old_addition(session: Session, item: Inventory, quantity: int):
+    orders = session.exec(
+        select(ProductionOrder)
+        .where(ProductionOrder.productID == item.ID)
+        .where(ProductionOrder.status.in_(["In Progress", "Planned"]))
+        .order_by(ProductionOrder.date.desc())).all()
+    remaining = quantity
+    for order in orders:
+        if remaining <= 0:
+            break
+        if order.quantityRequested > order.quantityProduced:
+            amount = min(order.quantityRequested - order.quantityProduced, remaining)
+            order.quantityProduced += amount
+            remaining -= amount
+            if order.quantityProduced >= order.quantityRequested:
+                production_order.update_production_order_status_backend(
+                    order.ID, "Completed", session, commit=False)
+            session.add(order)
+
+    details = session.exec(
+        select(ProductionOrderDetails)
+        .where(ProductionOrderDetails.productID == item.ID)
+        .where(ProductionOrderDetails.quantityLocked < ProductionOrderDetails.quantityRequired)
+        .join(ProductionOrder, ProductionOrder.ID == ProductionOrderDetails.productionOrderID)
+        .where(ProductionOrder.status.in_(["In Progress", "Planned"]))
+        .order_by(ProductionOrder.date.desc())).all()
+    remaining = quantity
+    ledger.record(session, item, "add", on_hand_delta=quantity)
+    for detail in details:
+        if remaining <= 0:
+            break
+        amount = min(detail.quantityRequired - detail.quantityLocked, remaining)
+        detail.quantityLocked += amount
+        remaining -= amount
+        item.quantity_locked += amount
+        ledger.record(session, item, "lock", -amount, amount, detail.productionOrderID)
+        session.add(detail)
+    item.quantity_on_hand += remaining
+    session.add(item)
+    session.commit()
+    session.refresh(item)
+
+
+def populate(engine, demands: int):
+    with engine.begin() as conn:
+        conn.execute(Inventory.__table__.insert(), [
+            {"ID": PRODUCT, "code": "P", "quantity_on_hand": 0, "quantity_locked": 0, "category": "Product"},
+            {"ID": COMPONENT, "code": "C", "quantity_on_hand": 0, "quantity_locked": 0, "category": "Component"}])
+        conn.execute(ProductionOrder.__table__.insert(), [
+            {"ID": i + 1, "date": f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}", "productID": PRODUCT,
+             "quantityRequested": 1000, "quantityProduced": 0, "status": "In Progress",
+             "priority": i % 7} for i in range(demands)])
+        conn.execute(ProductionOrderDetails.__table__.insert(), [
+            {"productionOrderID": i + 1, "productID": COMPONENT, "quantityRequired": 2,
+             "quantityLocked": 0} for i in range(demands)])
+
+
+def run(name, args, addition):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", echo=False)
+        SQLModel.metadata.create_all(engine)
+        populate(engine, args.demands)
+
+        statements = 0
+
+        def count(*_):
+            nonlocal statements
+            statements += 1
+
+        event.listen(engine, "before_cursor_execute", count)
+        start = time.perf_counter()
+        for _ in range(args.loads):
+            with Session(engine) as session:
+                addition(session, session.get(Inventory, COMPONENT), args.quantity)
+        elapsed = time.perf_counter() - start
+        event.remove(engine, "before_cursor_execute", count)
+        engine.dispose()
+
+    print(f"{name:<8} {elapsed / args.loads * 1000:8.2f} ms {statements / args.loads:7.1f} stmt per carico")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--demands", type=int, default=5000)
+    parser.add_argument("--quantity", type=int, default=1000)
+    parser.add_argument("--loads", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{args.demands} ordini aperti, carichi da {args.quantity} pezzi "
+          f"({args.quantity // 2} dettagli bloccati per carico)")
+    run("old", args, old_addition)
+    for policy in allocation.POLICIES:
+        run(policy, args, lambda s, item, q: allocation.apply_addition(s, item, q, policy))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Throughput delle route sync (threadpool) contro le route async.
+
+Monta la stessa lettura dell'inventario come route `def` con Session sync e
+come route `async def` con AsyncSession, e misura richieste/s al crescere
+della concorrenza. Richiede httpx.
+
+Uso (dalla cartella Backend):
+
+    python -m benchmarks.bench_async_throughput --concurrency 10 50 200
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+from fastapi import Depends, FastAPI  # noqa: E402
+from sqlmodel import Session, SQLModel, select  # noqa: E402
+from sqlmodel.ext.asyncio.session import AsyncSession  # noqa: E402
+
+from database import make_async_engine, make_engine  # noqa: E402
+from models import Inventory  # noqa: E402
+
+ITEMS = 5000
+
+
+def build_app(url: str) -> FastAPI:
+    engine = make_engine(url, echo=False)
+    async_engine = make_async_engine(url, echo=False)
+
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all(Inventory(code=f"CODE{i}", quantity_on_hand=10, quantity_locked=0,
+                                  category="Component") for i in range(ITEMS))
+        session.commit()
+
+    def get_session():
+        with Session(engine) as session:
+            yield session
+
+    async def get_async_session():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
+    app = FastAPI()
+
+    @app.get("/sync/{code}")
+    def read_sync(code: str, session: Session = Depends(get_session)):
+        return session.exec(select(Inventory).where(Inventory.code == code)).first()
+
+    @app.get("/async/{code}")
+    async def read_async(code: str, session: AsyncSession = Depends(get_async_session)):
+        return (await session.exec(select(Inventory).where(Inventory.code == code))).first()
+
+    return app
+
+
+async def drive(client, path: str, concurrency: int, requests: int) -> float:
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(f"{path}/CODE{random.randrange(ITEMS)}")
+
+    async def worker():
+        while not queue.empty():
+            response = await client.get(queue.get_nowait())
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return requests / (time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = build_app(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for concurrency in args.concurrency:
+                sync_rps = await drive(client, "/sync", concurrency, args.requests)
+                async_rps = await drive(client, "/async", concurrency, args.requests)
+                print(f"concurrency={concurrency:4d}  sync={sync_rps:8.1f} req/s  "
+                      f"async={async_rps:8.1f} req/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+"""Filtri sugli attributi (GET /inventory/?attr.<nome>=) con e senza indici.
+
+Crea --items articoli con supplier, material e bin in datas e misura la
+query di paginate con i filtri di attributes.filters, prima con gli indici
+json_extract e poi senza (scansione di tutta la tabella).
+
+Uso (dalla cartella Backend):
+
+    python -m benchmarks.bench_attributes --items 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlmodel import select  # noqa: E402
+
+import attributes  # noqa: E402
+from benchmarks import bench_search, results  # noqa: E402
+from database import make_engine  # noqa: E402
+from models import Inventory  # noqa: E402
+
+
+def measure(engine, cases: dict, limit: int, repeat: int) -> dict:
+    timings = {}
+    columns = [getattr(Inventory, f) for f in Inventory.__fields__]
+    with engine.connect() as conn:
+        for name, params in cases.items():
+            query = select(*columns).where(*attributes.filters(params)).order_by(Inventory.ID).limit(limit)
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                conn.execute(query).all()
+                samples.append(time.perf_counter() - start)
+            timings[name] = results.summarize(samples, sum(samples))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=1000000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    cases = {
+        "supplier": {"attr.supplier": "ACME"},
+        "supplier+material": {"attr.supplier": "Misumi", "attr.material": "brass"},
+        "rare bin": {"attr.bin": "M24"},
+        "no match": {"attr.supplier": "Nobody"},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", echo=False)
+        bench_search.populate(engine, args.items, rng)
+        with engine.begin() as conn:
+            # Un articolo su 20000 in una posizione "rara"
+            conn.exec_driver_sql("UPDATE inventory SET datas = json_set(datas, '$.bin', 'M24') "
+                                 "WHERE ID % 20000 = 0")
+            attributes.install(conn)
+        indexed = measure(engine, cases, args.limit, args.repeat)
+        with engine.begin() as conn:
+            attributes.uninstall(conn)
+        scan = measure(engine, cases, args.limit, max(args.repeat // 5, 1))
+        engine.dispose()
+
+    for name in cases:
+        print(f"{name:<18} indici p50 {indexed[name]['p50']:8.2f} ms   "
+              f"scansione p50 {scan[name]['p50']:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Scrittura dei log di audit: un INSERT per evento contro la coda a blocchi.
+
+"inline" fa un INSERT + commit per evento, come farebbe una route che scrive
+il log da sola; "batched" usa audit.AuditLog. Con --queue-size piccolo la coda
+si riempie e interviene la backpressure (le stats contano gli eventi scartati).
+
+Uso (dalla cartella Backend):
+
+    python -m benchmarks.bench_audit --events 20000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert  # noqa: E402
+from sqlmodel import SQLModel  # noqa: E402
+
+from audit import AuditLog  # noqa: E402
+from database import make_async_engine, make_engine  # noqa: E402
+from ledger import now  # noqa: E402
+from models import Logs  # noqa: E402
+
+
+def event(i: int) -> dict:
+    return {"timestamp": now(), "message": f'{{"method": "POST", "path": "/inventory/{i}/add/"}}',
+            "executed_by": "bench@example.com"}
+
+
+async def inline(async_engine, events: int) -> float:
+    start = time.perf_counter()
+    for i in range(events):
+        async with async_engine.begin() as conn:
+            await conn.execute(insert(Logs), [event(i)])
+    return events / (time.perf_counter() - start)
+
+
+async def batched(async_engine, events: int, queue_size: int) -> tuple:
+    audit_log = AuditLog(queue_size, batch_size=500, flush_ms=200, put_timeout_ms=50)
+    audit_log.start(async_engine)
+    start = time.perf_counter()
+    for i in range(events):
+        await audit_log.submit(event(i))
+    submitted = time.perf_counter() - start
+    await audit_log.stop(async_engine)
+    return events / submitted, events / (time.perf_counter() - start), audit_log.stats()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--queue-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        SQLModel.metadata.create_all(make_engine(url, echo=False))
+        async_engine = make_async_engine(url, echo=False)
+
+        print(f"inline : {await inline(async_engine, args.events):9.1f} eventi/s")
+        submit_rate, write_rate, stats = await batched(async_engine, args.events, args.queue_size)
+        print(f"batched: {submit_rate:9.1f} eventi/s accodati, {write_rate:9.1f} eventi/s scritti  {stats}")
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+"""Polling della lista completa contro delta dal change hub.
+
+Simula un client che ogni secondo vuole restare allineato su un inventario
+di --items articoli mentre arrivano --changes modifiche: "poll" rilegge
+GET /inventory/ ogni volta, "delta" legge gli eventi dal hub dopo l'ultima
+sequenza ricevuta.
+
+Uso (dalla cartella Backend):
+
+    python -m benchmarks.bench_changes --items 5000 --changes 20 --rounds 50
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.chdir(tempfile.mkdtemp())
+os.environ.setdefault("LITEERP_DATABASE_URL", f"sqlite:///{os.path.join(os.getcwd(), 'bench.db')}")
+open("payload.sql", "w").close()
+
+import httpx  # noqa: E402
+from sqlmodel import Session  # noqa: E402
+
+import main  # noqa: E402
+from changes import hub  # noqa: E402
+from database import create_db_and_tables, engine  # noqa: E402
+from models import Inventory  # noqa: E402
+
+
+def populate(items: int):
+    create_db_and_tables()
+    with engine.begin() as conn:
+        conn.execute(Inventory.__table__.insert(), [
+            {"code": f"CODE{i}", "quantity_on_hand": 10, "quantity_locked": 0,
+             "category": "Component"} for i in range(items)])
+
+
+def mutate(items: int, changes: int):
+    with Session(engine) as session:
+        for item_id in random.sample(range(1, items + 1), changes):
+            session.get(Inventory, item_id).quantity_on_hand += 1
+        session.commit()
+
+
+async def main_async():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--changes", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    populate(args.items)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        poll_time = delta_time = 0.0
+        poll_bytes = delta_events = 0
+        cursor = hub.sequence
+        for _ in range(args.rounds):
+            mutate(args.items, args.changes)
+
+            start = time.perf_counter()
+            response = await client.get("/inventory/")
+            poll_time += time.perf_counter() - start
+            poll_bytes += len(response.content)
+
+            start = time.perf_counter()
+            events, cursor = hub.since(cursor, {"inventory"})
+            delta_time += time.perf_counter() - start
+            delta_events += len(events)
+
+    print(f"poll : {poll_time / args.rounds * 1000:8.2f} ms/giro  {poll_bytes / args.rounds / 1024:8.1f} KiB/giro")
+    print(f"delta: {delta_time / args.rounds * 1000:8.2f} ms/giro  {delta_events / args.rounds:8.1f} eventi/giro")
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async())
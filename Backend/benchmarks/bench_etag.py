@@ -0,0 +1,62 @@
+"""Costo di GET /inventory/ senza cache, da cache e con If-None-Match (304).
+
+Uso (dalla cartella Backend):
+
+    python -m benchmarks.bench_etag --items 5000 --requests 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.chdir(tempfile.mkdtemp())
+os.environ.setdefault("LITEERP_DATABASE_URL", f"sqlite:///{os.path.join(os.getcwd(), 'bench.db')}")
+open("payload.sql", "w").close()
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+from database import create_db_and_tables, engine  # noqa: E402
+from http_cache import response_cache  # noqa: E402
+from models import Inventory  # noqa: E402
+
+
+async def measure(client, requests: int, headers=None) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = await client.get("/inventory/", headers=headers)
+        assert response.status_code in (200, 304)
+    return (time.perf_counter() - start) / requests * 1000
+
+
+async def main_async():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    create_db_and_tables()
+    with engine.begin() as conn:
+        conn.execute(Inventory.__table__.insert(), [
+            {"code": f"CODE{i}", "quantity_on_hand": 10, "quantity_locked": 0,
+             "category": "Component"} for i in range(args.items)])
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        etag = (await client.get("/inventory/")).headers["etag"]
+
+        max_bytes, response_cache.max_bytes = response_cache.max_bytes, 0
+        uncached = await measure(client, args.requests)
+        response_cache.max_bytes = max_bytes
+        cached = await measure(client, args.requests)
+        not_modified = await measure(client, args.requests, {"If-None-Match": etag})
+
+    print(f"senza cache: {uncached:8.3f} ms  da cache: {cached:8.3f} ms  304: {not_modified:8.3f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async())
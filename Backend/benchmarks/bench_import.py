@@ -0,0 +1,101 @@
+"""Import massivo (importer) contro un commit per riga come POST /inventory/.
+
+Genera un CSV di --items articoli e uno di distinte base (--fanout componenti
+per prodotto), li importa con importer.import_inventory e import_bom e
+confronta con --baseline articoli inseriti uno alla volta con l'ORM.
+
+Uso (dalla cartella Backend):
+
+    python -m benchmarks.bench_import --items 100000
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlmodel import Session, SQLModel  # noqa: E402
+
+import attributes  # noqa: E402
+import importer  # noqa: E402
+import ledger  # noqa: E402
+import search  # noqa: E402
+from database import make_engine  # noqa: E402
+from models import Inventory  # noqa: E402
+
+
+def write_files(tmp: str, items: int, fanout: int, rng: random.Random):
+    products = items // (fanout + 1)
+    inventory_path = os.path.join(tmp, "inventory.csv")
+    with open(inventory_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["code", "category", "quantity_on_hand", "attr.supplier", "attr.bin"])
+        for i in range(items):
+            writer.writerow([f"IMP{i:07d}", "Product" if i < products else "Component",
+                             rng.randint(0, 500), rng.choice(["ACME", "Fastenal", "Misumi"]),
+                             f"B{rng.randint(1, 400)}"])
+    bom_path = os.path.join(tmp, "bom.csv")
+    with open(bom_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["parent", "child", "quantity"])
+        for parent in range(products):
+            for child in rng.sample(range(products, items), fanout):
+                writer.writerow([f"IMP{parent:07d}", f"IMP{child:07d}", rng.randint(1, 5)])
+    return inventory_path, bom_path
+
+
+def run_import(engine, function, path: str) -> tuple:
+    start = time.perf_counter()
+    with Session(engine) as session, open(path, "rb") as f:
+        report = function(session, f, "csv")
+    return time.perf_counter() - start, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--fanout", type=int, default=4, help="Components per product")
+    parser.add_argument("--baseline", type=int, default=2000, help="Items inserted one commit at a time")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        inventory_path, bom_path = write_files(tmp, args.items, args.fanout, rng)
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", echo=False)
+        SQLModel.metadata.create_all(engine)
+        with engine.begin() as conn:
+            search.install(conn)
+            attributes.install(conn)
+
+        elapsed, report = run_import(engine, importer.import_inventory, inventory_path)
+        print(f"inventory  {report['rows']:7d} righe in {elapsed:6.2f} s  "
+              f"({report['rows'] / elapsed:8.0f} righe/s)  {report['failed']} errori")
+        elapsed, report = run_import(engine, importer.import_bom, bom_path)
+        print(f"bom        {report['rows']:7d} righe in {elapsed:6.2f} s  "
+              f"({report['rows'] / elapsed:8.0f} righe/s)  {report['failed']} errori")
+        elapsed, report = run_import(engine, importer.import_inventory, inventory_path)
+        print(f"reimport   {report['rows']:7d} righe in {elapsed:6.2f} s  "
+              f"({report['rows'] / elapsed:8.0f} righe/s)  {report['unchanged']} invariate")
+
+        start = time.perf_counter()
+        for i in range(args.baseline):
+            with Session(engine) as session:
+                item = Inventory(code=f"ONE{i:07d}", category="Component", quantity_on_hand=10,
+                                 quantity_locked=0, datas=json.dumps({"supplier": "ACME"}))
+                session.add(item)
+                ledger.record(session, item, "opening", item.quantity_on_hand)
+                session.commit()
+        elapsed = time.perf_counter() - start
+        print(f"una riga per commit: {args.baseline / elapsed:8.0f} righe/s "
+              f"(stima per {args.items} righe: {args.items * elapsed / args.baseline:.0f} s)")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Piani di esecuzione e latenza delle query calde, prima e dopo gli indici.
+
+Uso (dalla cartella Backend):
+
+    python -m benchmarks.bench_indexes --rows 100000 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlmodel import SQLModel  # noqa: E402
+
+import models  # noqa: E402,F401
+
+HOT_QUERIES = {
+    "inventory by code": (
+        'SELECT * FROM inventory WHERE code = :code', lambda n: {"code": f"CODE{random.randrange(n)}"}),
+    "user by email": (
+        'SELECT * FROM user WHERE email = :email', lambda n: {"email": f"user{random.randrange(n)}@example.com"}),
+    "bom children": (
+        'SELECT * FROM billofmaterials WHERE "parentProductID" = :id', lambda n: {"id": random.randrange(n)}),
+    "open orders for product": (
+        'SELECT * FROM productionorder WHERE "productID" = :id '
+        "AND status IN ('In Progress', 'Planned') ORDER BY date DESC",
+        lambda n: {"id": random.randrange(n)}),
+    "sub-orders": (
+        'SELECT * FROM productionorder WHERE "parentProductionOrderDetailsID" = :id',
+        lambda n: {"id": random.randrange(n)}),
+    "details of order": (
+        'SELECT * FROM productionorderdetails WHERE "productionOrderID" = :id',
+        lambda n: {"id": random.randrange(n)}),
+    "details for product": (
+        'SELECT * FROM productionorderdetails WHERE "productID" = :id',
+        lambda n: {"id": random.randrange(n)}),
+}
+STATUSES = ["Planned", "In Progress", "Completed"]
+
+
+def populate(engine, rows: int, batch: int = 50000):
+    with engine.begin() as conn:
+        for start in range(0, rows, batch):
+            ids = range(start, min(start + batch, rows))
+            conn.execute(models.Inventory.__table__.insert(), [
+                {"ID": i, "code": f"CODE{i}", "quantity_on_hand": 100, "quantity_locked": 0,
+                 "category": "Component"} for i in ids])
+            conn.execute(models.User.__table__.insert(), [
+                {"ID": i, "email": f"user{i}@example.com", "password": "x", "name": "n",
+                 "surname": "s"} for i in ids])
+            conn.execute(models.BillOfMaterials.__table__.insert(), [
+                {"ID": i, "parentProductID": random.randrange(rows), "childProductID": random.randrange(rows),
+                 "quantity": 1} for i in ids])
+            conn.execute(models.ProductionOrder.__table__.insert(), [
+                {"ID": i, "date": f"2025-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
+                 "productID": random.randrange(rows), "quantityRequested": 10, "quantityProduced": 0,
+                 "status": random.choice(STATUSES),
+                 "parentProductionOrderDetailsID": random.randrange(rows) if i % 3 else None}
+                for i in ids])
+            conn.execute(models.ProductionOrderDetails.__table__.insert(), [
+                {"ID": i, "productionOrderID": random.randrange(rows), "productID": random.randrange(rows),
+                 "quantityRequired": 10, "quantityLocked": 0} for i in ids])
+
+
+def measure(engine, rows: int, repeat: int):
+    results = {}
+    with engine.connect() as conn:
+        for name, (sql, params) in HOT_QUERIES.items():
+            plan = conn.execute(text("EXPLAIN QUERY PLAN " + sql), params(rows)).fetchall()
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                conn.execute(text(sql), params(rows)).fetchall()
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = (" | ".join(row[-1] for row in plan), statistics.median(timings))
+    return results
+
+
+def run(rows: int, repeat: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        for table in SQLModel.metadata.sorted_tables:
+            table.create(engine)
+            for index in list(table.indexes):
+                index.drop(engine)
+
+        populate(engine, rows)
+        before = measure(engine, rows, repeat)
+
+        for table in SQLModel.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(engine)
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+        after = measure(engine, rows, repeat)
+        engine.dispose()
+
+    print(f"\n=== {rows} rows (median of {repeat} runs) ===")
+    for name in HOT_QUERIES:
+        print(f"{name}")
+        print(f"  before: {before[name][1]:9.3f} ms  {before[name][0]}")
+        print(f"  after:  {after[name][1]:9.3f} ms  {after[name][0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    for rows in args.rows:
+        run(rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
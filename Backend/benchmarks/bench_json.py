@@ -0,0 +1,97 @@
+"""Serializzazione delle liste: ORM + response_model contro Core + orjson.
+
+Monta la stessa lettura dell'inventario in tre modi:
+
+    orm       select(Inventory) con response_model=List[Inventory]
+    dict      paginate (Core) con response_model=List[dict], validato riga per riga
+    orjson    paginate_response: righe Core scritte da ORJSONResponse
+
+e misura il tempo per richiesta su --rows righe. Richiede httpx e orjson.
+
+Uso (dalla cartella Backend):
+
+    python -m benchmarks.bench_json --rows 10000 100000 --repeat 5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+from fastapi import Depends, FastAPI, Response  # noqa: E402
+from sqlmodel import SQLModel, select  # noqa: E402
+from sqlmodel.ext.asyncio.session import AsyncSession  # noqa: E402
+
+from database import make_async_engine, make_engine  # noqa: E402
+from models import Inventory  # noqa: E402
+from pagination import paginate, paginate_response  # noqa: E402
+
+
+def build_app(url: str, rows: int):
+    engine = make_engine(url, echo=False)
+    async_engine = make_async_engine(url, echo=False)
+
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(Inventory.__table__.insert(), [
+            {"code": f"CODE{i:06d}", "category": "Component", "quantity_on_hand": i % 200,
+             "quantity_locked": 0, "datas": '{"supplier": "ACME", "notes": "Benchmark item"}'}
+            for i in range(rows)])
+    engine.dispose()
+
+    async def get_async_session():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
+    app = FastAPI()
+
+    @app.get("/orm", response_model=List[Inventory])
+    async def read_orm(session: AsyncSession = Depends(get_async_session)):
+        return (await session.exec(select(Inventory).order_by(Inventory.ID))).all()
+
+    @app.get("/dict", response_model=List[dict])
+    async def read_dict(response: Response, session: AsyncSession = Depends(get_async_session)):
+        return await paginate(session, Inventory, response, limit=None)
+
+    @app.get("/orjson", response_model=List[dict])
+    async def read_orjson(response: Response, session: AsyncSession = Depends(get_async_session)):
+        return await paginate_response(session, Inventory, response, limit=None)
+
+    return app, async_engine
+
+
+async def measure(client, path: str, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = await client.get(path)
+        response.raise_for_status()
+        samples.append(time.perf_counter() - start)
+    return min(samples) * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            app, async_engine = build_app(f"sqlite:///{os.path.join(tmp, 'bench.db')}", rows)
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                timings = {path: await measure(client, f"/{path}", args.repeat)
+                           for path in ("orm", "dict", "orjson")}
+            await async_engine.dispose()
+        print(f"rows={rows:7d}  " + "  ".join(f"{path}={ms:8.1f} ms" for path, ms in timings.items())
+              + f"  speedup={timings['orm'] / timings['orjson']:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+"""Costo del registro movimenti e delle query di giacenza a una data.
+
+1. Latenza di un carico (apply_inventory_addition, il percorso delle scansioni)
+   con e senza la scrittura del registro.
+2. stock_at ricostruendo tutta la storia contro fotografia + delta.
+
+Uso (dalla cartella Backend):
+
+    python -m benchmarks.bench_ledger --items 1000 --movements 200000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, insert  # noqa: E402
+from sqlalchemy.orm import Session as OrmSession  # noqa: E402
+from sqlmodel import Session, SQLModel  # noqa: E402
+
+import ledger  # noqa: E402
+from database import make_engine  # noqa: E402
+from models import Inventory, InventoryMovement  # noqa: E402
+from routers.inventory import QuantityPayload, apply_inventory_addition  # noqa: E402
+
+
+def populate(engine, items: int, movements: int):
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(Inventory.__table__.insert(), [
+            {"ID": i, "code": f"CODE{i}", "quantity_on_hand": 0, "quantity_locked": 0,
+             "category": "Component"} for i in range(1, items + 1)])
+        timestamp = ledger.now()
+        for start in range(0, movements, 10000):
+            conn.execute(insert(InventoryMovement), [
+                {"timestamp": timestamp, "itemID": random.randint(1, items), "kind": "add",
+                 "on_hand_delta": 1, "locked_delta": 0}
+                for _ in range(start, min(start + 10000, movements))])
+
+
+def time_additions(engine, items: int, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        with Session(engine) as session:
+            item = session.get(Inventory, random.randint(1, items))
+            apply_inventory_addition(item, QuantityPayload(quantity=1), session)
+    return (time.perf_counter() - start) / count * 1000
+
+
+def time_stock_at(engine, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        with Session(engine) as session:
+            ledger.stock_at(session, ledger.now())
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--movements", type=int, default=200000)
+    parser.add_argument("--additions", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", echo=False)
+        populate(engine, args.items, args.movements)
+
+        event.remove(OrmSession, "before_commit", ledger._write_movements)
+        without_ledger = time_additions(engine, args.items, args.additions)
+        event.listen(OrmSession, "before_commit", ledger._write_movements)
+        with_ledger = time_additions(engine, args.items, args.additions)
+        print(f"carico senza registro: {without_ledger:7.3f} ms  con registro: {with_ledger:7.3f} ms")
+
+        replay = time_stock_at(engine, 5)
+        with Session(engine) as session:
+            ledger.take_snapshot(session)
+        # delta limitato dopo la fotografia
+        time_additions(engine, args.items, 100)
+        snapshot = time_stock_at(engine, 5)
+        print(f"stock_at replay completo: {replay:8.2f} ms  fotografia + delta: {snapshot:8.2f} ms")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Latenza di GET /inventory/ durante una raffica di login.
+
+Misura p50/p99 delle letture dell'inventario da sole e mentre N utenti fanno
+login in contemporanea (bcrypt nel pool di processi di security.py).
+Richiede httpx.
+
+Uso (dalla cartella Backend):
+
+    python -m benchmarks.bench_login_storm --logins 50 --readers 10
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+# database.py apre database.db nella cartella corrente
+os.chdir(tempfile.mkdtemp())
+
+import httpx  # noqa: E402
+from sqlmodel import SQLModel, Session  # noqa: E402
+
+from database import engine  # noqa: E402
+from main import app  # noqa: E402
+from models import Inventory, User  # noqa: E402
+from security import hash_password, shutdown_password_pool  # noqa: E402
+
+
+def setup(users: int, items: int):
+    engine.echo = False
+    SQLModel.metadata.create_all(engine)
+    password = hash_password("password")
+    with Session(engine) as session:
+        for i in range(users):
+            session.add(User(email=f"operator{i}@example.com", password=password,
+                             name="Op", surname=str(i)))
+        for i in range(items):
+            session.add(Inventory(code=f"CODE{i}", quantity_on_hand=10, quantity_locked=0,
+                                  category="Component"))
+        session.commit()
+
+
+async def read_inventory(client, stop: asyncio.Event, latencies: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get("/inventory/", params={"limit": 50})
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def login(client, i: int):
+    response = await client.post("/users/login", data={
+        "username": f"operator{i}@example.com", "password": "password"})
+    response.raise_for_status()
+
+
+async def phase(client, readers: int, duration: float, logins: int):
+    latencies = []
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(read_inventory(client, stop, latencies)) for _ in range(readers)]
+    start = time.perf_counter()
+    if logins:
+        await asyncio.gather(*(login(client, i) for i in range(logins)))
+    remaining = duration - (time.perf_counter() - start)
+    if remaining > 0:
+        await asyncio.sleep(remaining)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return latencies, time.perf_counter() - start
+
+
+def report(name: str, latencies: list, elapsed: float):
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"{name:<14} requests={len(latencies):6d}  elapsed={elapsed:6.2f}s  "
+          f"p50={quantiles[49]:7.2f}ms  p99={quantiles[98]:7.2f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--readers", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=3.0)
+    args = parser.parse_args()
+
+    setup(args.logins, 500)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        report("baseline", *await phase(client, args.readers, args.duration, 0))
+        report("login storm", *await phase(client, args.readers, args.duration, args.logins))
+    shutdown_password_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
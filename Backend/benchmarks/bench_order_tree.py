@@ -0,0 +1,129 @@
+"""Cambio di stato e cancellazione di alberi di ordini: ricorsione contro CTE.
+
+"old" è la vecchia implementazione ricorsiva (una query per ordine e per
+dettaglio), "new" è order_tree (CTE ricorsiva + UPDATE/DELETE di gruppo).
+Riporta tempo e numero di statement SQL per albero.
+
+Uso (dalla cartella Backend):
+
+    python -m benchmarks.bench_order_tree --depth 6 --fanout 2 --trees 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event  # noqa: E402
+from sqlmodel import Session, SQLModel, select  # noqa: E402
+
+import order_tree  # noqa: E402
+from database import make_engine  # noqa: E402
+from models import Inventory, ProductionOrder, ProductionOrderDetails  # noqa: E402
+
+COMPONENTS = 5
+
+
+def old_update_status(item_id: int, new_status: str, session: Session):
+    item = session.get(ProductionOrder, item_id)
+    order_tree.check_status_transition(item.status, new_status)
+    sub_orders = session.exec(select(ProductionOrder).where(
+        ProductionOrder.parentProductionOrderDetailsID == item_id)).all()
+    for sub_order in sub_orders:
+        old_update_status(sub_order.ID, new_status, session)
+    item.status = new_status
+
+
+def old_delete(item_id: int, session: Session):
+    item = session.get(ProductionOrder, item_id)
+    sub_orders = session.exec(select(ProductionOrder).where(
+        ProductionOrder.parentProductionOrderDetailsID == item_id)).all()
+    for sub_order in sub_orders:
+        old_delete(sub_order.ID, session)
+    details = session.exec(select(ProductionOrderDetails).where(
+        ProductionOrderDetails.productionOrderID == item_id)).all()
+    for detail in details:
+        inventory_item = session.get(Inventory, detail.productID)
+        inventory_item.quantity_locked -= detail.quantityLocked
+        inventory_item.quantity_on_hand += detail.quantityLocked
+        session.delete(detail)
+    session.delete(item)
+
+
+def build_tree(session: Session, depth: int, fanout: int, parent=None) -> int:
+    order = ProductionOrder(date="2025-01-01", productID=1, quantityRequested=1,
+                            quantityProduced=0, status="Planned",
+                            parentProductionOrderDetailsID=parent)
+    session.add(order)
+    session.flush()
+    for component in range(COMPONENTS):
+        session.add(ProductionOrderDetails(productionOrderID=order.ID, productID=component + 1,
+                                           quantityRequired=2, quantityLocked=1))
+    if depth > 1:
+        for _ in range(fanout):
+            build_tree(session, depth - 1, fanout, order.ID)
+    return order.ID
+
+
+def run(name, engine, args, update_status, delete):
+    with Session(engine) as session:
+        roots = [build_tree(session, args.depth, args.fanout) for _ in range(args.trees)]
+        session.commit()
+
+    statements = 0
+
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    start = time.perf_counter()
+    for root in roots:
+        with Session(engine) as session:
+            update_status(session, root)
+            session.commit()
+    status_time = time.perf_counter() - start
+    status_statements, statements = statements, 0
+
+    start = time.perf_counter()
+    for root in roots:
+        with Session(engine) as session:
+            delete(session, root)
+            session.commit()
+    delete_time = time.perf_counter() - start
+    event.remove(engine, "before_cursor_execute", count)
+
+    print(f"{name:<4} stato: {status_time / args.trees * 1000:8.2f} ms {status_statements / args.trees:7.1f} stmt  "
+          f"cancellazione: {delete_time / args.trees * 1000:8.2f} ms {statements / args.trees:7.1f} stmt")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--depth", type=int, default=6)
+    parser.add_argument("--fanout", type=int, default=2)
+    parser.add_argument("--trees", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", echo=False)
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            for i in range(COMPONENTS):
+                session.add(Inventory(ID=i + 1, code=f"C{i}", quantity_on_hand=0,
+                                      quantity_locked=10 ** 6, category="Component"))
+            session.commit()
+
+        print(f"{sum(args.fanout ** level for level in range(args.depth))} ordini per albero")
+        run("old", engine, args,
+            lambda s, root: old_update_status(root, "In Progress", s),
+            lambda s, root: old_delete(root, s))
+        run("new", engine, args,
+            lambda s, root: order_tree.update_status(s, root, "In Progress"),
+            lambda s, root: order_tree.delete_tree(s, root))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Tempo di un giro MRP (planning.load + planning.plan) su dati generati.
+
+Genera SKU su più livelli di distinta base e ordini aperti con i loro
+dettagli, poi misura separatamente lettura dal database e calcolo.
+
+Uso (dalla cartella Backend):
+
+    python -m benchmarks.bench_planning --skus 20000 --orders 50000 --bucket week
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlmodel import Session, SQLModel  # noqa: E402
+
+import planning  # noqa: E402
+from database import make_engine  # noqa: E402
+from models import BillOfMaterials, Inventory, ProductionOrder, ProductionOrderDetails  # noqa: E402
+
+LEVELS = 4
+COMPONENTS = 4
+
+
+def populate(engine, args):
+    rng = random.Random(args.seed)
+    # SKU divisi in livelli: quelli del livello i usano componenti del livello i+1
+    levels = [list(range(level + 1, args.skus + 1, LEVELS)) for level in range(LEVELS)]
+    boms = []
+    for level in range(LEVELS - 1):
+        for parent in levels[level]:
+            for child in rng.sample(levels[level + 1], COMPONENTS):
+                boms.append({"parentProductID": parent, "childProductID": child,
+                             "quantity": rng.randint(1, 5)})
+    components = {}
+    for bom in boms:
+        components.setdefault(bom["parentProductID"], []).append(bom)
+
+    orders = []
+    details = []
+    for order_id in range(1, args.orders + 1):
+        product = rng.choice(levels[0] + levels[1])
+        requested = rng.randint(1, 50)
+        orders.append({"ID": order_id, "date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                       "productID": product, "quantityRequested": requested,
+                       "quantityProduced": 0, "status": rng.choice(planning.OPEN_STATUSES)})
+        for bom in components.get(product, []):
+            required = bom["quantity"] * requested
+            details.append({"productionOrderID": order_id, "productID": bom["childProductID"],
+                            "quantityRequired": required,
+                            "quantityLocked": rng.randint(0, required)})
+
+    with engine.begin() as conn:
+        conn.execute(Inventory.__table__.insert(), [
+            {"ID": i, "code": f"SKU{i}", "quantity_on_hand": rng.randint(0, 500),
+             "quantity_locked": 0, "category": "Component"} for i in range(1, args.skus + 1)])
+        conn.execute(BillOfMaterials.__table__.insert(), boms)
+        conn.execute(ProductionOrder.__table__.insert(), orders)
+        conn.execute(ProductionOrderDetails.__table__.insert(), details)
+    return len(boms), len(details)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--skus", type=int, default=20000)
+    parser.add_argument("--orders", type=int, default=50000)
+    parser.add_argument("--bucket", choices=planning.BUCKETS, default="week")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", echo=False)
+        SQLModel.metadata.create_all(engine)
+        boms, details = populate(engine, args)
+        print(f"{args.skus} SKU, {boms} righe di distinta, {args.orders} ordini, {details} dettagli")
+
+        start = time.perf_counter()
+        with Session(engine) as session:
+            data = planning.load(session)
+        load_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = planning.plan(data, args.bucket)
+        plan_time = time.perf_counter() - start
+        engine.dispose()
+
+    print(f"lettura: {load_time * 1000:8.1f} ms  calcolo: {plan_time * 1000:8.1f} ms  "
+          f"({len(result['buckets'])} periodi, {len(result['shortages'])} mancanze, "
+          f"{len(result['suggestedOrders'])} ordini suggeriti)")
+
+
+if __name__ == "__main__":
+    main()
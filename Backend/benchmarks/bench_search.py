@@ -0,0 +1,89 @@
+"""Latenza di GET /inventory/search (search.find) su un catalogo grande.
+
+Crea --items articoli con attributi in datas, costruisce l'indice FTS5 e
+misura p50/p95 delle ricerche tipiche: codice esatto da scanner, digitazione
+progressiva di un codice (1, 2, 3... caratteri) e parole degli attributi.
+
+Uso (dalla cartella Backend):
+
+    python -m benchmarks.bench_search --items 1000000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlmodel import Session, SQLModel  # noqa: E402
+
+import search  # noqa: E402
+from benchmarks import results  # noqa: E402
+from database import make_engine  # noqa: E402
+from models import Inventory  # noqa: E402
+
+SUPPLIERS = ["ACME", "Fastenal", "Würth", "Bossard", "Misumi", "RS Components", "Farnell", "Bosch"]
+MATERIALS = ["steel", "zinc", "brass", "aluminium", "nylon", "stainless"]
+CATEGORIES = ["Component", "Subassembly", "Product"]
+BATCH = 50000
+
+
+def populate(engine, items: int, rng: random.Random):
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        search.install(conn)
+        for start in range(0, items, BATCH):
+            conn.execute(Inventory.__table__.insert(), [
+                {"code": f"{rng.choice('ABCDEFGH')}{i:07d}", "category": rng.choice(CATEGORIES),
+                 "quantity_on_hand": rng.randint(0, 200), "quantity_locked": 0,
+                 "datas": json.dumps({"supplier": rng.choice(SUPPLIERS), "material": rng.choice(MATERIALS),
+                                      "size": f"M{rng.randint(2, 24)}"})}
+                for i in range(start, min(start + BATCH, items))])
+        conn.exec_driver_sql(f"INSERT INTO {search.FTS_TABLE}({search.FTS_TABLE}) VALUES ('optimize')")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=200, help="Queries per kind")
+    parser.add_argument("--limit", type=int, default=search.SEARCH_LIMIT)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", echo=False)
+        start = time.perf_counter()
+        populate(engine, args.items, rng)
+        print(f"{args.items} articoli indicizzati in {time.perf_counter() - start:.1f} s")
+
+        with Session(engine) as session:
+            codes = [row[0] for row in session.connection().exec_driver_sql(
+                f"SELECT code FROM inventory WHERE ID IN "
+                f"({','.join(str(rng.randint(1, args.items)) for _ in range(args.queries))})")]
+            kinds = {
+                "exact code": codes,
+                "typeahead 1": [code[:1] for code in codes],
+                "typeahead 3": [code[:3] for code in codes],
+                "typeahead 5": [code[:5] for code in codes],
+                "attribute": [rng.choice(SUPPLIERS).split()[0] for _ in codes],
+                "two words": [f"{rng.choice(MATERIALS)} {rng.choice(SUPPLIERS).split()[0]}" for _ in codes],
+            }
+            for kind, queries in kinds.items():
+                samples = []
+                begin = time.perf_counter()
+                for q in queries:
+                    query_start = time.perf_counter()
+                    search.find(session, q, args.limit)
+                    samples.append(time.perf_counter() - query_start)
+                summary = results.summarize(samples, time.perf_counter() - begin)
+                print(f"{kind:<12} p50 {summary['p50']:7.2f} ms  p95 {summary['p95']:7.2f} ms  "
+                      f"p99 {summary['p99']:7.2f} ms")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
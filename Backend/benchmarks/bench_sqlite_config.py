@@ -0,0 +1,94 @@
+"""Lettori e scrittori concorrenti: configurazione SQLite vecchia contro nuova.
+
+"old" è il vecchio create_engine(url) senza pragma, "new" è database.make_engine
+(WAL, synchronous=NORMAL, busy_timeout, cache, mmap, pool dimensionato).
+
+Uso (dalla cartella Backend):
+
+    python -m benchmarks.bench_sqlite_config --readers 8 --writers 4 --duration 5
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, select, update  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlmodel import SQLModel  # noqa: E402
+
+from database import make_engine  # noqa: E402
+from models import Inventory  # noqa: E402
+
+ITEMS = 10000
+
+
+def populate(engine):
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(Inventory.__table__.insert(), [
+            {"ID": i, "code": f"CODE{i}", "quantity_on_hand": 100, "quantity_locked": 0,
+             "category": "Component"} for i in range(ITEMS)])
+
+
+def reader(engine, stop, counters):
+    while not stop.is_set():
+        try:
+            with engine.connect() as conn:
+                conn.execute(select(Inventory).where(
+                    Inventory.code == f"CODE{random.randrange(ITEMS)}")).all()
+            counters["reads"] += 1
+        except OperationalError:
+            counters["errors"] += 1
+
+
+def writer(engine, stop, counters):
+    while not stop.is_set():
+        try:
+            with engine.begin() as conn:
+                conn.execute(update(Inventory)
+                             .where(Inventory.ID == random.randrange(ITEMS))
+                             .values(quantity_on_hand=Inventory.quantity_on_hand + 1))
+            counters["writes"] += 1
+        except OperationalError:
+            counters["errors"] += 1
+
+
+def run(name, engine, readers, writers, duration):
+    populate(engine)
+    stop = threading.Event()
+    counters = {"reads": 0, "writes": 0, "errors": 0}
+    threads = [threading.Thread(target=reader, args=(engine, stop, counters)) for _ in range(readers)]
+    threads += [threading.Thread(target=writer, args=(engine, stop, counters)) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    print(f"{name:<4} reads/s={counters['reads'] / duration:9.1f}  "
+          f"writes/s={counters['writes'] / duration:8.1f}  errors={counters['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        old_url = f"sqlite:///{os.path.join(tmp, 'old.db')}"
+        new_url = f"sqlite:///{os.path.join(tmp, 'new.db')}"
+        run("old", create_engine(old_url, connect_args={"check_same_thread": False}),
+            args.readers, args.writers, args.duration)
+        run("new", make_engine(new_url, echo=False), args.readers, args.writers, args.duration)
+
+
+if __name__ == "__main__":
+    main()
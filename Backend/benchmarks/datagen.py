@@ -0,0 +1,152 @@
+"""Generatore di dati sintetici per benchmark e prove di carico.
+
+Crea articoli (prodotti, semilavorati su più livelli, componenti), distinte
+base profonde, ordini di produzione aperti con i loro dettagli e utenti, a
+scale configurabili. Stesso seed, stessi dati.
+
+Uso (dalla cartella Backend):
+
+    python -m benchmarks.datagen --scale medium --database bench.db
+    python -m benchmarks.datagen --scale small --depth 6 --orders 2000 --database bench.db
+"""
+import argparse
+import os
+import random
+import sys
+from dataclasses import asdict, dataclass, replace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlmodel import SQLModel  # noqa: E402
+
+from database import make_engine  # noqa: E402
+from models import (BillOfMaterials, Inventory, ProductionOrder,  # noqa: E402
+                    ProductionOrderDetails, User)
+from security import hash_password  # noqa: E402
+
+PASSWORD = "password"
+
+
+@dataclass
+class Scale:
+    products: int
+    depth: int        # livelli di distinta sotto il prodotto finito
+    fanout: int       # componenti per distinta
+    components: int
+    orders: int
+    users: int
+
+
+SCALES = {
+    "small": Scale(products=50, depth=3, fanout=3, components=200, orders=500, users=5),
+    "medium": Scale(products=500, depth=4, fanout=3, components=2000, orders=5000, users=20),
+    "large": Scale(products=5000, depth=5, fanout=4, components=20000, orders=50000, users=100),
+}
+
+
+def product_code(i: int) -> str:
+    return f"P{i:06d}"
+
+
+def component_code(i: int) -> str:
+    return f"C{i:06d}"
+
+
+def generate(engine, scale: Scale, seed: int = 1) -> dict:
+    rng = random.Random(seed)
+    items = []
+    next_id = 1
+
+    def add_items(count: int, code, category: str) -> list:
+        nonlocal next_id
+        ids = list(range(next_id, next_id + count))
+        for n, ID in enumerate(ids):
+            items.append({"ID": ID, "code": code(n), "category": category,
+                          "quantity_on_hand": rng.randint(0, 200), "quantity_locked": 0})
+        next_id += count
+        return ids
+
+    # Livello 0 i prodotti, poi un gruppo di semilavorati per livello (condivisi
+    # tra più distinte, come nella realtà), in fondo i componenti
+    levels = [add_items(scale.products, product_code, "Product")]
+    for level in range(1, scale.depth):
+        levels.append(add_items(scale.products, lambda n, level=level: f"S{level}-{n:06d}",
+                                "Subassembly"))
+    levels.append(add_items(scale.components, component_code, "Component"))
+
+    boms = []
+    children = {}
+    for level in range(len(levels) - 1):
+        for parent in levels[level]:
+            for child in rng.sample(levels[level + 1], min(scale.fanout, len(levels[level + 1]))):
+                quantity = rng.randint(1, 4)
+                boms.append({"parentProductID": parent, "childProductID": child, "quantity": quantity})
+                children.setdefault(parent, []).append((child, quantity))
+
+    orders = []
+    details = []
+    for order_id in range(1, scale.orders + 1):
+        product = rng.choice(levels[0])
+        requested = rng.randint(1, 20)
+        orders.append({"ID": order_id, "productID": product,
+                       "date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                       "quantityRequested": requested, "quantityProduced": 0,
+                       "status": rng.choice(["Planned", "In Progress"]),
+                       "priority": rng.randint(0, 5)})
+        for child, quantity in children.get(product, []):
+            required = quantity * requested
+            details.append({"productionOrderID": order_id, "productID": child,
+                            "quantityRequired": required, "quantityLocked": rng.randint(0, required)})
+
+    # Le quantità bloccate dei dettagli devono tornare con l'inventario
+    locked = {}
+    for detail in details:
+        locked[detail["productID"]] = locked.get(detail["productID"], 0) + detail["quantityLocked"]
+    for item in items:
+        item["quantity_locked"] = locked.get(item["ID"], 0)
+
+    password = hash_password(PASSWORD)
+    users = [{"email": f"operator{i}@example.com", "password": password,
+              "name": "Operator", "surname": str(i)} for i in range(scale.users)]
+
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for table, rows in ((Inventory.__table__, items), (BillOfMaterials.__table__, boms),
+                            (ProductionOrder.__table__, orders),
+                            (ProductionOrderDetails.__table__, details), (User.__table__, users)):
+            if rows:
+                conn.execute(table.insert(), rows)
+
+    return {"items": len(items), "boms": len(boms), "orders": len(orders),
+            "details": len(details), "users": len(users)}
+
+
+def add_scale_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    for field in ("products", "depth", "fanout", "components", "orders", "users"):
+        parser.add_argument(f"--{field}", type=int, help=f"Override {field} of the chosen scale")
+    parser.add_argument("--seed", type=int, default=1)
+
+
+def scale_from_args(args) -> Scale:
+    overrides = {field: getattr(args, field) for field in asdict(SCALES[args.scale])
+                 if getattr(args, field) is not None}
+    return replace(SCALES[args.scale], **overrides)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_scale_arguments(parser)
+    parser.add_argument("--database", required=True, help="SQLite file to create")
+    args = parser.parse_args()
+
+    if os.path.exists(args.database):
+        parser.error(f"{args.database} already exists")
+    engine = make_engine(f"sqlite:///{os.path.abspath(args.database)}", echo=False)
+    counts = generate(engine, scale_from_args(args), args.seed)
+    engine.dispose()
+    print(", ".join(f"{count} {name}" for name, count in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
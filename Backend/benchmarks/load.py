@@ -0,0 +1,150 @@
+"""Prova di carico HTTP in-process sull'app FastAPI (httpx + ASGITransport).
+
+Carica dati generati (benchmarks.datagen), avvia l'app con il suo lifespan e
+lancia --concurrency client che per --duration secondi scelgono le
+richieste secondo --mix:
+
+    scan      POST /inventory/{code}/addbycode/   (scansione di un carico)
+    read      GET  /inventory/?limit=50
+    order     POST /orders/
+    planning  POST /planning/run
+
+Per ogni tipo di richiesta riporta p50/p95/p99, throughput ed errori; i
+risultati vanno in benchmarks/results/ (o --output).
+
+Uso (dalla cartella Backend):
+
+    python -m benchmarks.load --scale small --concurrency 20 --duration 30
+    python -m benchmarks.load --mix scan=90,planning=10 --compare benchmarks/results/load-OLD.json
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# database.py legge LITEERP_DATABASE_URL e payload.sql dalla cartella corrente
+os.chdir(tempfile.mkdtemp())
+os.environ.setdefault("LITEERP_DATABASE_URL", f"sqlite:///{os.path.join(os.getcwd(), 'bench.db')}")
+open("payload.sql", "w").close()
+
+import httpx  # noqa: E402
+from sqlmodel import Session, select  # noqa: E402
+
+import main  # noqa: E402
+from auth import create_access_token  # noqa: E402
+from benchmarks import datagen, results  # noqa: E402
+from database import engine  # noqa: E402
+from models import Inventory  # noqa: E402
+
+DEFAULT_MIX = "scan=70,read=20,order=8,planning=2"
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight)
+    unknown = set(mix) - {"scan", "read", "order", "planning"}
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Unknown request types: {sorted(unknown)}")
+    return mix
+
+
+def request_factory(products: list, components: list, rng: random.Random):
+    def scan():
+        return "POST", f"/inventory/{rng.choice(components)}/addbycode/", {"quantity": rng.randint(1, 10)}
+
+    def read():
+        return "GET", "/inventory/?limit=50", None
+
+    def order():
+        return "POST", "/orders/", {
+            "date": f"2025-{rng.randint(1, 12):02d}-01", "productID": rng.choice(products),
+            "quantityRequested": rng.randint(1, 5), "quantityProduced": 0, "status": "Planned"}
+
+    def planning():
+        return "POST", "/planning/run", {"bucket": "week"}
+
+    return {"scan": scan, "read": read, "order": order, "planning": planning}
+
+
+async def drive(client, args, factories: dict, mix: dict):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    rng = random.Random(args.seed)
+    deadline = time.perf_counter() + args.duration
+
+    async def client_loop():
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            method, url, body = factories[name]()
+            begin = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            latencies[name].append(time.perf_counter() - begin)
+            if response.status_code >= 400:
+                errors[name] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(args.concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+async def main_async():
+    parser = argparse.ArgumentParser(description=__doc__)
+    datagen.add_scale_arguments(parser)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument("--output", help="JSON file for the results")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0)
+    args = parser.parse_args()
+
+    engine.echo = False
+    scale = datagen.scale_from_args(args)
+    counts = datagen.generate(engine, scale, args.seed)
+    print(", ".join(f"{count} {name}" for name, count in counts.items()))
+    with Session(engine) as session:
+        products = session.exec(select(Inventory.ID).where(Inventory.category == "Product")).all()
+        components = session.exec(select(Inventory.code).where(Inventory.category == "Component")).all()
+
+    token = create_access_token({"sub": "operator0@example.com"}, timedelta(hours=1))
+    factories = request_factory(products, components, random.Random(args.seed))
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None,
+                                     headers={"Authorization": f"Bearer {token}"}) as client:
+            latencies, errors, elapsed = await drive(client, args, factories, args.mix)
+
+    metrics = {}
+    for name, samples in sorted(latencies.items()):
+        metrics[name] = results.summarize(samples, elapsed)
+        metrics[name]["errors"] = errors[name]
+    metrics["total"] = results.summarize([s for samples in latencies.values() for s in samples], elapsed)
+    metrics["total"]["errors"] = sum(errors.values())
+
+    for name, summary in metrics.items():
+        print(f"{name:<9} {summary['count']:7d} req  p50 {summary['p50']:8.2f} ms  "
+              f"p95 {summary['p95']:8.2f} ms  p99 {summary['p99']:8.2f} ms  "
+              f"{summary['throughput']:8.1f} req/s  {summary['errors']} errori")
+
+    path = results.save("load", {"scale": vars(scale), "concurrency": args.concurrency,
+                                 "duration": args.duration, "mix": args.mix, "seed": args.seed,
+                                 "data": counts}, metrics, args.output)
+    print(f"risultati in {path}")
+    if args.compare:
+        regressions = results.compare(results.load(args.compare), results.load(path), args.threshold)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async())
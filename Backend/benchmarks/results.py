@@ -0,0 +1,111 @@
+"""Risultati dei benchmark in JSON e confronto con un'esecuzione precedente.
+
+Ogni file contiene parametri, ambiente (commit git, Python) e metriche; le
+metriche sono latenze in millisecondi (più basso è meglio) e throughput in
+operazioni al secondo (più alto è meglio).
+
+Uso (dalla cartella Backend):
+
+    python -m benchmarks.results benchmarks/results/suite-OLD.json benchmarks/results/suite-NEW.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import List
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+# Metriche in cui un valore più alto è un miglioramento
+HIGHER_IS_BETTER = ("throughput",)
+
+
+def percentile(samples: List[float], p: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def summarize(samples: List[float], elapsed: float = None) -> dict:
+    # samples in secondi, risultato in millisecondi
+    ms = [s * 1000 for s in samples]
+    summary = {
+        "count": len(ms),
+        "mean": round(sum(ms) / len(ms), 3) if ms else 0.0,
+        "p50": round(percentile(ms, 50), 3),
+        "p95": round(percentile(ms, 95), 3),
+        "p99": round(percentile(ms, 99), 3),
+    }
+    if elapsed:
+        summary["throughput"] = round(len(ms) / elapsed, 1)
+    return summary
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=os.path.dirname(RESULTS_DIR)).stdout.strip()
+    except OSError:
+        return ""
+
+
+def save(name: str, parameters: dict, metrics: dict, output: str = None) -> str:
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "benchmark": name,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "parameters": parameters,
+            "metrics": metrics,
+        }, f, indent=2)
+    return output
+
+
+def compare(baseline: dict, current: dict, threshold: float = 10.0) -> int:
+    # Stampa le variazioni metrica per metrica; restituisce quante peggiorano
+    # oltre la soglia (in percentuale)
+    regressions = 0
+    for operation, values in current["metrics"].items():
+        old_values = baseline["metrics"].get(operation, {})
+        for metric, value in values.items():
+            old = old_values.get(metric)
+            if metric == "count" or not isinstance(value, (int, float)) or not old:
+                continue
+            change = (value - old) / old * 100
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            flag = ""
+            if worse > threshold:
+                regressions += 1
+                flag = "  REGRESSIONE"
+            print(f"{operation:<24} {metric:<10} {old:10.3f} -> {value:10.3f} {change:+7.1f}%{flag}")
+    return regressions
+
+
+def load(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Percent change counted as a regression")
+    args = parser.parse_args()
+    regressions = compare(load(args.baseline), load(args.current), args.threshold)
+    print(f"{regressions} regressioni oltre il {args.threshold:g}%")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Stress test concorrente sulle giacenze.
+
+Più processi (come più worker uvicorn) eseguono in parallelo carichi, scarichi,
+rilasci e cancellazioni di ordini sullo stesso database SQLite, usando le stesse funzioni
+delle route con run_with_retry. Alla fine verifica che:
+
+- nessuna giacenza sia negativa;
+- quantity_locked di ogni articolo sia la somma dei quantityLocked dei dettagli;
+- on_hand + locked di ogni articolo = iniziale + carichi - scarichi riusciti;
+- il registro dei movimenti ricostruisca esattamente le giacenze attuali.
+
+Uso (dalla cartella Backend):
+
+    python -m benchmarks.stress_stock --workers 4 --operations 300
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import HTTPException  # noqa: E402
+from sqlalchemy import func  # noqa: E402
+from sqlmodel import Session, SQLModel, select  # noqa: E402
+
+import ledger  # noqa: E402
+from database import make_engine  # noqa: E402
+from models import BillOfMaterials, Inventory, ProductionOrder, ProductionOrderDetails  # noqa: E402
+from routers.inventory import QuantityPayload, apply_inventory_addition  # noqa: E402
+from routers.production_order import create_order, delete_order  # noqa: E402
+from stock import remove_stock, run_with_retry  # noqa: E402
+
+INITIAL_STOCK = 50
+PRODUCTS = 3
+COMPONENTS = 8
+
+
+def setup(url: str):
+    engine = make_engine(url, echo=False)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        for i in range(PRODUCTS):
+            session.add(Inventory(ID=i + 1, code=f"P{i}", quantity_on_hand=0,
+                                  quantity_locked=0, category="Product"))
+        for i in range(COMPONENTS):
+            session.add(Inventory(ID=PRODUCTS + i + 1, code=f"C{i}", quantity_on_hand=INITIAL_STOCK,
+                                  quantity_locked=0, category="Component"))
+            ledger.record(session, PRODUCTS + i + 1, "opening", INITIAL_STOCK)
+        for p in range(1, PRODUCTS + 1):
+            for c in random.sample(range(PRODUCTS + 1, PRODUCTS + COMPONENTS + 1), 3):
+                session.add(BillOfMaterials(parentProductID=p, childProductID=c,
+                                            quantity=random.randint(1, 3)))
+        session.commit()
+    engine.dispose()
+
+
+def worker(url: str, operations: int, seed: int) -> Counter:
+    random.seed(seed)
+    engine = make_engine(url, echo=False)
+    delta = Counter()
+    items = list(range(1, PRODUCTS + COMPONENTS + 1))
+    for _ in range(operations):
+        kind = random.choice(["add", "remove", "order", "order", "cancel"])
+        item_id = random.choice(items)
+        quantity = random.randint(1, 10)
+        with Session(engine) as session:
+            try:
+                if kind == "add":
+                    run_with_retry(session, lambda s: apply_inventory_addition(
+                        s.get(Inventory, item_id), QuantityPayload(quantity=quantity), s))
+                    delta[item_id] += quantity
+                elif kind == "remove":
+                    run_with_retry(session, lambda s: remove_stock(s, item_id, quantity))
+                    delta[item_id] -= quantity
+                elif kind == "cancel":
+                    root = session.exec(select(ProductionOrder.ID).where(
+                        ProductionOrder.parentProductionOrderDetailsID.is_(None))
+                        .order_by(func.random()).limit(1)).first()
+                    if root is not None:
+                        run_with_retry(session, lambda s: delete_order(root, s))
+                else:
+                    product_id = random.randint(1, PRODUCTS)
+                    run_with_retry(session, lambda s: create_order(ProductionOrder(
+                        date="2025-01-01", productID=product_id, quantityRequested=quantity,
+                        quantityProduced=0, status="In Progress"), s))
+            except HTTPException:
+                session.rollback()
+    engine.dispose()
+    return delta
+
+
+def check(url: str, delta: Counter) -> bool:
+    engine = make_engine(url, echo=False)
+    ok = True
+    with Session(engine) as session:
+        locked_by_product = dict(session.exec(
+            select(ProductionOrderDetails.productID, func.sum(ProductionOrderDetails.quantityLocked))
+            .group_by(ProductionOrderDetails.productID)).all())
+        replayed = ledger.stock_at(session, ledger.now())
+        for item in session.exec(select(Inventory).order_by(Inventory.ID)):
+            initial = 0 if item.category == "Product" else INITIAL_STOCK
+            expected_total = initial + delta[item.ID]
+            problems = []
+            if item.quantity_on_hand < 0:
+                problems.append("negative stock")
+            if item.quantity_locked != locked_by_product.get(item.ID, 0):
+                problems.append(f"locked {item.quantity_locked} != details {locked_by_product.get(item.ID, 0)}")
+            if item.quantity_on_hand + item.quantity_locked != expected_total:
+                problems.append(f"total {item.quantity_on_hand + item.quantity_locked} != {expected_total}")
+            from_ledger = replayed.get(item.ID, {"quantity_on_hand": 0, "quantity_locked": 0})
+            if (from_ledger["quantity_on_hand"], from_ledger["quantity_locked"]) != \
+                    (item.quantity_on_hand, item.quantity_locked):
+                problems.append(f"ledger {from_ledger}")
+            ok = ok and not problems
+            print(f"{item.code:<4} on_hand={item.quantity_on_hand:5d} locked={item.quantity_locked:5d} "
+                  f"{'OK' if not problems else 'FAIL: ' + '; '.join(problems)}")
+    engine.dispose()
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--operations", type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'stress.db')}"
+        setup(url)
+        with multiprocessing.Pool(args.workers) as pool:
+            deltas = pool.starmap(worker, [(url, args.operations, seed) for seed in range(args.workers)])
+        delta = Counter()
+        for worker_delta in deltas:
+            delta.update(worker_delta)
+        ok = check(url, delta)
+    print("invariants hold" if ok else "INVARIANTS VIOLATED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
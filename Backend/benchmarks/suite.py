@@ -0,0 +1,119 @@
+"""Micro-benchmark dei percorsi caldi su dati generati (benchmarks.datagen).
+
+Misura create_order, apply_inventory_addition, update_status e delete_order
+chiamandoli direttamente con una Session, come fanno le route: latenza
+p50/p95/p99, throughput e statement SQL per operazione. I risultati vanno
+in benchmarks/results/ (o --output) e si possono confrontare con un file
+precedente.
+
+Uso (dalla cartella Backend):
+
+    python -m benchmarks.suite --scale medium --operations 200
+    python -m benchmarks.suite --scale medium --compare benchmarks/results/suite-20250101-120000.json
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event  # noqa: E402
+from sqlmodel import Session, select  # noqa: E402
+
+from benchmarks import datagen, results  # noqa: E402
+from database import make_engine  # noqa: E402
+from models import Inventory, ProductionOrder  # noqa: E402
+from routers.inventory import QuantityPayload, apply_inventory_addition  # noqa: E402
+from routers.production_order import (create_order, delete_order,  # noqa: E402
+                                      update_production_order_status_backend)
+from stock import run_with_retry  # noqa: E402
+
+
+def measure(engine, operations: list) -> dict:
+    # operations: funzioni che ricevono una Session nuova
+    statements = 0
+
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    samples = []
+    event.listen(engine, "before_cursor_execute", count)
+    start = time.perf_counter()
+    for operation in operations:
+        with Session(engine) as session:
+            begin = time.perf_counter()
+            run_with_retry(session, operation)
+            samples.append(time.perf_counter() - begin)
+    elapsed = time.perf_counter() - start
+    event.remove(engine, "before_cursor_execute", count)
+
+    summary = results.summarize(samples, elapsed)
+    summary["statements"] = round(statements / max(len(operations), 1), 1)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    datagen.add_scale_arguments(parser)
+    parser.add_argument("--operations", type=int, default=200)
+    parser.add_argument("--output", help="JSON file for the results")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0)
+    args = parser.parse_args()
+
+    scale = datagen.scale_from_args(args)
+    rng = random.Random(args.seed)
+    metrics = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", echo=False)
+        counts = datagen.generate(engine, scale, args.seed)
+        print(", ".join(f"{count} {name}" for name, count in counts.items()))
+
+        with Session(engine) as session:
+            products = session.exec(select(Inventory.ID).where(Inventory.category == "Product")).all()
+            components = session.exec(select(Inventory.ID).where(Inventory.category == "Component")).all()
+
+        created = []
+
+        def create(session):
+            order = create_order(ProductionOrder(
+                date=f"2025-{rng.randint(1, 12):02d}-01", productID=rng.choice(products),
+                quantityRequested=rng.randint(1, 20), quantityProduced=0, status="Planned"), session)
+            created.append(order.ID)
+
+        def add(item_id):
+            return lambda session: apply_inventory_addition(
+                session.get(Inventory, item_id), QuantityPayload(quantity=rng.randint(1, 50)), session)
+
+        def start(order_id):
+            return lambda session: update_production_order_status_backend(order_id, "In Progress", session)
+
+        def delete(order_id):
+            return lambda session: delete_order(order_id, session)
+
+        metrics["create_order"] = measure(engine, [create] * args.operations)
+        metrics["apply_inventory_addition"] = measure(
+            engine, [add(rng.choice(components)) for _ in range(args.operations)])
+        metrics["update_status"] = measure(engine, [start(order_id) for order_id in created])
+        metrics["delete_order"] = measure(engine, [delete(order_id) for order_id in created])
+        engine.dispose()
+
+    for operation, summary in metrics.items():
+        print(f"{operation:<26} p50 {summary['p50']:8.2f} ms  p95 {summary['p95']:8.2f} ms  "
+              f"p99 {summary['p99']:8.2f} ms  {summary['throughput']:8.1f} op/s  "
+              f"{summary['statements']:6.1f} stmt/op")
+
+    path = results.save("suite", {"scale": vars(scale), "operations": args.operations,
+                                  "seed": args.seed, "data": counts}, metrics, args.output)
+    print(f"risultati in {path}")
+    if args.compare:
+        regressions = results.compare(results.load(args.compare), results.load(path), args.threshold)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import base64
+import binascii
+import hashlib
+import io
+import os
+import re
+import tempfile
+from typing import Optional, Tuple
+from urllib.parse import unquote_to_bytes
+
+# Archivio delle immagini per contenuto: il file si chiama come lo SHA-256
+# dei suoi byte (BLOB_DIR/ab/abcd...), quindi è immutabile e deduplicato.
+# Inventory.image contiene solo l'hash.
+BLOB_DIR = os.environ.get("LITEERP_BLOB_DIR", "blobs")
+IMAGE_MAX_BYTES = int(float(os.environ.get("LITEERP_IMAGE_MAX_MB", "10")) * 1024 * 1024)
+THUMBNAIL_SIZES = (64, 128, 256, 512)
+
+HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+DATA_URL_RE = re.compile(r"^data:([\w.+-]+/[\w.+-]+)?(;[^,]*)?,", re.IGNORECASE)
+
+# Firme dei formati accettati in upload
+SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+)
+
+
+class BlobError(ValueError):
+    pass
+
+
+def sniff(head: bytes) -> Optional[str]:
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, media_type in SIGNATURES:
+        if head.startswith(signature):
+            return media_type
+    return None
+
+
+def is_hash(value: str) -> bool:
+    return bool(value) and HASH_RE.match(value) is not None
+
+
+def path_of(blob_hash: str) -> str:
+    if not is_hash(blob_hash):
+        raise BlobError("Invalid image hash")
+    return os.path.join(BLOB_DIR, blob_hash[:2], blob_hash)
+
+
+def thumbnail_path(blob_hash: str, size: int) -> str:
+    return os.path.join(BLOB_DIR, "thumbs", str(size), blob_hash[:2], blob_hash)
+
+
+def exists(blob_hash: str) -> bool:
+    return is_hash(blob_hash) and os.path.exists(path_of(blob_hash))
+
+
+def _write_atomic(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def store(data: bytes, validate: bool = True) -> str:
+    # validate=False solo per spostare dati già presenti (migrazione)
+    if validate and len(data) > IMAGE_MAX_BYTES:
+        raise BlobError(f"Image larger than {IMAGE_MAX_BYTES // (1024 * 1024)} MB")
+    if validate and sniff(data[:16]) is None:
+        raise BlobError("Unsupported image type (png, jpeg, gif, webp or bmp)")
+    blob_hash = hashlib.sha256(data).hexdigest()
+    path = path_of(blob_hash)
+    if not os.path.exists(path):
+        _write_atomic(path, data)
+    return blob_hash
+
+
+def decode_data_url(value: str) -> Tuple[bytes, Optional[str]]:
+    match = DATA_URL_RE.match(value)
+    if match is None:
+        raise BlobError("Not a data URL")
+    payload = value[match.end():]
+    try:
+        if match.group(2) and "base64" in match.group(2).lower():
+            return base64.b64decode(payload, validate=True), match.group(1)
+        return unquote_to_bytes(payload), match.group(1)
+    except (binascii.Error, ValueError):
+        raise BlobError("Invalid data URL")
+
+
+def normalize_image(value: Optional[str], validate: bool = True) -> Optional[str]:
+    # Valore di Inventory.image in ingresso: vuoto, hash già caricato o data
+    # URL (vecchio frontend), che viene spostato nell'archivio
+    if not value:
+        return None
+    if is_hash(value):
+        if not exists(value):
+            raise BlobError("Unknown image hash")
+        return value
+    if DATA_URL_RE.match(value):
+        return store(decode_data_url(value)[0], validate)
+    raise BlobError("Image must be an uploaded image hash or a data URL")
+
+
+def media_type(path: str) -> str:
+    with open(path, "rb") as f:
+        return sniff(f.read(16)) or "application/octet-stream"
+
+
+def make_thumbnail(blob_hash: str, size: int) -> str:
+    # Generata alla prima richiesta e poi servita dal disco
+    path = thumbnail_path(blob_hash, size)
+    if os.path.exists(path):
+        return path
+    try:
+        from PIL import Image
+    except ImportError:
+        # Senza Pillow si serve l'originale
+        return path_of(blob_hash)
+    output = io.BytesIO()
+    try:
+        with Image.open(path_of(blob_hash)) as image:
+            image.thumbnail((size, size))
+            if image.mode in ("RGBA", "LA", "P"):
+                image.save(output, "PNG", optimize=True)
+            else:
+                image.convert("RGB").save(output, "JPEG", quality=85, optimize=True)
+    except OSError:
+        # Formato che Pillow non sa leggere
+        return path_of(blob_hash)
+    _write_atomic(path, output.getvalue())
+    return path
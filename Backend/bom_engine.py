@@ -0,0 +1,175 @@
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlmodel import Session
+
+from changes import hub, read_versions
+from models import BillOfMaterials
+
+
+class BomCycleError(ValueError):
+    pass
+
+
+class BomEngine:
+    # Grafo della distinta base tenuto in memoria: viene caricato con una sola
+    # query e aggiornato in modo incrementale dagli eventi del change hub.
+    # La cache è per processo ma è legata al contatore "bom" di TableVersion,
+    # condiviso da tutti i worker: se un altro processo ha modificato la
+    # distinta base, alla lettura successiva il grafo si ricarica.
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._edges: Optional[Dict[int, Tuple[int, int, int]]] = None
+        self._children: Dict[int, Dict[int, Tuple[int, int]]] = {}
+        self._closure: Dict[int, Dict[int, int]] = {}
+        self._version: Optional[int] = None
+
+    def _load(self, session: Session):
+        # Il contatore si legge prima del grafo: al peggio il grafo è più
+        # recente del contatore e la lettura dopo lo ricarica di nuovo.
+        # Niente autoflush: modifiche non ancora committate non vanno in cache.
+        with self._lock, session.no_autoflush:
+            version = read_versions(session, ("bom",))["bom"]
+            if self._edges is not None and self._version == version:
+                return
+            rows = session.exec(select(
+                BillOfMaterials.ID,
+                BillOfMaterials.parentProductID,
+                BillOfMaterials.childProductID,
+                BillOfMaterials.quantity,
+            ).order_by(BillOfMaterials.ID)).all()
+            self._children = {}
+            for bom_id, parent, child, quantity in rows:
+                self._children.setdefault(parent, {})[bom_id] = (child, quantity)
+            self._edges = {row[0]: tuple(row[1:]) for row in rows}
+            self._closure = {}
+            self._version = version
+
+    def children(self, session: Session, parent_id: int) -> List[Tuple[int, int]]:
+        with self._lock:
+            self._load(session)
+            return list(self._children.get(parent_id, {}).values())
+
+    def closure(self, session: Session, parent_id: int) -> Dict[int, int]:
+        """Quantità totale di ogni componente (a tutti i livelli) per un'unità di parent_id."""
+        with self._lock:
+            self._load(session)
+            if parent_id not in self._closure:
+                self._closure[parent_id] = self._explode(parent_id, [])
+            return self._closure[parent_id]
+
+    def _explode(self, parent_id: int, path: List[int]) -> Dict[int, int]:
+        if parent_id in path:
+            cycle = path[path.index(parent_id):] + [parent_id]
+            raise BomCycleError(
+                f"Cycle detected in bill of materials: {' -> '.join(map(str, cycle))}")
+        if parent_id in self._closure:
+            return self._closure[parent_id]
+
+        totals: Dict[int, int] = {}
+        for child, quantity in self._children.get(parent_id, {}).values():
+            totals[child] = totals.get(child, 0) + quantity
+            for product, sub_quantity in self._explode(child, path + [parent_id]).items():
+                totals[product] = totals.get(product, 0) + quantity * sub_quantity
+        self._closure[parent_id] = totals
+        return totals
+
+    def descendants(self, session: Session, parent_id: int) -> Set[int]:
+        return set(self.closure(session, parent_id))
+
+    def tree(self, session: Session, parent_id: int) -> Dict[int, List[Tuple[int, int]]]:
+        """Figli diretti di parent_id e dei suoi discendenti, con un solo controllo della versione."""
+        with self._lock:
+            self._load(session)
+            if parent_id not in self._closure:
+                self._closure[parent_id] = self._explode(parent_id, [])
+            return {product: list(self._children.get(product, {}).values())
+                    for product in [parent_id, *self._closure[parent_id]]}
+
+    def check_edge(self, session: Session, parent_id: int, child_id: int, bom_id: Optional[int] = None):
+        # Verifica che aggiungere parent -> child non crei un ciclo
+        if parent_id == child_id:
+            raise BomCycleError("A product cannot be a component of itself")
+        with self._lock:
+            self._load(session)
+            # Per ogni nodo raggiunto il nodo da cui ci si è arrivati: se si
+            # arriva a parent_id il ciclo si ricostruisce all'indietro
+            reached = {child_id: None}
+            stack = [child_id]
+            while stack:
+                node = stack.pop()
+                if node == parent_id:
+                    cycle = [node]
+                    while reached[node] is not None:
+                        node = reached[node]
+                        cycle.append(node)
+                    cycle = [parent_id] + cycle[::-1]
+                    raise BomCycleError(f"Adding {child_id} to {parent_id} would create a cycle: "
+                                        f"{' -> '.join(map(str, cycle))}")
+                for edge_id, (child, _) in self._children.get(node, {}).items():
+                    if edge_id != bom_id and child not in reached:
+                        reached[child] = node
+                        stack.append(child)
+
+    def _invalidate(self, parent_id: int):
+        for key in [key for key, totals in self._closure.items()
+                    if key == parent_id or parent_id in totals]:
+            del self._closure[key]
+
+    def _upsert(self, bom_id: int, parent: int, child: int, quantity: int):
+        self._remove(bom_id)
+        self._edges[bom_id] = (parent, child, quantity)
+        self._children.setdefault(parent, {})[bom_id] = (child, quantity)
+        self._invalidate(parent)
+
+    def _remove(self, bom_id: int):
+        if bom_id not in self._edges:
+            return
+        parent, _, _ = self._edges.pop(bom_id)
+        self._children[parent].pop(bom_id, None)
+        if not self._children[parent]:
+            del self._children[parent]
+        self._invalidate(parent)
+
+    def apply(self, events: list, versions: dict):
+        # Chiamato dal change hub dopo ogni commit di questo processo
+        if "bom" not in versions:
+            return
+        with self._lock:
+            if self._edges is None:
+                return
+            if versions["bom"] != self._version + 1:
+                # Commit di altri processi nel mezzo: si ricarica alla lettura
+                self.reset()
+                return
+            for e in events:
+                if e["entity"] != "bom":
+                    continue
+                if e["op"] == "reset":
+                    self.reset()
+                    return
+                if e["op"] == "delete":
+                    self._remove(e["ID"])
+                    continue
+                old = self._edges.get(e["ID"], (None, None, None))
+                edge = (e["fields"].get("parentProductID", old[0]),
+                        e["fields"].get("childProductID", old[1]),
+                        e["fields"].get("quantity", old[2]))
+                if None in edge:
+                    self.reset()
+                    return
+                self._upsert(e["ID"], *edge)
+            self._version = versions["bom"]
+
+    def reset(self):
+        with self._lock:
+            self._edges = None
+            self._children = {}
+            self._closure = {}
+            self._version = None
+
+
+bom_engine = BomEngine()
+hub.subscribe(bom_engine.apply)
@@ -0,0 +1,277 @@
+import asyncio
+import json
+import os
+import threading
+from collections import deque
+from typing import Dict, Optional, Set
+
+from sqlalchemy import event, insert, inspect, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from audit import record_change
+from models import BillOfMaterials, Inventory, ProductionOrder, ProductionOrderDetails, TableVersion, User
+
+# Hub delle modifiche: ogni commit che tocca inventario, ordini, dettagli o
+# distinta base pubblica eventi compatti (ID, campi cambiati, version) con un
+# numero di sequenza crescente. I client leggono uno snapshot iniziale e poi
+# solo i delta, ripartendo dall'ultima sequenza ricevuta.
+# Il hub vede solo i commit di questo processo: quelli di altri worker si
+# riconoscono dai contatori di TableVersion (poll_loop) e diventano un
+# evento "reset" per l'entità, dopo il quale il client rilegge lo snapshot.
+CHANGES_BUFFER_SIZE = int(os.environ.get("LITEERP_CHANGES_BUFFER_SIZE", "10000"))
+CHANGES_POLL_SECONDS = float(os.environ.get("LITEERP_CHANGES_POLL_SECONDS", "1"))
+CHANGES_KEY = "changes"
+VERSIONS_KEY = "table_versions"
+TOUCHED_KEY = "touched_tables"
+
+ENTITIES = {
+    Inventory: "inventory",
+    ProductionOrder: "orders",
+    ProductionOrderDetails: "details",
+    BillOfMaterials: "bom",
+}
+MODELS = {name: model for model, name in ENTITIES.items()}
+# Tabelle con il contatore in TableVersion ma senza eventi nel hub
+VERSIONED = {User: "users"}
+SKIPPED_FIELDS = {"image"}
+
+
+class ChangeHub:
+
+    def __init__(self, buffer_size: int):
+        self.sequence = 0
+        self._events = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._waiters: set = set()
+        self._subscribers: list = []
+        self._watchers: list = []
+        # Per entità: contatore fino al quale ogni commit è nel buffer (o è
+        # già stato segnalato con un reset), contatori visti oltre quello e
+        # buco osservato al controllo precedente
+        self._covered: Dict[str, int] = {}
+        self._seen: Dict[str, Set[int]] = {}
+        self._gaps: Dict[str, int] = {}
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    def subscribe(self, callback):
+        # Indici in memoria da tenere allineati: ricevono gli eventi di ogni
+        # commit, nel thread che ha fatto il commit, e i contatori di
+        # TableVersion scritti da quel commit. Un contatore che non vale
+        # quello già visto + 1 vuol dire commit di altri processi nel mezzo.
+        self._subscribers.append(callback)
+
+    def watch(self, callback):
+        # Cache che guardano solo i contatori di TableVersion (anche delle
+        # tabelle in VERSIONED): li ricevono dai commit di questo processo e
+        # da ogni giro di poll_loop, quindi anche quelli degli altri worker
+        self._watchers.append(callback)
+
+    def _observe(self, versions: dict):
+        for callback in self._watchers:
+            callback(versions)
+
+    def publish(self, changes: list, versions: Optional[dict] = None):
+        with self._lock:
+            for change in changes:
+                self.sequence += 1
+                self._events.append({"seq": self.sequence, **change})
+            for entity, version in (versions or {}).items():
+                if entity in MODELS:
+                    self._seen.setdefault(entity, set()).add(version)
+        for callback in self._subscribers:
+            callback(changes, versions or {})
+        self._observe(versions or {})
+        if changes:
+            self._notify()
+
+    def _notify(self):
+        # I commit possono arrivare anche da thread diversi dall'event loop
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake)
+
+    def reconcile(self, versions: dict) -> list:
+        # Confronta i contatori del database con quelli dei commit pubblicati
+        # qui. Un buco può essere un commit locale non ancora pubblicato:
+        # diventa un reset solo se c'è ancora al controllo successivo.
+        reset = []
+        with self._lock:
+            for entity, version in versions.items():
+                if entity not in MODELS:
+                    continue
+                seen = self._seen.setdefault(entity, set())
+                covered = self._covered.get(entity)
+                if covered is None or version < covered:
+                    # Primo controllo (o database ricreato): si parte da qui
+                    self._covered[entity] = version
+                    self._seen[entity] = {v for v in seen if v > version}
+                    self._gaps.pop(entity, None)
+                    continue
+                while covered + 1 in seen:
+                    covered += 1
+                    seen.discard(covered)
+                gap = self._gaps.pop(entity, None)
+                if covered < version:
+                    if gap is not None and covered < gap:
+                        self.sequence += 1
+                        self._events.append({"seq": self.sequence, "entity": entity, "op": "reset",
+                                             "ID": None, "fields": {}, "version": version})
+                        reset.append(entity)
+                        covered = version
+                        self._seen[entity] = {v for v in seen if v > version}
+                    else:
+                        self._gaps[entity] = version
+                self._covered[entity] = covered
+        if reset:
+            self._notify()
+        self._observe(versions)
+        return reset
+
+    def _wake(self):
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self._waiters.clear()
+
+    def since(self, after: int, entities: Optional[set] = None) -> Optional[tuple]:
+        # Eventi dopo "after" e sequenza raggiunta; None se il cursore non è
+        # più nel buffer (o è di un processo precedente): il client deve
+        # rifare lo snapshot
+        with self._lock:
+            oldest = self._events[0]["seq"] if self._events else self.sequence + 1
+            if after > self.sequence or after < oldest - 1:
+                return None
+            return [e for e in self._events if e["seq"] > after
+                    and (entities is None or e["entity"] in entities)], self.sequence
+
+    async def wait(self, after: int, timeout: float):
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.add(waiter)
+        try:
+            if self.sequence <= after:
+                await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._waiters.discard(waiter)
+
+
+hub = ChangeHub(CHANGES_BUFFER_SIZE)
+
+
+def _append(session: Session, entity: str, ID: int, op: str, fields: dict, version=None):
+    session.info.setdefault(CHANGES_KEY, []).append(
+        {"entity": entity, "op": op, "ID": ID, "fields": fields, "version": version})
+
+
+def record(session: Session, entity: str, ID: int, op: str, fields: dict, version=None):
+    # Per le modifiche fatte con UPDATE/DELETE diretti, che l'ORM non vede:
+    # finiscono anche nel log di audit
+    _append(session, entity, ID, op, fields, version)
+    record_change(entity, ID, op, fields)
+
+
+def record_reset(session: Session, entity: str):
+    # Per le scritture massive (import): al posto di un evento per riga un
+    # solo "reset" per transazione, dopo il quale client e indici in memoria
+    # rileggono l'entità. Il contatore in TableVersion cresce come sempre.
+    pending = session.info.setdefault(CHANGES_KEY, [])
+    if not any(change["op"] == "reset" and change["entity"] == entity for change in pending):
+        _append(session, entity, None, "reset", {})
+
+
+def _fields(obj, op: str) -> dict:
+    state = inspect(obj)
+    fields = {}
+    for attr in state.mapper.column_attrs:
+        if attr.key in SKIPPED_FIELDS:
+            continue
+        if op == "update" and not state.attrs[attr.key].history.has_changes():
+            continue
+        fields[attr.key] = getattr(obj, attr.key)
+    return fields
+
+
+@event.listens_for(Session, "after_flush")
+def _collect(session: Session, flush_context):
+    for op, objects in (("create", session.new), ("update", session.dirty),
+                        ("delete", session.deleted)):
+        for obj in objects:
+            if type(obj) in VERSIONED:
+                session.info.setdefault(TOUCHED_KEY, set()).add(VERSIONED[type(obj)])
+                continue
+            entity = ENTITIES.get(type(obj))
+            if entity is None:
+                continue
+            fields = {} if op == "delete" else _fields(obj, op)
+            if op == "update" and not fields:
+                continue
+            fields.pop("version", None)
+            _append(session, entity, obj.ID, op, fields, getattr(obj, "version", None))
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_table_versions(session: Session):
+    # Nella stessa transazione delle modifiche: il contatore vale per tutti i
+    # processi che usano il database
+    session.flush()
+    entities = sorted({change["entity"] for change in session.info.get(CHANGES_KEY, [])}
+                      | session.info.pop(TOUCHED_KEY, set()))
+    if not entities:
+        return
+    versions = dict(session.execute(update(TableVersion)
+                                    .where(TableVersion.name.in_(entities))
+                                    .values(version=TableVersion.version + 1)
+                                    .returning(TableVersion.name, TableVersion.version)).all())
+    missing = [name for name in entities if name not in versions]
+    if missing:
+        session.execute(insert(TableVersion), [{"name": name, "version": 1} for name in missing])
+        versions.update(dict.fromkeys(missing, 1))
+    session.info[VERSIONS_KEY] = versions
+
+
+def read_versions(connection, entities) -> dict:
+    versions = dict.fromkeys(entities, 0)
+    versions.update(connection.execute(select(TableVersion.name, TableVersion.version)
+                                       .where(TableVersion.name.in_(entities))).all())
+    return versions
+
+
+@event.listens_for(Session, "after_commit")
+def _publish(session: Session):
+    changes = session.info.pop(CHANGES_KEY, None)
+    versions = session.info.pop(VERSIONS_KEY, None)
+    if changes or versions:
+        hub.publish(changes or [], versions)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session: Session):
+    session.info.pop(CHANGES_KEY, None)
+    session.info.pop(VERSIONS_KEY, None)
+    session.info.pop(TOUCHED_KEY, None)
+
+
+async def poll_loop(async_engine):
+    # Task in background avviato dal lifespan dell'app
+    while True:
+        await asyncio.sleep(CHANGES_POLL_SECONDS)
+        try:
+            async with async_engine.connect() as connection:
+                versions = await connection.run_sync(
+                    read_versions, [*MODELS, *VERSIONED.values()])
+        except OperationalError:
+            # database occupato: si riprova al giro successivo
+            continue
+        hub.reconcile(versions)
+
+
+def format_sse(event_name: str, data, event_id: Optional[int] = None) -> str:
+    lines = [f"event: {event_name}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
@@ -1,16 +1,111 @@
 from sqlmodel import SQLModel, create_engine, Session, select
 from models import User
+import search
+import attributes
 from security import hash_password
+import os
 import secrets  # per generare password sicura temporanea
-from sqlalchemy import text
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 sqlite_file_name = "database.db"
 sqlite_url = f"sqlite:///{sqlite_file_name}"
 
-engine = create_engine(sqlite_url, echo=True)
+# Configurazione da variabili d'ambiente
+DATABASE_URL = os.environ.get("LITEERP_DATABASE_URL", sqlite_url)
+SQL_ECHO = os.environ.get("LITEERP_SQL_ECHO", "false").lower() in ("1", "true", "yes")
+POOL_SIZE = int(os.environ.get("LITEERP_POOL_SIZE", "10"))
+MAX_OVERFLOW = int(os.environ.get("LITEERP_MAX_OVERFLOW", "20"))
+POOL_TIMEOUT = int(os.environ.get("LITEERP_POOL_TIMEOUT", "30"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("LITEERP_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.environ.get("LITEERP_SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.environ.get("LITEERP_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_SYNCHRONOUS = os.environ.get("LITEERP_SQLITE_SYNCHRONOUS", "NORMAL")
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def make_engine(url: str = DATABASE_URL, echo: bool = SQL_ECHO) -> Engine:
+    if url.startswith("sqlite"):
+        new_engine = create_engine(
+            url,
+            echo=echo,
+            connect_args={"check_same_thread": False,
+                          "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+            pool_size=POOL_SIZE,
+            max_overflow=MAX_OVERFLOW,
+            pool_timeout=POOL_TIMEOUT,
+        )
+        event.listen(new_engine, "connect", _set_sqlite_pragmas)
+        return new_engine
+
+    # PostgreSQL (o altri server): pool dimensionato e verifica delle connessioni
+    return create_engine(
+        url,
+        echo=echo,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+        pool_pre_ping=True,
+        pool_recycle=1800,
+    )
+
+
+# Driver async corrispondenti ai driver sync
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: str) -> str:
+    scheme, rest = url.split("://", 1)
+    return f"{ASYNC_DRIVERS.get(scheme.split('+')[0], scheme)}://{rest}"
+
+
+def make_async_engine(url: str = DATABASE_URL, echo: bool = SQL_ECHO) -> AsyncEngine:
+    if url.startswith("sqlite"):
+        new_engine = create_async_engine(
+            to_async_url(url),
+            echo=echo,
+            connect_args={"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+            pool_size=POOL_SIZE,
+            max_overflow=MAX_OVERFLOW,
+            pool_timeout=POOL_TIMEOUT,
+        )
+        event.listen(new_engine.sync_engine, "connect", _set_sqlite_pragmas)
+        return new_engine
+
+    return create_async_engine(
+        to_async_url(url),
+        echo=echo,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+        pool_pre_ping=True,
+        pool_recycle=1800,
+    )
+
+
+engine = make_engine()
+async_engine = make_async_engine()
 
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        search.install(conn)
+        attributes.install(conn)
 
     # Creazione utente admin se non esiste
     with Session(engine) as session:
@@ -53,3 +148,8 @@ def create_db_and_tables():
 def get_session():
     with Session(engine) as session:
         yield session
+
+
+async def get_async_session():
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
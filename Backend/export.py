@@ -0,0 +1,63 @@
+import csv
+import io
+import json
+from typing import Iterator
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlmodel import Session
+
+from database import engine
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _iter_batches(model) -> Iterator[tuple[list[str], list]]:
+    # La sessione della dependency viene chiusa prima dello streaming,
+    # quindi il generatore apre la propria
+    columns = list(model.__table__.columns)
+    names = [column.key for column in columns]
+    query = select(*columns).order_by(model.ID).execution_options(
+        stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+
+    with Session(engine) as session:
+        result = session.exec(query)
+        for batch in result.partitions():
+            yield names, batch
+
+
+def _ndjson_rows(model) -> Iterator[str]:
+    for names, batch in _iter_batches(model):
+        yield "".join(json.dumps(dict(zip(names, row))) + "\n" for row in batch)
+
+
+def _csv_rows(model) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(column.key for column in model.__table__.columns)
+    for _, batch in _iter_batches(model):
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_response(model, format: str) -> StreamingResponse:
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid format: {format}. Valid formats are: {list(EXPORT_FORMATS)}")
+
+    rows = _ndjson_rows(model) if format == "ndjson" else _csv_rows(model)
+    filename = f"{model.__tablename__}.{format}"
+    return StreamingResponse(
+        rows,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,135 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from changes import read_versions
+
+# ETag e cache delle risposte per le letture. L'ETag è costruito dai contatori
+# di TableVersion delle tabelle da cui dipende il percorso: If-None-Match
+# costa una lettura della tabella dei contatori e nessuna query sui modelli.
+RESPONSE_CACHE_SIZE_MB = float(os.environ.get("LITEERP_RESPONSE_CACHE_SIZE_MB", "32"))
+RESPONSE_CACHE_MAX_BODY_KB = int(os.environ.get("LITEERP_RESPONSE_CACHE_MAX_BODY_KB", "4096"))
+
+# Prefisso -> tabelle (nomi di changes.ENTITIES) che ne determinano le risposte
+DEPENDENCIES = {
+    "/inventory": ("inventory",),
+    "/bom": ("bom", "inventory"),
+    "/orders": ("orders", "details"),
+    "/details": ("details", "orders"),
+}
+# Streaming o dati che non passano dall'ORM
+UNCACHED_SUFFIXES = ("/export", "/stock-at", "/movements")
+
+
+class ResponseCache:
+    # LRU limitata in byte: chiave = percorso + query, valore legato all'ETag
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple[str, int, list, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, etag: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != etag:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, etag: str, status: int, headers: list, body: bytes):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[3])
+            self._entries[key] = (etag, status, headers, body)
+            self.size += len(body)
+            while self.size > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted[3])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "entries": len(self._entries), "bytes": self.size}
+
+
+response_cache = ResponseCache(int(RESPONSE_CACHE_SIZE_MB * 1024 * 1024))
+
+
+def dependencies(path: str) -> Optional[tuple]:
+    if path.rstrip("/").endswith(UNCACHED_SUFFIXES):
+        return None
+    for prefix, entities in DEPENDENCIES.items():
+        if path == prefix or path.startswith(prefix + "/"):
+            return entities
+    return None
+
+
+class ConditionalGetMiddleware:
+    # Middleware ASGI: 304 se l'ETag del client è ancora valido, altrimenti
+    # risposta dalla cache o dalla route (che poi viene messa in cache)
+
+    def __init__(self, app, async_engine):
+        self.app = app
+        self.async_engine = async_engine
+
+    async def __call__(self, scope, receive, send):
+        entities = dependencies(scope["path"]) if scope["type"] == "http" else None
+        if entities is None or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        # Il contatore si legge prima della query: una modifica concorrente
+        # cambia l'ETag e al massimo costa un miss in più
+        async with self.async_engine.connect() as conn:
+            versions = await conn.run_sync(read_versions, entities)
+        etag = 'W/"' + "-".join(str(versions[e]) for e in entities) + '"'
+        etag_header = (b"etag", etag.encode())
+        cache_control = (b"cache-control", b"no-cache")
+
+        request_headers = dict(scope["headers"])
+        if_none_match = request_headers.get(b"if-none-match", b"").decode("latin-1")
+        if etag in (tag.strip() for tag in if_none_match.split(",")):
+            await send({"type": "http.response.start", "status": 304,
+                        "headers": [etag_header, cache_control]})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        key = scope["path"] + "?" + scope["query_string"].decode("latin-1")
+        if response_cache.max_bytes > 0:
+            cached = response_cache.get(key, etag)
+            if cached is not None:
+                _, status, headers, body = cached
+                await send({"type": "http.response.start", "status": status, "headers": headers})
+                await send({"type": "http.response.body", "body": body})
+                return
+
+        start = None
+        chunks = []
+        body_size = 0
+        cacheable = response_cache.max_bytes > 0
+
+        async def send_with_etag(message):
+            nonlocal start, cacheable, body_size
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [etag_header, cache_control]
+                start = message
+                cacheable = cacheable and message["status"] == 200
+            elif message["type"] == "http.response.body" and cacheable:
+                chunks.append(message.get("body", b""))
+                body_size += len(chunks[-1])
+                if body_size > RESPONSE_CACHE_MAX_BODY_KB * 1024:
+                    cacheable = False
+                    chunks.clear()
+                elif not message.get("more_body", False):
+                    response_cache.put(key, etag, start["status"], start["headers"], b"".join(chunks))
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
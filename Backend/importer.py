@@ -0,0 +1,522 @@
+"""Import massivo di articoli e distinte base da file CSV o XLSX.
+
+Il file viene letto in streaming a blocchi di IMPORT_BATCH_SIZE righe: ogni
+blocco risolve i codici con una sola query e scrive con executemany in una
+transazione, registrando i movimenti di magazzino e un solo evento "reset"
+per il change hub; nel log di audit va un unico riepilogo dell'import. Le
+righe non valide finiscono nel report (numero di riga e motivo) senza
+fermare l'import.
+
+Colonne degli articoli (upsert per codice):
+    code, category, quantity_on_hand, datas, attr.<nome>
+Colonne della distinta base (upsert per coppia parent/child, codici articolo):
+    parent, child, quantity
+
+Uso da riga di comando (dalla cartella Backend):
+
+    python -m importer inventory articoli.csv
+    python -m importer bom distinte.xlsx --output report.json
+"""
+import argparse
+import csv
+import io
+import itertools
+import json
+import os
+import sys
+import zipfile
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm.exc import StaleDataError
+from sqlmodel import Session
+
+import attributes
+import audit
+import changes
+import ledger
+from database import engine
+from models import BillOfMaterials, Inventory
+from stock import run_with_retry
+
+IMPORT_BATCH_SIZE = int(os.environ.get("LITEERP_IMPORT_BATCH_SIZE", "5000"))
+# Nel report solo le prime righe in errore; il totale è in "failed"
+MAX_REPORTED_ERRORS = 1000
+FORMATS = ("csv", "xlsx")
+SUMMARY_KEYS = ("rows", "created", "updated", "unchanged", "failed")
+
+INVENTORY_COLUMNS = {"code", "category", "quantity_on_hand", "datas"}
+BOM_COLUMNS = {"parent", "child", "quantity"}
+
+inventory_table = Inventory.__table__
+bom_table = BillOfMaterials.__table__
+
+
+class ImportFileError(ValueError):
+    pass
+
+
+def file_format(filename: Optional[str]) -> str:
+    extension = os.path.splitext(filename or "")[1].lower().lstrip(".")
+    if extension not in FORMATS:
+        raise ImportFileError(f"Unsupported file type. Valid types are: {list(FORMATS)}")
+    return extension
+
+
+def _check_encoding(file):
+    # Prima del primo commit: un errore di codifica a metà file lascerebbe
+    # un import parziale. In UTF-8 il byte di fine riga non compare dentro un
+    # carattere multibyte, quindi si può decodificare riga per riga.
+    if not file.seekable():
+        return
+    start = file.tell()
+    for number, line in enumerate(file, start=1):
+        try:
+            line.decode("utf-8")
+        except UnicodeDecodeError:
+            raise ImportFileError(f"CSV files must be UTF-8 encoded (invalid text at line {number})")
+    file.seek(start)
+
+
+def _csv_rows(file) -> Iterator[list]:
+    # utf-8-sig: i CSV salvati da Excel iniziano con il BOM; Excel in italiano
+    # separa con ";"
+    _check_encoding(file)
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        header = text.readline()
+        delimiter = ";" if header.count(";") > header.count(",") else ","
+        yield from csv.reader(itertools.chain([header], text), delimiter=delimiter)
+    except UnicodeDecodeError:
+        raise ImportFileError("CSV files must be UTF-8 encoded")
+    finally:
+        # Il file resta di chi l'ha aperto
+        if not text.closed:
+            text.detach()
+
+
+def _xlsx_rows(file) -> Iterator[list]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFileError("XLSX import requires openpyxl")
+    try:
+        # read_only: le righe vengono lette dall'XML man mano
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, KeyError, OSError):
+        raise ImportFileError("Invalid XLSX file")
+    try:
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            yield ["" if value is None else value for value in row]
+    finally:
+        workbook.close()
+
+
+def read_rows(file, format: str, columns: set, required: set,
+              attribute_columns: bool = False) -> Iterator[Tuple[int, dict]]:
+    # (numero di riga del file, {colonna: valore}); celle vuote escluse
+    rows = _csv_rows(file) if format == "csv" else _xlsx_rows(file)
+    header = next(rows, None)
+    if header is None:
+        raise ImportFileError("The file is empty")
+    names = [str(name).strip() for name in header]
+    unknown = [name for name in names if name and name not in columns
+               and not (attribute_columns and name.startswith(attributes.FILTER_PREFIX))]
+    if unknown:
+        raise ImportFileError(f"Unknown columns: {unknown}")
+    missing = required - set(names)
+    if missing:
+        raise ImportFileError(f"Missing columns: {sorted(missing)}")
+
+    for number, values in enumerate(rows, start=2):
+        row = {}
+        for name, value in zip(names, values):
+            if isinstance(value, str):
+                value = value.strip()
+            if name and value != "":
+                row[name] = value
+        if row:
+            yield number, row
+
+
+def _batches(rows, size: int) -> Iterator[list]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _new_report() -> dict:
+    return {"rows": 0, "created": 0, "updated": 0, "unchanged": 0, "failed": 0, "errors": []}
+
+
+def _fail(report: dict, number: int, message: str):
+    report["failed"] += 1
+    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+        report["errors"].append({"row": number, "error": message})
+
+
+def _integer(row: dict, name: str, minimum: int) -> int:
+    value = row[name]
+    # Le celle numeriche di Excel arrivano come float
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    try:
+        if isinstance(value, (bool, float)):
+            raise ValueError(value)
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer")
+    if number < minimum:
+        raise ValueError(f"{name} must be at least {minimum}")
+    return number
+
+
+def _inventory_row(row: dict) -> dict:
+    if "code" not in row:
+        raise ValueError("code is required")
+    item = {"code": str(row["code"])}
+    if "category" in row:
+        item["category"] = str(row["category"])
+    if "quantity_on_hand" in row:
+        item["quantity_on_hand"] = _integer(row, "quantity_on_hand", 0)
+    if "datas" in row:
+        item["datas"] = attributes.validate(str(row["datas"]))
+    # attr.<nome>: un attributo per colonna, con il tipo dichiarato
+    values = {}
+    for name, value in row.items():
+        if name.startswith(attributes.FILTER_PREFIX):
+            key = name[len(attributes.FILTER_PREFIX):]
+            values[key] = attributes.parse_value(key, str(value)) if key in attributes.ATTRIBUTES else value
+    if values:
+        item["attributes"] = values
+    return item
+
+
+def _datas(item: dict, current: Optional[str]) -> Optional[str]:
+    # Le colonne attr.<nome> si aggiungono agli attributi già presenti
+    # (o a quelli della colonna datas)
+    datas = item["datas"] if "datas" in item else current
+    if "attributes" not in item:
+        return datas
+    values = json.loads(datas) if datas else {}
+    if not isinstance(values, dict):
+        values = {}
+    values.update(item["attributes"])
+    return attributes.dump(values)
+
+
+def _write_inventory(session: Session, items: Dict[str, Tuple[int, dict]]) -> Tuple[dict, list]:
+    counts = {"created": 0, "updated": 0, "unchanged": 0}
+    errors = []
+    existing = {row.code: row for row in session.execute(
+        select(inventory_table.c.ID, inventory_table.c.code, inventory_table.c.category,
+               inventory_table.c.quantity_on_hand, inventory_table.c.datas, inventory_table.c.version)
+        .where(inventory_table.c.code.in_(list(items))))}
+
+    new = []
+    groups: Dict[tuple, list] = {}
+    for code, (number, item) in items.items():
+        current = existing.get(code)
+        try:
+            datas = _datas(item, current.datas if current is not None else None)
+        except ValueError as e:
+            errors.append((number, str(e)))
+            continue
+        if current is None:
+            if "category" not in item:
+                errors.append((number, "category is required for new items"))
+                continue
+            new.append({"code": code, "category": item["category"], "datas": datas,
+                        "quantity_on_hand": item.get("quantity_on_hand", 0),
+                        "quantity_locked": 0, "version": 1})
+            continue
+        values = {key: item[key] for key in ("category", "quantity_on_hand") if key in item}
+        values["datas"] = datas
+        values = {key: value for key, value in values.items() if value != getattr(current, key)}
+        if values:
+            # executemany vuole le stesse colonne in ogni riga
+            groups.setdefault(tuple(sorted(values)), []).append((current, values))
+        else:
+            counts["unchanged"] += 1
+
+    if new:
+        # Con RETURNING ordinato SQLAlchemy esegue un INSERT per riga su
+        # SQLite: executemany semplice e poi gli ID per codice in una query
+        session.execute(insert(inventory_table), new)
+        ids = dict(session.execute(select(inventory_table.c.code, inventory_table.c.ID).where(
+            inventory_table.c.code.in_([values["code"] for values in new]))).all())
+        for values in new:
+            ID = ids[values["code"]]
+            ledger.record(session, ID, "opening", values["quantity_on_hand"])
+        counts["created"] = len(new)
+
+    for keys, rows in groups.items():
+        result = session.execute(
+            update(inventory_table)
+            .where(inventory_table.c.ID == bindparam("row_id"))
+            .where(inventory_table.c.version == bindparam("row_version"))
+            .values(version=inventory_table.c.version + 1,
+                    **{key: bindparam(f"new_{key}") for key in keys}),
+            [{"row_id": row.ID, "row_version": row.version,
+              **{f"new_{key}": value for key, value in values.items()}} for row, values in rows])
+        if result.rowcount != len(rows):
+            raise StaleDataError("inventory: rows changed by a concurrent update")
+        for row, values in rows:
+            if "quantity_on_hand" in values:
+                ledger.record(session, row.ID, "adjust", values["quantity_on_hand"] - row.quantity_on_hand)
+        counts["updated"] += len(rows)
+
+    if new or groups:
+        changes.record_reset(session, "inventory")
+    session.commit()
+    return counts, errors
+
+
+def _merge(report: dict, counts: dict, errors: list):
+    for key, value in counts.items():
+        report[key] += value
+    for number, message in errors:
+        _fail(report, number, message)
+
+
+def import_inventory(session: Session, file, format: str) -> dict:
+    report = _new_report()
+    rows = read_rows(file, format, INVENTORY_COLUMNS, {"code"}, attribute_columns=True)
+    for batch in _batches(rows, IMPORT_BATCH_SIZE):
+        items = {}
+        for number, row in batch:
+            report["rows"] += 1
+            try:
+                item = _inventory_row(row)
+            except ValueError as e:
+                _fail(report, number, str(e))
+                continue
+            if item["code"] in items:
+                _fail(report, items[item["code"]][0], f"Code repeated at row {number}: the last row wins")
+            items[item["code"]] = (number, item)
+        if items:
+            # In caso di conflitto il blocco viene riletto e riscritto da capo
+            _merge(report, *run_with_retry(session, lambda s: _write_inventory(s, items)))
+    report["errors"].sort(key=lambda error: error["row"])
+    return report
+
+
+def _bom_row(row: dict) -> Tuple[str, str, int]:
+    for name in ("parent", "child"):
+        if name not in row:
+            raise ValueError(f"{name} is required")
+    quantity = _integer(row, "quantity", 1) if "quantity" in row else 1
+    return str(row["parent"]), str(row["child"]), quantity
+
+
+def _components(edges) -> Dict[int, int]:
+    # Componenti fortemente connesse (Tarjan, iterativo): i due estremi di un
+    # arco nella stessa componente stanno su un ciclo
+    graph: Dict[int, list] = {}
+    for parent, child in edges:
+        graph.setdefault(parent, []).append(child)
+    index: Dict[int, int] = {}
+    low: Dict[int, int] = {}
+    component: Dict[int, int] = {}
+    stack: list = []
+    on_stack = set()
+
+    for root in graph:
+        if root in index:
+            continue
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(graph[root]))]
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if child not in index:
+                    index[child] = low[child] = len(index)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(graph.get(child, ()))))
+                    break
+                if child in on_stack:
+                    low[node] = min(low[node], index[child])
+            else:
+                work.pop()
+                if work:
+                    low[work[-1][0]] = min(low[work[-1][0]], low[node])
+                if low[node] == index[node]:
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component[member] = node
+                        if member == node:
+                            break
+    return component
+
+
+def _reaches(graph: Dict[int, list], start: int, target: int) -> bool:
+    stack = [start]
+    seen = set()
+    while stack:
+        node = stack.pop()
+        if node == target:
+            return True
+        if node not in seen:
+            seen.add(node)
+            stack.extend(graph.get(node, ()))
+    return False
+
+
+def _write_bom(session: Session, rows: list) -> Tuple[dict, list]:
+    # Le righe del blocco si rileggono a ogni tentativo: dopo un conflitto
+    # (StaleDataError) run_with_retry riparte dallo stato attuale
+    counts = {"created": 0, "updated": 0, "unchanged": 0}
+    existing = {(parent, child): (ID, quantity) for ID, parent, child, quantity in session.execute(
+        select(bom_table.c.ID, bom_table.c.parentProductID, bom_table.c.childProductID, bom_table.c.quantity)
+        .where(bom_table.c.parentProductID.in_({parent for (parent, _), _, _ in rows})))}
+    new = []
+    changed = []
+    for (parent, child), number, quantity in rows:
+        current = existing.get((parent, child))
+        if current is None:
+            new.append({"parentProductID": parent, "childProductID": child, "quantity": quantity})
+        elif current[1] != quantity:
+            changed.append({"row_id": current[0], "old_parent": parent, "old_child": child,
+                            "old_quantity": current[1], "new_quantity": quantity})
+        else:
+            counts["unchanged"] += 1
+
+    if new:
+        session.execute(insert(bom_table), new)
+        # Le coppie parent/child sono uniche nell'import: gli ID nuovi sono
+        # quelli non presenti prima
+        ids = {(parent, child): ID for ID, parent, child in session.execute(
+            select(bom_table.c.ID, bom_table.c.parentProductID, bom_table.c.childProductID).where(
+                bom_table.c.parentProductID.in_({values["parentProductID"] for values in new})))
+               if (parent, child) not in existing}
+        counts["created"] = len(new)
+    if changed:
+        # BillOfMaterials non ha la colonna version: il WHERE confronta i
+        # valori letti, così una modifica concorrente fa ripartire il blocco
+        result = session.execute(update(bom_table)
+                                 .where(bom_table.c.ID == bindparam("row_id"))
+                                 .where(bom_table.c.parentProductID == bindparam("old_parent"))
+                                 .where(bom_table.c.childProductID == bindparam("old_child"))
+                                 .where(bom_table.c.quantity == bindparam("old_quantity"))
+                                 .values(quantity=bindparam("new_quantity")), changed)
+        if result.rowcount != len(changed):
+            raise StaleDataError("billofmaterials: rows changed by a concurrent update")
+        counts["updated"] = len(changed)
+
+    if new or changed:
+        changes.record_reset(session, "bom")
+    session.commit()
+    return counts, []
+
+
+def import_bom(session: Session, file, format: str) -> dict:
+    report = _new_report()
+    edges: Dict[tuple, tuple] = {}
+    codes: Dict[int, str] = {}
+
+    # 1. lettura a blocchi e risoluzione dei codici, una query per blocco
+    for batch in _batches(read_rows(file, format, BOM_COLUMNS, {"parent", "child"}), IMPORT_BATCH_SIZE):
+        parsed = []
+        for number, row in batch:
+            report["rows"] += 1
+            try:
+                parsed.append((number, *_bom_row(row)))
+            except ValueError as e:
+                _fail(report, number, str(e))
+        wanted = {code for _, parent, child, _ in parsed for code in (parent, child)}
+        ids = dict(session.execute(select(inventory_table.c.code, inventory_table.c.ID)
+                                   .where(inventory_table.c.code.in_(wanted))).all())
+        for number, parent, child, quantity in parsed:
+            unknown = [code for code in (parent, child) if code not in ids]
+            if unknown:
+                _fail(report, number, f"Unknown item codes: {unknown}")
+                continue
+            if parent == child:
+                _fail(report, number, "A product cannot be a component of itself")
+                continue
+            key = (ids[parent], ids[child])
+            if key in edges:
+                _fail(report, edges[key][0], f"Component repeated at row {number}: the last row wins")
+            edges[key] = (number, quantity)
+            codes[key[0]], codes[key[1]] = parent, child
+
+    # 2. cicli: gli archi nuovi dentro una componente ciclica del grafo completo
+    # (esistenti + nuovi) si riprovano in ordine di riga, scartando quelli
+    # che chiudono un ciclo; tutti gli altri sono sicuri
+    existing = {(parent, child): (ID, quantity) for ID, parent, child, quantity in session.execute(
+        select(bom_table.c.ID, bom_table.c.parentProductID, bom_table.c.childProductID, bom_table.c.quantity))}
+    session.rollback()
+    component = _components(list(existing) + [key for key in edges if key not in existing])
+    valid = []
+    suspects = []
+    for key, (number, quantity) in edges.items():
+        if key not in existing and component[key[0]] == component[key[1]]:
+            suspects.append((number, key, quantity))
+        else:
+            valid.append((key, number, quantity))
+    if suspects:
+        graph: Dict[int, list] = {}
+        for parent, child in itertools.chain(existing, (key for key, _, _ in valid)):
+            graph.setdefault(parent, []).append(child)
+        for number, key, quantity in sorted(suspects):
+            if _reaches(graph, key[1], key[0]):
+                _fail(report, number, f"Adding {codes[key[1]]} to {codes[key[0]]} would create a cycle")
+            else:
+                graph.setdefault(key[0], []).append(key[1])
+                valid.append((key, number, quantity))
+
+    # 3. scrittura a blocchi; a ogni commit un solo evento "reset" per la
+    # distinta base, dal quale bom_engine e availability si ricaricano
+    for batch in _batches(valid, IMPORT_BATCH_SIZE):
+        _merge(report, *run_with_retry(session, lambda s: _write_bom(s, batch)))
+    report["errors"].sort(key=lambda error: error["row"])
+    return report
+
+
+IMPORTERS = {"inventory": import_inventory, "bom": import_bom}
+
+
+def import_file(kind: str, file, filename: str) -> dict:
+    # Sessione propria: le route chiamano l'import in un thread. Nel log di
+    # audit della richiesta va solo il riepilogo, non le singole righe.
+    format = file_format(filename)
+    with audit.summarized(kind, "import") as summary, Session(engine) as session:
+        report = IMPORTERS[kind](session, file, format)
+        summary.update({key: report[key] for key in SUMMARY_KEYS})
+        return report
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Bulk import of inventory items or bills of materials")
+    parser.add_argument("kind", choices=IMPORTERS)
+    parser.add_argument("path", help="CSV or XLSX file")
+    parser.add_argument("--output", help="Write the report to this JSON file instead of stdout")
+    args = parser.parse_args(argv)
+
+    try:
+        with open(args.path, "rb") as f:
+            report = import_file(args.kind, f, args.path)
+    except ImportFileError as e:
+        parser.error(str(e))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    print(f"{report['rows']} rows: {report['created']} created, {report['updated']} updated, "
+          f"{report['unchanged']} unchanged, {report['failed']} failed", file=sys.stderr)
+    sys.exit(1 if report["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
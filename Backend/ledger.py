@@ -0,0 +1,179 @@
+import asyncio
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Union
+
+from sqlalchemy import event, func, insert, literal, select, union_all
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models import Inventory, InventoryMovement, StockSnapshot, StockSnapshotLine
+
+# Ogni sessione accumula i movimenti in memoria; vengono scritti con un solo
+# INSERT multiplo subito prima del commit, nella stessa transazione delle
+# modifiche alle giacenze. Un rollback li scarta insieme alle modifiche.
+LEDGER_KEY = "ledger"
+
+SNAPSHOT_INTERVAL_SECONDS = int(os.environ.get("LITEERP_SNAPSHOT_INTERVAL_SECONDS", "3600"))
+SNAPSHOT_MIN_MOVEMENTS = int(os.environ.get("LITEERP_SNAPSHOT_MIN_MOVEMENTS", "1000"))
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+# Cifre dell'orario (senza frazione) -> risoluzione del timestamp richiesto
+RESOLUTIONS = {0: timedelta(days=1), 2: timedelta(hours=1), 4: timedelta(minutes=1),
+               6: timedelta(seconds=1)}
+
+
+class InvalidTimestamp(ValueError):
+    pass
+
+
+def now() -> str:
+    # UTC a larghezza fissa: l'ordinamento delle stringhe è quello temporale
+    return datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+
+def upper_bound(at: str) -> str:
+    # "at" è inclusivo alla risoluzione con cui è scritto: "2024-05-01" vale
+    # tutto il giorno, "2024-05-01T12:00:00" tutto quel secondo. Restituisce
+    # il limite esclusivo nel formato di now(), da confrontare con "<".
+    try:
+        moment = datetime.fromisoformat(at)
+    except ValueError:
+        raise InvalidTimestamp(f"Invalid timestamp: {at!r}")
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    time_part = re.split(r"[T ]", at, maxsplit=1)[1] if re.search(r"[T ]", at) else ""
+    time_part = re.split(r"[Z+-]", time_part, maxsplit=1)[0]
+    if "." in time_part or "," in time_part:
+        step = timedelta(microseconds=1)
+    else:
+        step = RESOLUTIONS.get(len(re.sub(r"\D", "", time_part)), timedelta(seconds=1))
+    return (moment + step).strftime(TIMESTAMP_FORMAT)
+
+
+def record(session: Session, item: Union[Inventory, int], kind: str,
+           on_hand_delta: int = 0, locked_delta: int = 0,
+           productionOrderID: Optional[int] = None):
+    if on_hand_delta == 0 and locked_delta == 0:
+        return
+    # item può essere un Inventory non ancora inserito: l'ID si legge al commit
+    session.info.setdefault(LEDGER_KEY, []).append(
+        (item, kind, on_hand_delta, locked_delta, productionOrderID))
+
+
+@event.listens_for(Session, "before_commit")
+def _write_movements(session: Session):
+    pending = session.info.get(LEDGER_KEY)
+    if not pending:
+        return
+    session.flush()
+    timestamp = now()
+    rows = [{
+        "timestamp": timestamp,
+        "itemID": item if isinstance(item, int) else item.ID,
+        "kind": kind,
+        "on_hand_delta": on_hand_delta,
+        "locked_delta": locked_delta,
+        "productionOrderID": productionOrderID,
+    } for item, kind, on_hand_delta, locked_delta, productionOrderID in pending]
+    pending.clear()
+    session.execute(insert(InventoryMovement), rows)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_movements(session: Session, transaction):
+    if transaction.parent is None:
+        session.info.pop(LEDGER_KEY, None)
+
+
+def last_snapshot(session: Session, before: Optional[str] = None) -> Optional[StockSnapshot]:
+    query = select(StockSnapshot).order_by(StockSnapshot.ID.desc()).limit(1)
+    if before is not None:
+        query = query.where(StockSnapshot.timestamp < before)
+    return session.execute(query).scalars().first()
+
+
+def take_snapshot(session: Session) -> Optional[StockSnapshot]:
+    # Nuova fotografia = fotografia precedente + movimenti successivi, tutto in SQL
+    previous = last_snapshot(session)
+    previous_movement = previous.lastMovementID if previous else 0
+    last_movement = session.execute(
+        select(func.max(InventoryMovement.ID))).scalar() or 0
+    if last_movement == previous_movement:
+        return None
+
+    snapshot = StockSnapshot(timestamp=now(), lastMovementID=last_movement)
+    session.add(snapshot)
+    session.flush()
+
+    parts = [select(InventoryMovement.itemID.label("itemID"),
+                    InventoryMovement.on_hand_delta.label("on_hand"),
+                    InventoryMovement.locked_delta.label("locked"))
+             .where(InventoryMovement.ID > previous_movement)
+             .where(InventoryMovement.ID <= last_movement)]
+    if previous:
+        parts.append(select(StockSnapshotLine.itemID,
+                            StockSnapshotLine.quantity_on_hand,
+                            StockSnapshotLine.quantity_locked)
+                     .where(StockSnapshotLine.snapshotID == previous.ID))
+    combined = union_all(*parts).subquery()
+    session.execute(insert(StockSnapshotLine).from_select(
+        ["snapshotID", "itemID", "quantity_on_hand", "quantity_locked"],
+        select(literal(snapshot.ID), combined.c.itemID,
+               func.sum(combined.c.on_hand), func.sum(combined.c.locked))
+        .group_by(combined.c.itemID)))
+    session.commit()
+    return snapshot
+
+
+def stock_at(session: Session, at: str, itemID: Optional[int] = None) -> dict:
+    # Giacenze alla data "at": ultima fotografia precedente più i movimenti
+    # registrati dopo di essa fino ad "at"
+    before = upper_bound(at)
+    snapshot = last_snapshot(session, before)
+    stock = {}
+    if snapshot:
+        query = select(StockSnapshotLine.itemID, StockSnapshotLine.quantity_on_hand,
+                       StockSnapshotLine.quantity_locked).where(
+            StockSnapshotLine.snapshotID == snapshot.ID)
+        if itemID is not None:
+            query = query.where(StockSnapshotLine.itemID == itemID)
+        for line_item, on_hand, locked in session.execute(query):
+            stock[line_item] = [on_hand, locked]
+
+    query = (select(InventoryMovement.itemID,
+                    func.sum(InventoryMovement.on_hand_delta),
+                    func.sum(InventoryMovement.locked_delta))
+             .where(InventoryMovement.ID > (snapshot.lastMovementID if snapshot else 0))
+             .where(InventoryMovement.timestamp < before)
+             .group_by(InventoryMovement.itemID))
+    if itemID is not None:
+        query = query.where(InventoryMovement.itemID == itemID)
+    for delta_item, on_hand, locked in session.execute(query):
+        current = stock.setdefault(delta_item, [0, 0])
+        current[0] += on_hand
+        current[1] += locked
+
+    return {key: {"quantity_on_hand": on_hand, "quantity_locked": locked}
+            for key, (on_hand, locked) in sorted(stock.items())}
+
+
+def snapshot_due(session: Session) -> bool:
+    previous = last_snapshot(session)
+    pending = session.execute(select(func.count()).select_from(InventoryMovement).where(
+        InventoryMovement.ID > (previous.lastMovementID if previous else 0))).scalar()
+    return pending >= SNAPSHOT_MIN_MOVEMENTS
+
+
+async def snapshot_loop(async_engine):
+    # Task in background avviato dal lifespan dell'app
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVAL_SECONDS)
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            try:
+                if await session.run_sync(snapshot_due):
+                    await session.run_sync(take_snapshot)
+            except OperationalError:
+                # database occupato da un altro writer: si riprova al giro successivo
+                await session.rollback()
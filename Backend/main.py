@@ -1,5 +1,5 @@
 from fastapi import FastAPI
-from routers import inventory, bom, production_order, production_order_details, users, logs
+from routers import inventory, bom, production_order, production_order_details, users, logs, changes, planning, metrics, images
 from fastapi.middleware.cors import CORSMiddleware
 
 # Importa i modelli necessari per la configurazione OpenAPI/Swagger UI
@@ -8,8 +8,16 @@ from fastapi.openapi.models import SecurityScheme as SecuritySchemeModel
 from fastapi.openapi.models import OAuthFlowPassword as OAuthFlowPasswordModel
 
 from fastapi import FastAPI
+import asyncio
 from contextlib import asynccontextmanager
-from database import create_db_and_tables
+from database import create_db_and_tables, async_engine
+from security import shutdown_password_pool
+from ledger import snapshot_loop
+from audit import AuditMiddleware, audit_log
+from changes import hub, poll_loop
+from auth import user_cache
+from http_cache import ConditionalGetMiddleware
+from metrics import MetricsMiddleware
 
 app = FastAPI(
     title="Il mio API FastAPI",
@@ -37,8 +45,20 @@ app = FastAPI(
 async def lifespan(app: FastAPI):
     # Questa parte viene eseguita all'avvio
     create_db_and_tables()
+    snapshots = asyncio.create_task(snapshot_loop(async_engine))
+    audit_log.start(async_engine)
+    hub.bind(asyncio.get_running_loop())
+    changes_poll = asyncio.create_task(poll_loop(async_engine))
     yield
     # Questa parte viene eseguita alla chiusura (opzionale)
+    snapshots.cancel()
+    changes_poll.cancel()
+    await audit_log.stop(async_engine)
+    shutdown_password_pool()
+    await async_engine.dispose()
+
+# I principal in cache restano validi finché il contatore "users" non cambia
+hub.watch(user_cache.observe)
 
 app = FastAPI(lifespan=lifespan)
 
@@ -50,11 +70,19 @@ app.include_router(production_order.router, prefix="/orders", tags=["Production
 app.include_router(production_order_details.router, prefix="/details", tags=["Production Order Details"])
 app.include_router(users.router, prefix="/users", tags=["Users"])
 app.include_router(logs.router, prefix="/logs", tags=["Logs"])
+app.include_router(changes.router, prefix="/changes", tags=["Changes"])
+app.include_router(planning.router, prefix="/planning", tags=["Planning"])
+app.include_router(metrics.router, prefix="/metrics", tags=["Metrics"])
+app.include_router(images.router, prefix="/images", tags=["Images"])
 
+app.add_middleware(ConditionalGetMiddleware, async_engine=async_engine)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000", "http://liteerp.local:3000"],  # frontend React
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Query-Count"],
 )
+app.add_middleware(AuditMiddleware)
+app.add_middleware(MetricsMiddleware, router=app.router)
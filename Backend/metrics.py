@@ -0,0 +1,213 @@
+import bisect
+import cProfile
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+
+# Strumentazione: latenza per route, numero e tempo delle query SQL per
+# richiesta (un N+1 si vede subito in x-query-count), log delle query lente
+# e formato Prometheus per GET /metrics. Il profiler per singola richiesta è
+# spento finché LITEERP_PROFILE_TOKEN non è impostato.
+SLOW_QUERY_MS = float(os.environ.get("LITEERP_SLOW_QUERY_MS", "200"))
+PROFILE_TOKEN = os.environ.get("LITEERP_PROFILE_TOKEN", "")
+PROFILE_DIR = os.environ.get("LITEERP_PROFILE_DIR", "profiles")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+logger = logging.getLogger("liteerp.sql")
+
+# Query della richiesta in corso: dict condiviso con i greenlet di run_sync
+_current_request: ContextVar[Optional[dict]] = ContextVar("current_request", default=None)
+
+
+class Histogram:
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...], buckets: tuple):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values: tuple, value: float):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # conteggi per bucket (+Inf compreso), somma
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for label_values, counts, total in sorted(series):
+            labels = _labels(self.labels, label_values)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{{{labels + ',' if labels else ''}{le}}} {cumulative}")
+            lines.append(f"{self.name}_sum{_braces(labels)} {total}")
+            lines.append(f"{self.name}_count{_braces(labels)} {cumulative}")
+        return lines
+
+
+class Counter:
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values: tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            lines.append(f"{self.name}{_braces(_labels(self.labels, label_values))} {value}")
+        return lines
+
+
+def _braces(labels: str) -> str:
+    return "{" + labels + "}" if labels else ""
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    return ",".join('{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+                    for name, value in zip(names, values))
+
+
+requests_total = Counter(
+    "liteerp_http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+request_duration = Histogram(
+    "liteerp_http_request_duration_seconds", "HTTP request latency", ("method", "route"), LATENCY_BUCKETS)
+request_queries = Histogram(
+    "liteerp_http_request_queries", "SQL statements executed per HTTP request", ("method", "route"),
+    QUERY_COUNT_BUCKETS)
+query_duration = Histogram(
+    "liteerp_db_query_duration_seconds", "SQL statement latency", (), LATENCY_BUCKETS)
+slow_queries = Counter(
+    "liteerp_db_slow_queries_total", f"SQL statements slower than {SLOW_QUERY_MS:g} ms", ())
+
+METRICS = [requests_total, request_duration, request_queries, query_duration, slow_queries]
+
+
+def render() -> str:
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _query_start(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _query_end(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    query_duration.observe((), elapsed)
+    request = _current_request.get()
+    if request is not None:
+        request["queries"] += 1
+        request["query_time"] += elapsed
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        slow_queries.inc()
+        logger.warning("Slow query (%.1f ms) in %s: %s", elapsed * 1000,
+                       request["route"] if request else "-", " ".join(statement.split())[:1000])
+
+
+def _route_path(router, scope) -> str:
+    # Il template della route tiene bassa la cardinalità delle etichette;
+    # le risposte servite prima del router (cache, 304) si risolvono qui
+    route = scope.get("route")
+    if route is None:
+        for candidate in router.routes:
+            match, _ = candidate.matches(scope)
+            if match == Match.FULL:
+                route = candidate
+                break
+    return getattr(route, "path", "<unmatched>")
+
+
+_profile_lock = threading.Lock()
+
+
+class MetricsMiddleware:
+    # Middleware ASGI più esterno: misura tutta la richiesta, cache compresa
+
+    def __init__(self, app, router):
+        self.app = app
+        self.router = router
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = {"queries": 0, "query_time": 0.0, "route": scope["path"]}
+        status_code = 500
+        start = time.perf_counter()
+
+        profiler = None
+        if PROFILE_TOKEN and dict(scope["headers"]).get(b"x-profile", b"").decode("latin-1") == PROFILE_TOKEN:
+            # Un profilo alla volta: cProfile misura tutto il thread dell'event loop
+            if _profile_lock.acquire(blocking=False):
+                profiler = cProfile.Profile()
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                elapsed = (time.perf_counter() - start) * 1000
+                # Messaggio nuovo: quello originale può finire nella cache delle risposte
+                message = {**message, "headers": list(message.get("headers", [])) + [
+                    (b"x-query-count", str(request["queries"]).encode()),
+                    (b"server-timing", f'app;dur={elapsed:.1f}, db;dur={request["query_time"] * 1000:.1f}'.encode()),
+                ]}
+            await send(message)
+
+        token = _current_request.set(request)
+        try:
+            if profiler is not None:
+                profiler.enable()
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                _dump_profile(profiler, scope)
+                _profile_lock.release()
+            _current_request.reset(token)
+            route = _route_path(self.router, scope)
+            elapsed = time.perf_counter() - start
+            requests_total.inc((scope["method"], route, status_code))
+            request_duration.observe((scope["method"], route), elapsed)
+            request_queries.observe((scope["method"], route), request["queries"])
+
+
+def _dump_profile(profiler: cProfile.Profile, scope):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = "-".join(part for part in scope["path"].split("/") if part) or "root"
+    path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{scope['method']}-{name}.prof")
+    profiler.dump_stats(path)
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(20)
+    logging.getLogger("liteerp.profile").warning("Profile of %s %s saved to %s\n%s",
+                                                 scope["method"], scope["path"], path, summary.getvalue())
@@ -1,49 +1,98 @@
 from sqlalchemy.dialects.sqlite import JSON as SQLiteJSON
 from typing import Optional, Dict, Any
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
+from sqlalchemy.orm import declared_attr
 
-class Inventory(SQLModel, table=True):
+class VersionedModel(SQLModel):
+    # Optimistic locking: ogni UPDATE verifica e incrementa la colonna "version"
+    @declared_attr
+    def __mapper_args__(cls):
+        return {"version_id_col": cls.__table__.c.version}
+
+class Inventory(VersionedModel, table=True):
     ID: Optional[int] = Field(default=None, primary_key=True)
-    code: str
+    code: str = Field(index=True, unique=True)
     quantity_on_hand: int
     quantity_locked: int
     category: str
     image: Optional[str] = None
     datas: Optional[str] = None
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
 
 class BillOfMaterials(SQLModel, table=True):
     ID: Optional[int] = Field(default=None, primary_key=True)
-    parentProductID: int
+    parentProductID: int = Field(index=True)
     childProductID: int
     quantity: int
 
-class ProductionOrder(SQLModel, table=True):
+class ProductionOrder(VersionedModel, table=True):
+    __table_args__ = (
+        Index("ix_productionorder_productID_status_date",
+              "productID", "status", "date"),
+    )
+
     ID: Optional[int] = Field(default=None, primary_key=True)
     date: str
     productID: int
     quantityRequested: int
     quantityProduced: int
-    status: str
-    parentProductionOrderDetailsID: Optional[int] = None
+    status: str = Field(index=True)
+    parentProductionOrderDetailsID: Optional[int] = Field(default=None, index=True)
     userIDs: Optional[str] = None
     notes: Optional[str] = None
+    priority: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    dueDate: Optional[str] = None
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
 
-class ProductionOrderDetails(SQLModel, table=True):
+class ProductionOrderDetails(VersionedModel, table=True):
     ID: Optional[int] = Field(default=None, primary_key=True)
-    productionOrderID: int
-    productID: int
+    productionOrderID: int = Field(index=True)
+    productID: int = Field(index=True)
     quantityRequired: int
     quantityLocked: int
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
 
 class User(SQLModel, table=True):
     ID: Optional[int] = Field(default=None, primary_key=True)
-    email: str
+    email: str = Field(index=True)
     password: str
     name: str
     surname: str
 
+class InventoryMovement(SQLModel, table=True):
+    # Registro append-only: ogni variazione di giacenza è una riga, mai modificata
+    ID: Optional[int] = Field(default=None, primary_key=True)
+    timestamp: str = Field(index=True)
+    itemID: int = Field(index=True)
+    kind: str  # opening, add, remove, lock, release, adjust
+    on_hand_delta: int
+    locked_delta: int
+    productionOrderID: Optional[int] = None
+
+class StockSnapshot(SQLModel, table=True):
+    ID: Optional[int] = Field(default=None, primary_key=True)
+    timestamp: str = Field(index=True)
+    lastMovementID: int  # ultimo movimento incluso nella fotografia
+
+class StockSnapshotLine(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_stocksnapshotline_snapshotID_itemID", "snapshotID", "itemID"),
+    )
+
+    ID: Optional[int] = Field(default=None, primary_key=True)
+    snapshotID: int
+    itemID: int
+    quantity_on_hand: int
+    quantity_locked: int
+
+class TableVersion(SQLModel, table=True):
+    # Contatore delle modifiche per tabella, usato per ETag e cache delle risposte
+    name: str = Field(primary_key=True)
+    version: int = 0
+
 class Logs (SQLModel, table=True):
     ID: Optional[int] = Field(default=None, primary_key=True)
-    timestamp: str
+    timestamp: str = Field(index=True)
     message: str
     executed_by: Optional[str] = None
\ No newline at end of file
@@ -0,0 +1,161 @@
+from collections import defaultdict
+from typing import Iterable
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, delete, select, tuple_, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+from models import Inventory, ProductionOrder, ProductionOrderDetails
+import changes
+import ledger
+
+# Operazioni sull'intero albero di un ordine di produzione (l'ordine e i suoi
+# sotto-ordini, collegati da parentProductionOrderDetailsID): l'albero si
+# carica con una CTE ricorsiva e le modifiche sono UPDATE/DELETE di gruppo,
+# senza commit intermedi. Il commit resta al chiamante.
+VALID_STATUSES = ["Planned", "In Progress", "Completed"]
+# Ordini che possono ancora ricevere produzione e bloccare componenti
+OPEN_STATUSES = ["In Progress", "Planned"]
+
+inventory_table = Inventory.__table__
+
+
+def subtree_query(root_ids: Iterable[int]):
+    tree = (select(ProductionOrder.ID, ProductionOrder.status, ProductionOrder.version)
+            .where(ProductionOrder.ID.in_(list(root_ids)))
+            .cte("order_tree", recursive=True))
+    # UNION (non UNION ALL): un ciclo nei riferimenti non manda in loop la query
+    return tree.union(
+        select(ProductionOrder.ID, ProductionOrder.status, ProductionOrder.version)
+        .where(ProductionOrder.parentProductionOrderDetailsID == tree.c.ID))
+
+
+def load_subtree(session: Session, root_ids: Iterable[int]) -> list:
+    tree = subtree_query(root_ids)
+    return session.execute(select(tree.c.ID, tree.c.status, tree.c.version)).all()
+
+
+def check_status_transition(current: str, new_status: str):
+    # check if status can be updated Planned -> In Progress -> Completed
+    if current == "Completed":
+        raise HTTPException(
+            status_code=400, detail="Production order is already completed")
+    if current == "In Progress" and new_status == "Planned":
+        raise HTTPException(
+            status_code=400, detail="Cannot revert status from In Progress to Planned")
+    if current == "Planned" and new_status == "Completed":
+        raise HTTPException(
+            status_code=400, detail="Cannot complete a production order that is still planned")
+    if current == new_status:
+        raise HTTPException(
+            status_code=400, detail=f"Production order is already in status: {new_status}")
+
+
+def _expire(session: Session, model, ids):
+    # Gli oggetti già in sessione non vedono gli UPDATE diretti: si ricaricano
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, model) and obj.ID in ids:
+            session.expire(obj)
+
+
+def _expunge(session: Session, model, ids):
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, model) and obj.ID in ids:
+            session.expunge(obj)
+
+
+def update_status(session: Session, item_id: int, new_status: str) -> ProductionOrder:
+    if new_status not in VALID_STATUSES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid status: {new_status}. Valid statuses are: {VALID_STATUSES}"
+        )
+
+    # Le modifiche in sospeso vanno scritte prima degli UPDATE diretti
+    session.flush()
+    rows = load_subtree(session, [item_id])
+    root = next((row for row in rows if row.ID == item_id), None)
+    if root is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    check_status_transition(root.status, new_status)
+    for row in rows:
+        if row.ID != item_id:
+            check_status_transition(row.status, new_status)
+
+    ids = [row.ID for row in rows]
+    order_table = ProductionOrder.__table__
+    # Solo le righe ancora alla versione letta: una modifica o una
+    # cancellazione concorrente fa ripartire l'operazione (run_with_retry)
+    result = session.execute(update(order_table)
+                             .where(tuple_(order_table.c.ID, order_table.c.version)
+                                    .in_([(row.ID, row.version) for row in rows]))
+                             .values(status=new_status, version=order_table.c.version + 1))
+    if result.rowcount != len(ids):
+        raise StaleDataError(f"{order_table.name}: rows changed by a concurrent update")
+    _expire(session, ProductionOrder, set(ids))
+    for row in rows:
+        changes.record(session, "orders", row.ID, "update", {"status": new_status}, row.version + 1)
+
+    item = session.get(ProductionOrder, item_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return item
+
+
+def delete_tree(session: Session, item_id: int):
+    session.flush()
+    rows = load_subtree(session, [item_id])
+    ids = [row.ID for row in rows]
+    if item_id not in ids:
+        raise HTTPException(status_code=404, detail="Not found")
+
+    # Le letture sopra possono precedere l'inizio della transazione di
+    # scrittura: i dettagli si leggono con DELETE ... RETURNING e un ordine
+    # già cancellato da un'altra richiesta fa ripartire l'operazione, come
+    # faceva il controllo di versione del delete ORM.
+    details = session.execute(
+        delete(ProductionOrderDetails.__table__)
+        .where(ProductionOrderDetails.__table__.c.productionOrderID.in_(ids))
+        .returning(ProductionOrderDetails.__table__.c.ID,
+                   ProductionOrderDetails.__table__.c.productionOrderID,
+                   ProductionOrderDetails.__table__.c.productID,
+                   ProductionOrderDetails.__table__.c.quantityLocked)).all()
+    order_table = ProductionOrder.__table__
+    result = session.execute(
+        delete(order_table)
+        .where(tuple_(order_table.c.ID, order_table.c.version)
+               .in_([(row.ID, row.version) for row in rows])))
+    if result.rowcount != len(ids):
+        raise StaleDataError(f"{order_table.name}: rows changed by a concurrent update")
+
+    # Libero Pezzi bloccati: un solo UPDATE (executemany) per tutti gli articoli
+    released = defaultdict(int)
+    for detail in details:
+        released[detail.productID] += detail.quantityLocked
+        ledger.record(session, detail.productID, "release",
+                      detail.quantityLocked, -detail.quantityLocked, detail.productionOrderID)
+    released = {productID: amount for productID, amount in released.items() if amount}
+    if released:
+        session.execute(
+            update(inventory_table)
+            .where(inventory_table.c.ID == bindparam("item_id"))
+            .values(quantity_locked=inventory_table.c.quantity_locked - bindparam("amount"),
+                    quantity_on_hand=inventory_table.c.quantity_on_hand + bindparam("amount"),
+                    version=inventory_table.c.version + 1),
+            [{"item_id": productID, "amount": amount} for productID, amount in released.items()])
+        _expire(session, Inventory, released.keys())
+        for item in session.execute(
+                select(Inventory.ID, Inventory.quantity_on_hand, Inventory.quantity_locked,
+                       Inventory.version).where(Inventory.ID.in_(released))):
+            changes.record(session, "inventory", item.ID, "update",
+                           {"quantity_on_hand": item.quantity_on_hand,
+                            "quantity_locked": item.quantity_locked}, item.version)
+
+    detail_ids = [detail.ID for detail in details]
+    _expunge(session, ProductionOrderDetails, set(detail_ids))
+    _expunge(session, ProductionOrder, set(ids))
+    for detail_id in detail_ids:
+        changes.record(session, "details", detail_id, "delete", {})
+    for order_id in ids:
+        changes.record(session, "orders", order_id, "delete", {})
@@ -0,0 +1,106 @@
+import base64
+from typing import Any, Iterable, List, Optional
+
+from fastapi import HTTPException, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+# Pagina di default e massima: i client che vogliono tutto seguono
+# X-Next-Cursor una pagina alla volta
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> int:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def parse_fields(model, fields: Optional[str]) -> List[str]:
+    valid_fields = list(model.__fields__.keys())
+    if not fields:
+        return valid_fields
+
+    requested_fields = [f for f in fields.split(",") if f]
+    invalid = set(requested_fields) - set(valid_fields)
+    if invalid:
+        raise HTTPException(
+            status_code=400, detail=f"Invalid fields: {invalid}")
+    return requested_fields
+
+
+def projected(example: dict) -> dict:
+    # Argomenti per le route con fields=: le righe hanno solo le colonne
+    # richieste, quindi lo schema è una lista di dict con un esempio
+    # proiettato invece della lista del modello
+    return {
+        "response_model": List[dict],
+        "responses": {200: {
+            "description": "Rows with the columns listed in fields (all columns when fields is omitted)",
+            "content": {"application/json": {"example": [example]}},
+        }},
+    }
+
+
+async def paginate(
+    session: AsyncSession,
+    model,
+    response: Response,
+    fields: Optional[str] = None,
+    where: Iterable[Any] = (),
+    join: Optional[tuple] = None,
+    limit: Optional[int] = DEFAULT_PAGE_SIZE,
+    after: Optional[str] = None,
+) -> List[dict]:
+    # limit=None solo per usi interni (benchmark, export): le route lo fissano
+    # Keyset pagination sull'ID: la projection avviene in SQL, non in Python
+    requested_fields = parse_fields(model, fields)
+    columns = [getattr(model, f) for f in requested_fields]
+    if "ID" not in requested_fields:
+        columns.append(model.ID)
+
+    query = select(*columns)
+    if join is not None:
+        query = query.join(*join)
+    for clause in where:
+        query = query.where(clause)
+    if after:
+        query = query.where(model.ID > decode_cursor(after))
+    query = query.order_by(model.ID)
+    if limit:
+        query = query.limit(limit + 1)
+
+    # Esecuzione Core: niente caricamento ORM per delle semplici colonne
+    connection = await session.connection()
+    result = await connection.execute(query)
+    keys = list(result.keys())
+    rows = [dict(zip(keys, row)) for row in result.all()]
+
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1]["ID"])
+
+    if "ID" not in requested_fields:
+        for row in rows:
+            row.pop("ID")
+    return rows
+
+
+async def paginate_response(session: AsyncSession, model, response: Response, **kwargs) -> Response:
+    # Le righe sono già dict di tipi semplici: orjson le scrive direttamente in
+    # byte, senza la validazione per riga del response_model (che resta per
+    # lo schema OpenAPI: con fields= è quello di projected)
+    rows = await paginate(session, model, response, **kwargs)
+    headers = {}
+    if NEXT_CURSOR_HEADER in response.headers:
+        headers[NEXT_CURSOR_HEADER] = response.headers[NEXT_CURSOR_HEADER]
+    return ORJSONResponse(rows, headers=headers)
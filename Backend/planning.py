@@ -0,0 +1,212 @@
+"""Motore MRP: fabbisogni lordi e netti di tutti gli ordini aperti in un passaggio.
+
+Uso da riga di comando (dalla cartella Backend):
+
+    python -m planning --bucket week --output plan.json
+"""
+import argparse
+import json
+import sys
+import time
+from dataclasses import dataclass
+from datetime import date as Date
+from typing import List
+
+import numpy as np
+from sqlalchemy import select
+from sqlmodel import Session
+
+from bom_engine import BomCycleError
+from database import engine
+from models import BillOfMaterials, Inventory, ProductionOrder, ProductionOrderDetails
+from order_tree import OPEN_STATUSES
+BUCKETS = ("day", "week", "month")
+
+
+@dataclass
+class PlanningData:
+    # Tutto quello che serve al calcolo, letto con una query per tabella
+    items: list      # (ID, code, category, quantity_on_hand)
+    boms: list       # (parentProductID, childProductID, quantity)
+    receipts: list   # (productID, date, quantità ancora da produrre)
+    demands: list    # (productID, date, quantità non ancora bloccata)
+
+
+def load(session: Session) -> PlanningData:
+    items = session.execute(select(
+        Inventory.ID, Inventory.code, Inventory.category, Inventory.quantity_on_hand)
+        .order_by(Inventory.ID)).all()
+    boms = session.execute(select(
+        BillOfMaterials.parentProductID, BillOfMaterials.childProductID,
+        BillOfMaterials.quantity)).all()
+    receipts = session.execute(select(
+        ProductionOrder.productID, ProductionOrder.date,
+        ProductionOrder.quantityRequested - ProductionOrder.quantityProduced)
+        .where(ProductionOrder.status.in_(OPEN_STATUSES))
+        .where(ProductionOrder.quantityRequested > ProductionOrder.quantityProduced)).all()
+    demands = session.execute(select(
+        ProductionOrderDetails.productID, ProductionOrder.date,
+        ProductionOrderDetails.quantityRequired - ProductionOrderDetails.quantityLocked)
+        .join(ProductionOrder, ProductionOrder.ID == ProductionOrderDetails.productionOrderID)
+        .where(ProductionOrder.status.in_(OPEN_STATUSES))
+        .where(ProductionOrderDetails.quantityRequired > ProductionOrderDetails.quantityLocked)).all()
+    return PlanningData(items, boms, receipts, demands)
+
+
+def bucket_of(value: str, bucket: str) -> str:
+    day = value[:10]
+    if bucket == "day":
+        return day
+    if bucket == "month":
+        return day[:7]
+    try:
+        year, week, _ = Date.fromisoformat(day).isocalendar()
+    except ValueError:
+        return day
+    return f"{year}-W{week:02d}"
+
+
+def _find_cycle(parents, children) -> List[int]:
+    # Posizioni di un ciclo (la prima ripetuta in fondo), con una DFS iterativa
+    graph = {}
+    for parent, child in zip(parents.tolist(), children.tolist()):
+        graph.setdefault(parent, []).append(child)
+    done = set()
+    for start in graph:
+        if start in done:
+            continue
+        path, on_path, stack = [start], {start}, [(start, iter(graph[start]))]
+        while stack:
+            node, pending = stack[-1]
+            child = next(pending, None)
+            if child is None:
+                stack.pop()
+                path.pop()
+                on_path.discard(node)
+                done.add(node)
+            elif child in on_path:
+                return path[path.index(child):] + [child]
+            elif child not in done:
+                stack.append((child, iter(graph.get(child, ()))))
+                path.append(child)
+                on_path.add(child)
+    return []
+
+
+def _low_level_codes(parents, children, products: int, ids) -> np.ndarray:
+    # Livello di ogni articolo = cammino più lungo da un prodotto finito:
+    # un articolo si pianifica solo dopo tutti quelli che lo usano
+    level = np.zeros(products, dtype=np.int64)
+    for _ in range(products + 1):
+        candidate = level.copy()
+        np.maximum.at(candidate, children, level[parents] + 1)
+        if np.array_equal(candidate, level):
+            return level
+        level = candidate
+    # Possibile solo con dati inseriti prima dei controlli di bom_engine
+    cycle = [int(ids[position]) for position in _find_cycle(parents, children)]
+    raise BomCycleError(f"Cycle detected in bill of materials: {' -> '.join(map(str, cycle))}")
+
+
+def plan(data: PlanningData, bucket: str = "week") -> dict:
+    if bucket not in BUCKETS:
+        raise ValueError(f"Invalid bucket: {bucket}. Valid buckets are: {list(BUCKETS)}")
+    started = time.perf_counter()
+
+    ids = np.array([item[0] for item in data.items], dtype=np.int64)
+    on_hand = np.array([item[3] for item in data.items], dtype=np.int64)
+    products = len(ids)
+
+    labels = sorted({bucket_of(row[1], bucket) for row in data.receipts}
+                    | {bucket_of(row[1], bucket) for row in data.demands})
+    bucket_index = {label: i for i, label in enumerate(labels)}
+    periods = max(len(labels), 1)
+
+    def matrix(rows) -> np.ndarray:
+        # Somma le quantità per (articolo, periodo) con un solo bincount
+        if not rows:
+            return np.zeros((products, periods), dtype=np.int64)
+        product_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        periods_of = np.fromiter((bucket_index[bucket_of(row[1], bucket)] for row in rows),
+                                 dtype=np.int64, count=len(rows))
+        quantities = np.fromiter((row[2] for row in rows), dtype=np.int64, count=len(rows))
+        position = np.searchsorted(ids, product_ids)
+        known = (position < products) & (ids[np.minimum(position, products - 1)] == product_ids)
+        flat = position[known] * periods + periods_of[known]
+        return np.bincount(flat, weights=quantities[known], minlength=products * periods) \
+            .astype(np.int64).reshape(products, periods)
+
+    gross = matrix(data.demands)
+    receipts = matrix(data.receipts)
+
+    if data.boms and products:
+        bom = np.array(data.boms, dtype=np.int64)
+        parent_pos = np.searchsorted(ids, bom[:, 0])
+        child_pos = np.searchsorted(ids, bom[:, 1])
+        known = ((parent_pos < products) & (child_pos < products)
+                 & (ids[np.minimum(parent_pos, products - 1)] == bom[:, 0])
+                 & (ids[np.minimum(child_pos, products - 1)] == bom[:, 1]))
+        parents, children, per_unit = parent_pos[known], child_pos[known], bom[known, 2]
+    else:
+        parents = children = per_unit = np.zeros(0, dtype=np.int64)
+
+    level = _low_level_codes(parents, children, products, ids)
+    makeable = np.zeros(products, dtype=bool)
+    makeable[parents] = True
+    planned = np.zeros((products, periods), dtype=np.int64)
+
+    for current in range(int(level.max()) + 1 if products else 0):
+        rows = np.flatnonzero(level == current)
+        # Saldo proiettato per periodo e fabbisogno netto cumulato
+        balance = on_hand[rows, None] + np.cumsum(receipts[rows] - gross[rows], axis=1)
+        shortage = np.maximum.accumulate(np.maximum(-balance, 0), axis=1)
+        planned[rows] = np.diff(shortage, axis=1, prepend=0)
+
+        # Gli ordini suggeriti generano fabbisogno lordo sui componenti
+        edges = np.flatnonzero(level[parents] == current)
+        if edges.size:
+            np.add.at(gross, children[edges], planned[parents[edges]] * per_unit[edges, None])
+
+    codes = [item[1] for item in data.items]
+    shortages = []
+    suggested_orders = []
+    for position, period in zip(*np.nonzero(planned)):
+        entry = {
+            "productID": int(ids[position]),
+            "code": codes[position],
+            "bucket": labels[period],
+            "quantity": int(planned[position, period]),
+        }
+        (suggested_orders if makeable[position] else shortages).append(entry)
+
+    return {
+        "bucket": bucket,
+        "buckets": labels,
+        "grossRequirements": int(gross.sum()),
+        "scheduledReceipts": int(receipts.sum()),
+        "shortages": shortages,
+        "suggestedOrders": suggested_orders,
+        "elapsedMs": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="MRP planning run over all open production orders")
+    parser.add_argument("--bucket", choices=BUCKETS, default="week")
+    parser.add_argument("--output", help="Write the plan to this JSON file instead of stdout")
+    args = parser.parse_args(argv)
+
+    with Session(engine) as session:
+        result = plan(load(session), args.bucket)
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"{len(result['shortages'])} shortages, {len(result['suggestedOrders'])} "
+              f"suggested orders written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,70 +1,162 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile
 from sqlmodel import Session, select
-from models import User, BillOfMaterials
-from database import get_session
-from auth import get_current_user
+from models import BillOfMaterials
+from database import get_async_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from pagination import paginate_response, projected, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from export import export_response
+from typing import Optional, List
+from auth import Principal, get_current_user
+from bom_engine import bom_engine, BomCycleError
+from availability import availability_index
+import importer
 router = APIRouter()
 
 
 @router.post("/", response_model=BillOfMaterials)
-def create_billOfMaterials(
+async def create_billOfMaterials(
     item: BillOfMaterials,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_current_user),
 ):
+    try:
+        await session.run_sync(
+            bom_engine.check_edge, item.parentProductID, item.childProductID)
+    except BomCycleError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     session.add(item)
-    session.commit()
-    session.refresh(item)
+    await session.commit()
+    await session.refresh(item)
     return item
 
 
-@router.get("/", response_model=list[BillOfMaterials])
-def read_all(session: Session = Depends(get_session)):
-    return session.exec(select(BillOfMaterials)).all()
+@router.get("/", **projected({"ID": 1, "parentProductID": 12, "childProductID": 30}))
+async def read_all(
+    response: Response,
+    fields: Optional[str] = Query(
+        None, description="Comma-separated list of fields to include"),
+    parentProductID: Optional[int] = Query(None),
+    childProductID: Optional[int] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(
+        None, description="Cursor returned in the X-Next-Cursor header"),
+    session: AsyncSession = Depends(get_async_session)
+):
+    where = []
+    if parentProductID is not None:
+        where.append(BillOfMaterials.parentProductID == parentProductID)
+    if childProductID is not None:
+        where.append(BillOfMaterials.childProductID == childProductID)
+    return await paginate_response(session, BillOfMaterials, response, fields=fields,
+                                   where=where, limit=limit, after=after)
+
+
+@router.post("/import")
+async def import_boms(
+    file: UploadFile = File(..., description="CSV or XLSX: parent, child, quantity (item codes)"),
+    current_user: Principal = Depends(get_current_user),
+):
+    try:
+        return await asyncio.to_thread(importer.import_file, "bom", file.file, file.filename)
+    except importer.ImportFileError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/export")
+async def export(format: str = Query("ndjson", description="ndjson or csv")):
+    return export_response(BillOfMaterials, format)
+
+
+@router.get("/buildable", response_model=List[dict])
+async def buildable_all(session: AsyncSession = Depends(get_async_session)):
+    return await session.run_sync(availability_index.all)
 
 
 @router.get("/{item_id}", response_model=BillOfMaterials)
-def read_one(item_id: int, session: Session = Depends(get_session)):
-    item = session.get(BillOfMaterials, item_id)
+async def read_one(item_id: int, session: AsyncSession = Depends(get_async_session)):
+    item = await session.get(BillOfMaterials, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Not found")
     return item
 
 
 @router.put("/{item_id}", response_model=BillOfMaterials)
-def update(
+async def update(
     item_id: int,
     new_data: BillOfMaterials,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_current_user),
 ):
-    item = session.get(BillOfMaterials, item_id)
+    item = await session.get(BillOfMaterials, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Not found")
     for key, value in new_data.dict(exclude_unset=True).items():
         setattr(item, key, value)
+    try:
+        await session.run_sync(
+            bom_engine.check_edge, item.parentProductID, item.childProductID, item.ID)
+    except BomCycleError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     session.add(item)
-    session.commit()
-    session.refresh(item)
+    await session.commit()
+    await session.refresh(item)
     return item
 
 
 @router.delete("/{item_id}")
-def delete(
+async def delete(
     item_id: int,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_current_user),
 ):
-    item = session.get(BillOfMaterials, item_id)
+    item = await session.get(BillOfMaterials, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Not found")
-    session.delete(item)
-    session.commit()
+    await session.delete(item)
+    await session.commit()
     return {"ok": True}
 
 
 @router.get("/{parent_id}/children", response_model=list[BillOfMaterials])
-def get_bom_children(parent_id: int, db: Session = Depends(get_session)):
-    results = db.query(BillOfMaterials).filter(
-        BillOfMaterials.parentProductID == parent_id).all()
+async def get_bom_children(parent_id: int, session: AsyncSession = Depends(get_async_session)):
+    results = (await session.exec(select(BillOfMaterials).where(
+        BillOfMaterials.parentProductID == parent_id))).all()
     return results
+
+
+def explode_requirements(session: Session, parent_id: int, qty: int):
+    tree = bom_engine.tree(session, parent_id)
+    totals = bom_engine.closure(session, parent_id)
+    return {
+        "parentProductID": parent_id,
+        "quantity": qty,
+        "requirements": [
+            {
+                "productID": product_id,
+                "quantity": quantity * qty,
+                "leaf": not tree[product_id],
+            }
+            for product_id, quantity in totals.items()
+        ],
+    }
+
+
+@router.get("/{parent_id}/explode")
+async def explode(
+    parent_id: int,
+    qty: int = Query(1, ge=1),
+    session: AsyncSession = Depends(get_async_session),
+):
+    try:
+        return await session.run_sync(explode_requirements, parent_id, qty)
+    except BomCycleError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/{parent_id}/buildable")
+async def buildable(parent_id: int, session: AsyncSession = Depends(get_async_session)):
+    entry = await session.run_sync(availability_index.get, parent_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Product has no bill of materials")
+    return entry
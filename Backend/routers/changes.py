@@ -0,0 +1,85 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from database import get_async_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from pagination import paginate, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from typing import Optional, List
+from changes import hub, MODELS, format_sse
+from http_cache import response_cache
+
+router = APIRouter()
+
+KEEPALIVE_SECONDS = 15
+
+
+def parse_entities(entities: Optional[str]) -> Optional[set]:
+    if not entities:
+        return None
+    requested = {e for e in entities.split(",") if e}
+    invalid = requested - MODELS.keys()
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid entities: {invalid}")
+    return requested
+
+
+@router.get("/snapshot/{entity}")
+async def read_snapshot(
+    entity: str,
+    response: Response,
+    fields: Optional[str] = Query(
+        None, description="Comma-separated list of fields to include"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(
+        None, description="Cursor returned in the X-Next-Cursor header"),
+    session: AsyncSession = Depends(get_async_session),
+):
+    model = MODELS.get(entity)
+    if model is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    # La sequenza si legge prima dei dati: gli eventi successivi possono
+    # ripetere modifiche già nello snapshot, ma nessuna va persa
+    sequence = hub.sequence
+    items = await paginate(session, model, response, fields=fields,
+                           limit=limit, after=after)
+    return {"seq": sequence, "items": items}
+
+
+@router.get("/cache")
+async def read_cache_stats():
+    return response_cache.stats()
+
+
+@router.get("/stream")
+async def stream(
+    request: Request,
+    after: Optional[int] = Query(
+        None, description="Last sequence received (snapshot seq on first connection)"),
+    entities: Optional[str] = Query(
+        None, description="Comma-separated list: inventory, orders, details, bom"),
+    last_event_id: Optional[str] = Header(None),
+):
+    wanted = parse_entities(entities)
+    if after is None:
+        after = int(last_event_id) if last_event_id and last_event_id.isdigit() else hub.sequence
+
+    async def events():
+        cursor = after
+        while not await request.is_disconnected():
+            result = hub.since(cursor, wanted)
+            if result is None:
+                # Cursore fuori dal buffer: il client deve rileggere lo snapshot
+                yield format_sse("reset", {"seq": hub.sequence})
+                return
+            changes, cursor = result
+            for change in changes:
+                if change["op"] == "reset":
+                    # Modifiche di un altro worker, non presenti nel buffer
+                    yield format_sse("reset", {"seq": change["seq"], "entity": change["entity"]})
+                    return
+                yield format_sse("change", change, change["seq"])
+            if not changes:
+                yield ": keepalive\n\n"
+            await hub.wait(cursor, KEEPALIVE_SECONDS)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
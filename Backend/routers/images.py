@@ -0,0 +1,53 @@
+import asyncio
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import FileResponse
+from auth import Principal, get_current_user
+import blobs
+
+router = APIRouter()
+
+# Il contenuto non cambia mai per lo stesso hash
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def _file_response(request: Request, blob_hash: str, path: str) -> Response:
+    etag = f'"{blob_hash}"'
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={"etag": etag, "cache-control": IMMUTABLE})
+    return FileResponse(path, media_type=blobs.media_type(path), headers={
+        "etag": etag, "cache-control": IMMUTABLE, "x-content-type-options": "nosniff"})
+
+
+@router.post("/")
+async def upload_image(
+    file: UploadFile = File(...),
+    current_user: Principal = Depends(get_current_user),
+):
+    data = await file.read(blobs.IMAGE_MAX_BYTES + 1)
+    try:
+        blob_hash = await asyncio.to_thread(blobs.store, data)
+    except blobs.BlobError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"hash": blob_hash, "size": len(data), "content_type": blobs.sniff(data[:16])}
+
+
+@router.get("/{blob_hash}")
+async def read_image(blob_hash: str, request: Request):
+    if not blobs.exists(blob_hash):
+        raise HTTPException(status_code=404, detail="Not found")
+    return _file_response(request, blob_hash, blobs.path_of(blob_hash))
+
+
+@router.get("/{blob_hash}/thumbnail")
+async def read_thumbnail(
+    blob_hash: str,
+    request: Request,
+    size: int = Query(128, description=f"One of {list(blobs.THUMBNAIL_SIZES)}"),
+):
+    if size not in blobs.THUMBNAIL_SIZES:
+        raise HTTPException(
+            status_code=400, detail=f"Invalid size: {size}. Valid sizes are: {list(blobs.THUMBNAIL_SIZES)}")
+    if not blobs.exists(blob_hash):
+        raise HTTPException(status_code=404, detail="Not found")
+    path = await asyncio.to_thread(blobs.make_thumbnail, blob_hash, size)
+    return _file_response(request, f"{blob_hash}-{size}", path)
@@ -1,11 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import asyncio
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import ORJSONResponse
 from sqlmodel import Session, select
-from models import User, Inventory, ProductionOrder, ProductionOrderDetails
+from models import Inventory, InventoryMovement
 from routers import production_order
-from database import get_session
-from pydantic import BaseModel
+from database import get_async_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from pagination import paginate_response, projected, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from export import export_response
+from pydantic import BaseModel, Field
+from sqlalchemy.exc import IntegrityError
 from typing import Optional, List
-from auth import create_access_token, get_current_user
+from auth import Principal, create_access_token, get_current_user
+from stock import run_with_retry, remove_stock
+import allocation
+import attributes
+import blobs
+import importer
+import ledger
+import search
 
 router = APIRouter()
 
@@ -14,176 +27,311 @@ class QuantityPayload(BaseModel):
     quantity: int
 
 
-def apply_inventory_addition(item: Inventory, payload: QuantityPayload, session: Session):
-    productionOrder = session.exec(
-        select(ProductionOrder)
-        .where(ProductionOrder.productID == item.ID)
-        .where(ProductionOrder.status.in_(["In Progress", "Planned"]))
-        .order_by(ProductionOrder.date.desc())
-    ).all()
-
-    if productionOrder:
-        copyOfquantity = payload.quantity
-        for order in productionOrder:
-            if copyOfquantity <= 0:
-                break
-            if order.quantityRequested > order.quantityProduced:
-                quantity_just_produced = min(
-                    order.quantityRequested - order.quantityProduced, copyOfquantity)
-                order.quantityProduced += quantity_just_produced
-                copyOfquantity -= quantity_just_produced
-
-                if order.quantityProduced >= order.quantityRequested:
-                    production_order.update_production_order_status_backend(
-                        order.ID, "Completed", session)
-
-                session.add(order)
-
-    productionOrderDetails = session.exec(
-        select(ProductionOrderDetails)
-        .where(ProductionOrderDetails.productID == item.ID)
-        .where(ProductionOrderDetails.quantityLocked < ProductionOrderDetails.quantityRequired)
-        .join(ProductionOrder, ProductionOrder.ID == ProductionOrderDetails.productionOrderID)
-        .where(ProductionOrder.status.in_(["In Progress", "Planned"]))
-        .order_by(ProductionOrder.date.desc())
-    ).all()
-
-    if productionOrderDetails:
-        for detail in productionOrderDetails:
-            if payload.quantity <= 0:
-                break
-            quantity_just_produced = min(
-                detail.quantityRequired - detail.quantityLocked, payload.quantity)
-            detail.quantityLocked += quantity_just_produced
-            payload.quantity -= quantity_just_produced
-            item.quantity_locked += quantity_just_produced
-            session.add(detail)
-
-    item.quantity_on_hand += payload.quantity
-    session.add(item)
+class MovementRequest(BaseModel):
+    itemID: Optional[int] = None
+    code: Optional[str] = None
+    type: str = "add"
+    quantity: int
+
+
+class BulkMovementsPayload(BaseModel):
+    movements: List[MovementRequest] = Field(
+        ..., max_length=production_order.MAX_BULK_SIZE)
+
+
+async def store_image(value: Optional[str]) -> Optional[str]:
+    # Le immagini stanno nell'archivio blobs: nel database solo l'hash
+    try:
+        return await asyncio.to_thread(blobs.normalize_image, value)
+    except blobs.BlobError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def validate_attributes(value: Optional[str]) -> Optional[str]:
+    try:
+        return attributes.validate(value)
+    except attributes.InvalidAttributes as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def apply_inventory_addition(item: Inventory, payload: QuantityPayload, session: Session,
+                             policy: str = allocation.ALLOCATION_POLICY):
+    # payload resta intatto: in caso di conflitto l'operazione viene ripetuta
+    return allocation.apply_addition(session, item, payload.quantity, policy)
+
+
+def apply_inventory_movements(movements: List[MovementRequest], session: Session,
+                              policy: str = allocation.ALLOCATION_POLICY):
+    allocation.check_policy(policy)
+    ids = {m.itemID for m in movements if m.itemID is not None}
+    codes = {m.code for m in movements if m.itemID is None and m.code is not None}
+
+    items = {}
+    by_code = {}
+    if ids:
+        for item in session.exec(select(Inventory).where(Inventory.ID.in_(ids))):
+            items[item.ID] = item
+    if codes:
+        for item in session.exec(select(Inventory).where(Inventory.code.in_(codes))):
+            items[item.ID] = item
+            by_code.setdefault(item.code, item)
+
+    results = []
+    for index, movement in enumerate(movements):
+        item = items.get(movement.itemID) if movement.itemID is not None else by_code.get(movement.code)
+        if item is None:
+            results.append({"index": index, "ok": False, "error": "Not found"})
+            continue
+        if movement.quantity <= 0:
+            results.append({"index": index, "ok": False, "error": "Quantity must be positive"})
+            continue
+
+        if movement.type == "remove":
+            if item.quantity_on_hand < movement.quantity:
+                results.append({"index": index, "ok": False,
+                                "error": "Not enough items in inventory"})
+                continue
+            item.quantity_on_hand -= movement.quantity
+            ledger.record(session, item, "remove", on_hand_delta=-movement.quantity)
+        elif movement.type == "add":
+            # Stessa allocazione (e politica) del carico singolo, senza commit:
+            # i movimenti successivi vedono gli ordini già avanzati
+            try:
+                allocation.allocate_addition(session, item, movement.quantity, policy)
+            except HTTPException as e:
+                results.append({"index": index, "ok": False, "error": e.detail})
+                continue
+        else:
+            results.append({"index": index, "ok": False,
+                            "error": f"Invalid movement type: {movement.type}"})
+            continue
+
+        results.append({"index": index, "ok": True, "item": {
+            "ID": item.ID,
+            "quantity_on_hand": item.quantity_on_hand,
+            "quantity_locked": item.quantity_locked,
+        }})
+
     session.commit()
-    session.refresh(item)
-    return item
+    return results
 
 
 @router.post("/", response_model=Inventory)
-def create_inventory(
+async def create_inventory(
     item: Inventory,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_current_user),
 ):
+    item.image = await store_image(item.image)
+    item.datas = validate_attributes(item.datas)
     session.add(item)
-    session.commit()
-    session.refresh(item)
+    ledger.record(session.sync_session, item, "opening",
+                  item.quantity_on_hand, item.quantity_locked)
+    try:
+        await session.commit()
+    except IntegrityError:
+        raise HTTPException(status_code=400, detail="Code already exists")
+    await session.refresh(item)
     return item
 
 
-# ritorniamo dict invece che Inventory
-@router.get("/", response_model=List[dict])
-def read_all(
+# ritorniamo dict invece che Inventory (ORJSONResponse, senza validazione per riga)
+@router.get("/", **projected({"ID": 1, "code": "A-100", "quantity_on_hand": 25}))
+async def read_all(
+    request: Request,
+    response: Response,
     fields: Optional[str] = Query(
         None, description="Comma-separated list of fields to include"),
-    session: Session = Depends(get_session)
+    category: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(
+        None, description="Cursor returned in the X-Next-Cursor header"),
+    session: AsyncSession = Depends(get_async_session)
+):
+    # Filtri sugli attributi: ?attr.supplier=ACME&attr.bin=A12
+    try:
+        where = attributes.filters(request.query_params)
+    except attributes.InvalidAttributes as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if category:
+        where.append(Inventory.category == category)
+    return await paginate_response(session, Inventory, response, fields=fields, where=where,
+                                   limit=limit, after=after)
+
+
+@router.post("/movements/bulk")
+async def add_movements_bulk(
+    payload: BulkMovementsPayload,
+    session: AsyncSession = Depends(get_async_session),
+    policy: str = Query(allocation.ALLOCATION_POLICY,
+                        description="Allocation policy: lifo, fifo, priority or due_date"),
+    current_user: Principal = Depends(get_current_user),
+):
+    results = await session.run_sync(lambda s: run_with_retry(
+        s, lambda s: apply_inventory_movements(payload.movements, s, policy)))
+    return {"results": results}
+
+
+@router.post("/import")
+async def import_items(
+    file: UploadFile = File(..., description="CSV or XLSX: code, category, quantity_on_hand, datas, attr.<name>"),
+    current_user: Principal = Depends(get_current_user),
+):
+    # Fuori dall'event loop: un file grande richiede qualche secondo
+    try:
+        return await asyncio.to_thread(importer.import_file, "inventory", file.file, file.filename)
+    except importer.ImportFileError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/export")
+async def export(format: str = Query("ndjson", description="ndjson or csv")):
+    return export_response(Inventory, format)
+
+
+@router.get("/attributes")
+async def read_attributes():
+    # Attributi dichiarati (filtrabili e con tipo controllato)
+    return attributes.schema()
+
+
+@router.get("/search", response_model=list[Inventory])
+async def search_inventory(
+    q: str = Query(..., min_length=1, description="Words to match as prefixes of code, category or attributes"),
+    limit: int = Query(search.SEARCH_LIMIT, ge=1, le=search.MAX_SEARCH_LIMIT),
+    session: AsyncSession = Depends(get_async_session),
 ):
-    items = session.exec(select(Inventory)).all()
+    return ORJSONResponse(await session.run_sync(search.find, q, limit))
 
-    if fields:
-        requested_fields = set(fields.split(","))
-        valid_fields = set(Inventory.__fields__.keys())
 
-        if not requested_fields.issubset(valid_fields):
-            raise HTTPException(
-                status_code=400, detail=f"Invalid fields: {requested_fields - valid_fields}")
+@router.get("/stock-at")
+async def read_stock_at(
+    at: str = Query(..., description="ISO date or timestamp (UTC unless an offset is given), "
+                                     "inclusive at its precision, e.g. 2025-01-31 or 2025-01-31T23:59:59"),
+    itemID: Optional[int] = Query(None),
+    session: AsyncSession = Depends(get_async_session),
+):
+    try:
+        return await session.run_sync(ledger.stock_at, at, itemID)
+    except ledger.InvalidTimestamp as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 
-        result = [{field: getattr(item, field)
-                   for field in requested_fields} for item in items]
-    else:
-        result = [item.dict() for item in items]
-    return result
+@router.post("/snapshots")
+async def create_snapshot(
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_current_user),
+):
+    snapshot = await session.run_sync(lambda s: run_with_retry(s, ledger.take_snapshot))
+    return {"snapshot": snapshot}
 
 
 @router.get("/{item_id}", response_model=Inventory)
-def read_one(item_id: int, session: Session = Depends(get_session)):
-    item = session.get(Inventory, item_id)
+async def read_one(item_id: int, session: AsyncSession = Depends(get_async_session)):
+    item = await session.get(Inventory, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Not found")
     return item
 
 
 @router.put("/{item_id}", response_model=Inventory)
-def update(
+async def update(
     item_id: int,
     new_data: Inventory,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_current_user),
 ):
-    item = session.get(Inventory, item_id)
+    item = await session.get(Inventory, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Not found")
-    for key, value in new_data.dict(exclude_unset=True).items():
+    values = new_data.dict(exclude_unset=True, exclude={"version"})
+    if "image" in values:
+        values["image"] = await store_image(values["image"])
+    if "datas" in values:
+        values["datas"] = validate_attributes(values["datas"])
+    on_hand, locked = item.quantity_on_hand, item.quantity_locked
+    for key, value in values.items():
         setattr(item, key, value)
+    # Rettifica manuale delle quantità
+    ledger.record(session.sync_session, item, "adjust",
+                  item.quantity_on_hand - on_hand, item.quantity_locked - locked)
     session.add(item)
-    session.commit()
-    session.refresh(item)
+    try:
+        await session.commit()
+    except IntegrityError:
+        raise HTTPException(status_code=400, detail="Code already exists")
+    await session.refresh(item)
     return item
 
 
 @router.delete("/{item_id}")
-def delete(
+async def delete(
     item_id: int,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_current_user),
 ):
-    item = session.get(Inventory, item_id)
+    item = await session.get(Inventory, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Not found")
-    session.delete(item)
-    session.commit()
+    ledger.record(session.sync_session, item.ID, "adjust",
+                  -item.quantity_on_hand, -item.quantity_locked)
+    await session.delete(item)
+    await session.commit()
     return {"ok": True}
 
 
 @router.post("/{item_id}/add/")
-def add_to_inventory(
+async def add_to_inventory(
     item_id: int,
     payload: QuantityPayload,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    policy: str = Query(allocation.ALLOCATION_POLICY,
+                        description="Allocation policy: lifo, fifo, priority or due_date"),
+    current_user: Principal = Depends(get_current_user),
 ):
-    item = session.get(Inventory, item_id)
+    item = await session.get(Inventory, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Not found")
-    return apply_inventory_addition(item, payload, session)
+    return await session.run_sync(lambda s: run_with_retry(
+        s, lambda s: apply_inventory_addition(item, payload, s, policy)))
 
 
 @router.post("/{item_code}/addbycode/")
-def add_to_inventory_by_code(
+async def add_to_inventory_by_code(
     item_code: str,
     payload: QuantityPayload,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    policy: str = Query(allocation.ALLOCATION_POLICY,
+                        description="Allocation policy: lifo, fifo, priority or due_date"),
+    current_user: Principal = Depends(get_current_user),
 ):
-    item = session.exec(select(Inventory).where(
-        Inventory.code == item_code)).first()
+    item = (await session.exec(select(Inventory).where(
+        Inventory.code == item_code))).first()
     if not item:
         raise HTTPException(status_code=404, detail="Item with code not found")
-    return apply_inventory_addition(item, payload, session)
+    return await session.run_sync(lambda s: run_with_retry(
+        s, lambda s: apply_inventory_addition(item, payload, s, policy)))
 
 
 @router.post("/{item_id}/remove/")
-def remove_from_inventory(
+async def remove_from_inventory(
     item_id: int,
     payload: QuantityPayload,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_current_user),
 ):
-    item = session.get(Inventory, item_id)
-    if not item:
-        raise HTTPException(status_code=404, detail="Not found")
-    if item.quantity_on_hand < payload.quantity:
-        raise HTTPException(
-            status_code=400, detail="Not enough items in inventory")
-    item.quantity_on_hand -= payload.quantity
-    session.add(item)
-    session.commit()
-    session.refresh(item)
-    return item
+    return await session.run_sync(remove_stock, item_id, payload.quantity)
+
+
+@router.get("/{item_id}/movements", response_model=list[InventoryMovement])
+async def read_movements(
+    item_id: int,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(
+        None, description="Cursor returned in the X-Next-Cursor header"),
+    session: AsyncSession = Depends(get_async_session)
+):
+    return await paginate_response(session, InventoryMovement, response,
+                                   where=[InventoryMovement.itemID == item_id],
+                                   limit=limit, after=after)
@@ -1,45 +1,54 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from models import Logs
-from database import get_session
+from database import get_async_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from pagination import paginate_response, projected, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from typing import Optional
+from auth import Principal, get_current_user
+from audit import audit_log
 
 router = APIRouter()
 
-# @router.post("/", response_model=Logs)
-# def create_log(item: Logs, session: Session = Depends(get_session)):
-#     session.add(item)
-#     session.commit()
-#     session.refresh(item)
-#     return item
-
-# @router.get("/", response_model=list[Logs])
-# def read_all(session: Session = Depends(get_session)):
-#     return session.exec(select(Logs)).all()
-
-# @router.get("/{item_id}", response_model=Logs)
-# def read_one(item_id: int, session: Session = Depends(get_session)):
-#     item = session.get(Logs, item_id)
-#     if not item:
-#         raise HTTPException(status_code=404, detail="Not found")
-#     return item
-
-# @router.put("/{item_id}", response_model=Logs)
-# def update(item_id: int, new_data: Logs, session: Session = Depends(get_session)):
-#     item = session.get(Logs, item_id)
-#     if not item:
-#         raise HTTPException(status_code=404, detail="Not found")
-#     for key, value in new_data.dict(exclude_unset=True).items():
-#         setattr(item, key, value)
-#     session.add(item)
-#     session.commit()
-#     session.refresh(item)
-#     return item
-
-# @router.delete("/{item_id}")
-# def delete(item_id: int, session: Session = Depends(get_session)):
-#     item = session.get(Logs, item_id)
-#     if not item:
-#         raise HTTPException(status_code=404, detail="Not found")
-#     session.delete(item)
-#     session.commit()
-#     return {"ok": True}
+# I log sono scritti solo dal middleware di audit: qui c'è solo la lettura
+
+
+@router.get("/", **projected({"ID": 1, "timestamp": "2025-01-01T08:00:00", "executed_by": "admin@example.com"}))
+async def read_all(
+    response: Response,
+    fields: Optional[str] = Query(
+        None, description="Comma-separated list of fields to include"),
+    date_from: Optional[str] = Query(None, description="ISO timestamp (UTC)"),
+    date_to: Optional[str] = Query(None, description="ISO timestamp (UTC)"),
+    executed_by: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(
+        None, description="Cursor returned in the X-Next-Cursor header"),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_current_user),
+):
+    where = []
+    if date_from:
+        where.append(Logs.timestamp >= date_from)
+    if date_to:
+        where.append(Logs.timestamp <= date_to)
+    if executed_by:
+        where.append(Logs.executed_by == executed_by)
+    return await paginate_response(session, Logs, response, fields=fields, where=where,
+                                   limit=limit, after=after)
+
+
+@router.get("/stats")
+async def read_stats(current_user: Principal = Depends(get_current_user)):
+    return audit_log.stats()
+
+
+@router.get("/{item_id}", response_model=Logs)
+async def read_one(
+    item_id: int,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_current_user),
+):
+    item = await session.get(Logs, item_id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Not found")
+    return item
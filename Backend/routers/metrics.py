@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+import metrics
+
+router = APIRouter()
+
+
+@router.get("", response_class=PlainTextResponse)
+async def read_metrics():
+    # Formato di esposizione testuale di Prometheus
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
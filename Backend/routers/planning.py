@@ -0,0 +1,32 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException
+from database import get_async_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from pydantic import BaseModel
+from auth import Principal, get_current_user
+import planning
+from bom_engine import BomCycleError
+
+router = APIRouter()
+
+
+class PlanningRunRequest(BaseModel):
+    bucket: str = "week"
+
+
+@router.post("/run")
+async def run_planning(
+    payload: PlanningRunRequest,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_current_user),
+):
+    if payload.bucket not in planning.BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid bucket: {payload.bucket}. Valid buckets are: {list(planning.BUCKETS)}")
+    data = await session.run_sync(planning.load)
+    # Il calcolo è CPU-bound: fuori dall'event loop
+    try:
+        return await asyncio.to_thread(planning.plan, data, payload.bucket)
+    except BomCycleError as e:
+        raise HTTPException(status_code=409, detail=str(e))
@@ -1,40 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlmodel import Session, select
 from sqlalchemy.orm import Session
-from models import User, ProductionOrder, BillOfMaterials, ProductionOrderDetails, Inventory
-from database import get_session
-from pydantic import BaseModel
-from auth import get_current_user
+from models import ProductionOrder, BillOfMaterials, ProductionOrderDetails, Inventory
+from database import get_async_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from pagination import paginate_response, projected, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from export import export_response
+from typing import Optional, List
+from pydantic import BaseModel, Field
+from auth import Principal, get_current_user
+from bom_engine import bom_engine, BomCycleError
+from stock import run_with_retry
+import order_tree
+import ledger
 
 router = APIRouter()
 
+MAX_BULK_SIZE = 1000
+
 
 class StatusUpdateRequest(BaseModel):
     new_status: str
 
 
-def update_production_order_status_backend(item_id: int, new_status: str, session: Session):
-    return update_status(item_id, StatusUpdateRequest(new_status=new_status), session)
+class BulkOrdersPayload(BaseModel):
+    orders: List[ProductionOrder] = Field(..., max_length=MAX_BULK_SIZE)
 
 
-@router.post("/", response_model=ProductionOrder)
-def create_productionOrder(
-    item: ProductionOrder,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
-):
-    session.add(item)
+def update_production_order_status_backend(item_id: int, new_status: str, session: Session, commit: bool = True):
+    # Valida e aggiorna l'intero albero dell'ordine in un solo UPDATE
+    item = order_tree.update_status(session, item_id, new_status)
+    if commit:
+        session.commit()
+        session.refresh(item)
+
+    return item
 
-    boms = session.query(BillOfMaterials).filter(
-        BillOfMaterials.parentProductID == item.productID).all()
-    for bom in boms:
-        inventory_item = session.get(Inventory, bom.childProductID)
-        quantityRequired = bom.quantity * item.quantityRequested
+
+def allocate_order(item: ProductionOrder, session: Session, inventory: dict, tree: dict):
+    session.add(item)
+    session.flush()  # serve l'ID per dettagli e sotto-ordini
+
+    for childProductID, quantity in tree.get(item.productID, []):
+        inventory_item = inventory.get(childProductID)
+        if inventory_item is None:
+            raise HTTPException(
+                status_code=400, detail=f"Inventory item {childProductID} not found")
+        quantityRequired = quantity * item.quantityRequested
         quantityLocked = min(inventory_item.quantity_on_hand, quantityRequired)
 
         detail = ProductionOrderDetails(
             productionOrderID=item.ID,
-            productID=bom.childProductID,
+            productID=childProductID,
             quantityRequired=quantityRequired,
             quantityLocked=quantityLocked
         )
@@ -42,14 +59,15 @@ def create_productionOrder(
         # Blocca i pezzi in magazzino
         inventory_item.quantity_locked += quantityLocked
         inventory_item.quantity_on_hand -= quantityLocked
+        ledger.record(session, inventory_item, "lock",
+                      -quantityLocked, quantityLocked, item.ID)
         session.add(inventory_item)
 
         if (inventory_item.category == "Subassembly"):
             if quantityLocked < quantityRequired:
-                # call create_productionOrder
                 sub_order = ProductionOrder(
                     date=item.date,
-                    productID=bom.childProductID,
+                    productID=childProductID,
                     quantityRequested=quantityRequired - quantityLocked,
                     quantityProduced=0,
                     status=item.status,
@@ -57,7 +75,27 @@ def create_productionOrder(
                     userIDs=item.userIDs,
                     notes=item.notes
                 )
-                create_productionOrder(sub_order, session)
+                allocate_order(sub_order, session, inventory, tree)
+
+
+def load_inventory_for(productIDs, session: Session) -> dict:
+    # Carica in una sola query tutti gli articoli dell'albero della distinta base
+    if not productIDs:
+        return {}
+    items = session.exec(
+        select(Inventory).where(Inventory.ID.in_(productIDs))).all()
+    return {inventory_item.ID: inventory_item for inventory_item in items}
+
+
+def create_order(item: ProductionOrder, session: Session):
+    # Un solo caricamento della distinta base per tutto l'albero dell'ordine
+    try:
+        tree = bom_engine.tree(session, item.productID)
+    except BomCycleError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    inventory = load_inventory_for(tree.keys() - {item.productID}, session)
+    allocate_order(item, session, inventory, tree)
 
     session.commit()
     session.refresh(item)
@@ -65,118 +103,151 @@ def create_productionOrder(
     return item
 
 
-@router.get("/", response_model=list[ProductionOrder])
-def read_all(session: Session = Depends(get_session)):
-    return session.exec(select(ProductionOrder)).all()
+def create_orders_bulk(orders: List[ProductionOrder], session: Session):
+    # Un solo caricamento dell'inventario per tutti gli alberi e un solo commit
+    productIDs = set()
+    trees = []
+    for order in orders:
+        try:
+            tree = bom_engine.tree(session, order.productID)
+        except BomCycleError as e:
+            tree = e
+        else:
+            productIDs |= tree.keys() - {order.productID}
+        trees.append(tree)
+
+    inventory = load_inventory_for(productIDs, session)
+
+    results = []
+    for index, (order, tree) in enumerate(zip(orders, trees)):
+        if isinstance(tree, BomCycleError):
+            results.append({"index": index, "ok": False, "error": str(tree)})
+            continue
+        missing = tree.keys() - {order.productID} - inventory.keys()
+        if missing:
+            results.append({"index": index, "ok": False,
+                            "error": f"Inventory items not found: {sorted(missing)}"})
+            continue
+        allocate_order(order, session, inventory, tree)
+        results.append({"index": index, "ok": True, "ID": order.ID})
+
+    session.commit()
+    return results
+
+
+def delete_order(item_id: int, session: Session, commit: bool = True):
+    order_tree.delete_tree(session, item_id)
+    if commit:
+        session.commit()
+
+
+@router.post("/", response_model=ProductionOrder)
+async def create_productionOrder(
+    item: ProductionOrder,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_current_user),
+):
+    # Ogni tentativo parte da una copia: un rollback lascerebbe l'ID assegnato
+    data = item.model_dump(exclude={"ID", "version"})
+    return await session.run_sync(lambda s: run_with_retry(
+        s, lambda s: create_order(ProductionOrder(**data), s)))
+
+
+@router.post("/bulk")
+async def create_productionOrders_bulk(
+    payload: BulkOrdersPayload,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_current_user),
+):
+    data = [order.model_dump(exclude={"ID", "version"}) for order in payload.orders]
+    results = await session.run_sync(lambda s: run_with_retry(
+        s, lambda s: create_orders_bulk([ProductionOrder(**d) for d in data], s)))
+    return {"results": results}
+
+
+@router.get("/", **projected({"ID": 1, "productID": 12, "status": "Planned"}))
+async def read_all(
+    response: Response,
+    fields: Optional[str] = Query(
+        None, description="Comma-separated list of fields to include"),
+    status: Optional[str] = Query(None),
+    productID: Optional[int] = Query(None),
+    date_from: Optional[str] = Query(None),
+    date_to: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(
+        None, description="Cursor returned in the X-Next-Cursor header"),
+    session: AsyncSession = Depends(get_async_session)
+):
+    where = []
+    if status:
+        where.append(ProductionOrder.status == status)
+    if productID is not None:
+        where.append(ProductionOrder.productID == productID)
+    if date_from:
+        where.append(ProductionOrder.date >= date_from)
+    if date_to:
+        where.append(ProductionOrder.date <= date_to)
+    return await paginate_response(session, ProductionOrder, response, fields=fields,
+                                   where=where, limit=limit, after=after)
+
+
+@router.get("/export")
+async def export(format: str = Query("ndjson", description="ndjson or csv")):
+    return export_response(ProductionOrder, format)
 
 
 @router.get("/{item_id}", response_model=ProductionOrder)
-def read_one(item_id: int, session: Session = Depends(get_session)):
-    item = session.get(ProductionOrder, item_id)
+async def read_one(item_id: int, session: AsyncSession = Depends(get_async_session)):
+    item = await session.get(ProductionOrder, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Not found")
     return item
 
 
 @router.put("/{item_id}", response_model=ProductionOrder)
-def update(
+async def update(
     item_id: int,
     new_data: ProductionOrder,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_current_user),
 ):
-    item = session.get(ProductionOrder, item_id)
+    item = await session.get(ProductionOrder, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Not found")
-    for key, value in new_data.dict(exclude_unset=True).items():
+    for key, value in new_data.dict(exclude_unset=True, exclude={"version"}).items():
         setattr(item, key, value)
     session.add(item)
-    session.commit()
-    session.refresh(item)
+    await session.commit()
+    await session.refresh(item)
     return item
 
 
 @router.delete("/{item_id}")
-def delete(
+async def delete(
     item_id: int,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_current_user),
 ):
-    item = session.get(ProductionOrder, item_id)
-    if not item:
-        raise HTTPException(status_code=404, detail="Not found")
-
-    sub_orders = session.query(ProductionOrder).filter(
-        ProductionOrder.parentProductionOrderDetailsID == item_id).all()
-    for sub_order in sub_orders:
-        delete(sub_order.ID, session)
-
-    details = session.query(ProductionOrderDetails).filter(
-        ProductionOrderDetails.productionOrderID == item_id).all()
-    for detail in details:
-        # Libero Pezzi bloccati
-        inventory_item = session.get(Inventory, detail.productID)
-        inventory_item.quantity_locked -= detail.quantityLocked
-        inventory_item.quantity_on_hand += detail.quantityLocked
-        session.add(inventory_item)
-
-        session.delete(detail)
-
-    session.delete(item)
-    session.commit()
+    await session.run_sync(lambda s: run_with_retry(
+        s, lambda s: delete_order(item_id, s)))
     return {"ok": True}
 
 
 @router.post("/{item_id}/updateStatus", response_model=ProductionOrder)
-def update_status(
+async def update_status(
     item_id: int,
     payload: StatusUpdateRequest,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_current_user),
 ):
-    valid_statuses = ["Planned", "In Progress", "Completed"]
-    if payload.new_status not in valid_statuses:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid status: {payload.new_status}. Valid statuses are: {valid_statuses}"
-        )
-
-    item = session.get(ProductionOrder, item_id)
-    if not item:
-        raise HTTPException(status_code=404, detail="Not found")
-
-    # check if status can be updated Planned -> In Progress -> Completed
-    if item.status == "Completed":
-        raise HTTPException(
-            status_code=400, detail="Production order is already completed")
-    if item.status == "In Progress" and payload.new_status == "Planned":
-        raise HTTPException(
-            status_code=400, detail="Cannot revert status from In Progress to Planned")
-    if item.status == "Planned" and payload.new_status == "Completed":
-        raise HTTPException(
-            status_code=400, detail="Cannot complete a production order that is still planned")
-    if item.status == payload.new_status:
-        raise HTTPException(
-            status_code=400, detail=f"Production order is already in status: {payload.new_status}")
-
-    # update sub-orders
-    sub_orders = session.query(ProductionOrder).filter(
-        ProductionOrder.parentProductionOrderDetailsID == item_id).all()
-    for sub_order in sub_orders:
-        update_production_order_status_backend(
-            sub_order.ID, payload.new_status, session)
-
-    item.status = payload.new_status
-    session.add(item)
-    session.commit()
-    session.refresh(item)
-
-    return item
+    return await session.run_sync(lambda s: run_with_retry(
+        s, lambda s: update_production_order_status_backend(item_id, payload.new_status, s)))
 
 
 @router.get("/{item_id}/details", response_model=list[ProductionOrderDetails])
-def read_details(item_id: int, session: Session = Depends(get_session)):
+async def read_details(item_id: int, session: AsyncSession = Depends(get_async_session)):
     statement = select(ProductionOrderDetails).where(
         ProductionOrderDetails.productionOrderID == item_id)
-    results = session.exec(statement).all()
+    results = (await session.exec(statement)).all()
     return results
@@ -1,76 +1,97 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlmodel import Session, select
-from models import User, ProductionOrderDetails, ProductionOrder
-from database import get_session
+from models import ProductionOrderDetails, ProductionOrder
+from database import get_async_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from pagination import paginate_response, projected, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from export import export_response
 from typing import Optional
-from auth import get_current_user
+from auth import Principal, get_current_user
 
 router = APIRouter()
 
 
 @router.post("/", response_model=ProductionOrderDetails)
-def create_productionOrderDetails(
+async def create_productionOrderDetails(
     item: ProductionOrderDetails,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_current_user),
 ):
     session.add(item)
-    session.commit()
-    session.refresh(item)
+    await session.commit()
+    await session.refresh(item)
     return item
 
 
-@router.get("/", response_model=list[ProductionOrderDetails])
-def read_all(
+@router.get("/", **projected({"ID": 1, "productionOrderID": 1, "quantityLocked": 4}))
+async def read_all(
+    response: Response,
+    fields: Optional[str] = Query(
+        None, description="Comma-separated list of fields to include"),
     status: Optional[str] = Query(default=None),
-    session: Session = Depends(get_session)
+    productID: Optional[int] = Query(default=None),
+    productionOrderID: Optional[int] = Query(default=None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(
+        None, description="Cursor returned in the X-Next-Cursor header"),
+    session: AsyncSession = Depends(get_async_session)
 ):
-    query = select(ProductionOrderDetails).join(
-        ProductionOrder,
-        ProductionOrder.ID == ProductionOrderDetails.productionOrderID
-    )
-
+    where = []
     if status:
-        query = query.where(ProductionOrder.status == status)
+        where.append(ProductionOrder.status == status)
+    if productID is not None:
+        where.append(ProductionOrderDetails.productID == productID)
+    if productionOrderID is not None:
+        where.append(
+            ProductionOrderDetails.productionOrderID == productionOrderID)
+
+    return await paginate_response(
+        session, ProductionOrderDetails, response, fields=fields, where=where,
+        join=(ProductionOrder,
+              ProductionOrder.ID == ProductionOrderDetails.productionOrderID),
+        limit=limit, after=after)
+
 
-    return session.exec(query).all()
+@router.get("/export")
+async def export(format: str = Query("ndjson", description="ndjson or csv")):
+    return export_response(ProductionOrderDetails, format)
 
 
 @router.get("/{item_id}", response_model=ProductionOrderDetails)
-def read_one(item_id: int, session: Session = Depends(get_session)):
-    item = session.get(ProductionOrderDetails, item_id)
+async def read_one(item_id: int, session: AsyncSession = Depends(get_async_session)):
+    item = await session.get(ProductionOrderDetails, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Not found")
     return item
 
 
 @router.put("/{item_id}", response_model=ProductionOrderDetails)
-def update(
+async def update(
         item_id: int,
         new_data: ProductionOrderDetails,
-        session: Session = Depends(get_session),
-        current_user: User = Depends(get_current_user),
+        session: AsyncSession = Depends(get_async_session),
+        current_user: Principal = Depends(get_current_user),
 ):
-    item = session.get(ProductionOrderDetails, item_id)
+    item = await session.get(ProductionOrderDetails, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Not found")
-    for key, value in new_data.dict(exclude_unset=True).items():
+    for key, value in new_data.dict(exclude_unset=True, exclude={"version"}).items():
         setattr(item, key, value)
     session.add(item)
-    session.commit()
-    session.refresh(item)
+    await session.commit()
+    await session.refresh(item)
     return item
 
 
 @router.delete("/{item_id}")
-def delete(
+async def delete(
     item_id: int,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_current_user),
 ):
-    item = session.get(ProductionOrderDetails, item_id)
+    item = await session.get(ProductionOrderDetails, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Not found")
-    session.delete(item)
-    session.commit()
+    await session.delete(item)
+    await session.commit()
     return {"ok": True}
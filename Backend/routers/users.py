@@ -1,76 +1,100 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlmodel import select
 from models import User
-from database import get_session
-from security import hash_password, verify_password
-from auth import create_access_token, get_current_user
-from database import engine
+from database import get_async_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from pagination import paginate_response, projected, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from typing import Optional
+from security import hash_password_async, verify_password_async
+from auth import Principal, create_access_token, get_current_user, user_cache, users_version
 from fastapi.security import OAuth2PasswordRequestForm
 
 router = APIRouter()
 
 
 @router.post("/")
-def register(
+async def register(
     user: User,
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_current_user),
 ):
-    with Session(engine) as session:
-        user.password = hash_password(user.password)
-        session.add(user)
-        session.commit()
-        session.refresh(user)
-        return {"msg": "User registered"}
-
-
-@router.get("/", response_model=list[User])
-def read_all(
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    user.password = await hash_password_async(user.password)
+    session.add(user)
+    await session.commit()
+    return {"msg": "User registered"}
+
+
+@router.get("/", **projected({"ID": 1, "email": "mario.rossi@example.com"}))
+async def read_all(
+    response: Response,
+    fields: Optional[str] = Query(
+        None, description="Comma-separated list of fields to include"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(
+        None, description="Cursor returned in the X-Next-Cursor header"),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_current_user),
 ):
-    return session.exec(select(User)).all()
+    return await paginate_response(session, User, response, fields=fields,
+                                   limit=limit, after=after)
 
 
 @router.get("/me", response_model=User)
-def read_current_user(
-    current_user: User = Depends(get_current_user),
+async def read_current_user(
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_current_user),
 ):
-    return current_user
+    # La cache di auth tiene solo ID ed email
+    user = await session.get(User, current_user.ID)
+    if not user:
+        raise HTTPException(status_code=404, detail="Not found")
+    return user
+
+
+@router.get("/auth-cache")
+async def read_auth_cache_stats(
+    current_user: Principal = Depends(get_current_user),
+):
+    return user_cache.stats()
 
 
 @router.get("/{item_id}", response_model=User)
-def read_one(
+async def read_one(
     item_id: int,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_current_user),
 ):
-    item = session.get(User, item_id)
+    item = await session.get(User, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Not found")
     return item
 
 
 @router.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    session: AsyncSession = Depends(get_async_session),
+):
     email = form_data.username  # sì, si chiama username anche se usi l'email
     password = form_data.password
-    with Session(engine) as session:
-        statement = select(User).where(User.email == email)
-        user = session.exec(statement).first()
-        if not user or not verify_password(password, user.password):
-            raise HTTPException(status_code=400, detail="Invalid credentials")
-        token = create_access_token(data={"sub": user.email})
-        return {"access_token": token, "token_type": "bearer"}
+    version = await users_version(session)
+    statement = select(User).where(User.email == email)
+    user = (await session.exec(statement)).first()
+    if not user or not await verify_password_async(password, user.password):
+        raise HTTPException(status_code=400, detail="Invalid credentials")
+    token = create_access_token(data={"sub": user.email, "uid": user.ID})
+    user_cache.put(user.email, user, version)
+    return {"access_token": token, "token_type": "bearer"}
 
 
 @router.put("/{item_id}", response_model=User)
-def update(
+async def update(
     item_id: int,
     new_data: User,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_current_user),
 ):
-    item = session.get(User, item_id)
+    item = await session.get(User, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -81,25 +105,25 @@ def update(
     update_data = new_data.dict(exclude_unset=True)
 
     if "password" in update_data and update_data["password"]:
-        update_data["password"] = hash_password(update_data["password"])
+        update_data["password"] = await hash_password_async(update_data["password"])
 
     for key, value in update_data.items():
         setattr(item, key, value)
 
     session.add(item)
-    session.commit()
-    session.refresh(item)
+    await session.commit()
+    await session.refresh(item)
     return item
 
 @router.delete("/{item_id}")
-def delete(
+async def delete(
     item_id: int,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_current_user),
 ):
-    item = session.get(User, item_id)
+    item = await session.get(User, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Not found")
-    session.delete(item)
-    session.commit()
+    await session.delete(item)
+    await session.commit()
     return {"ok": True}
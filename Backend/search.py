@@ -0,0 +1,117 @@
+import re
+from typing import List
+
+from sqlalchemy import inspect, or_, select, text
+from sqlmodel import Session
+
+from models import Inventory
+
+# Ricerca articoli: indice FTS5 su code, category e datas. È una tabella
+# "external content" (i testi restano in inventory) tenuta allineata dai
+# trigger, quindi valgono anche gli UPDATE Core e gli import massivi; gli
+# UPDATE delle sole quantità non toccano l'indice.
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+FTS_TABLE = "inventory_fts"
+# Righe candidate classificate per ricerca, oltre a quelle trovate nel codice
+RANK_CANDIDATES = 200
+# Il codice pesa più della categoria, la categoria più degli attributi
+WEIGHTS = {"code": 10, "category": 2, "datas": 1}
+TOKEN_RE = re.compile(r"\w+")
+
+DDL = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        code, category, datas, content='inventory', content_rowid='ID', prefix='1 2 3')""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON inventory BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, code, category, datas)
+        VALUES (new.ID, new.code, new.category, new.datas);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON inventory BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, code, category, datas)
+        VALUES ('delete', old.ID, old.code, old.category, old.datas);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF code, category, datas ON inventory BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, code, category, datas)
+        VALUES ('delete', old.ID, old.code, old.category, old.datas);
+        INSERT INTO {FTS_TABLE}(rowid, code, category, datas)
+        VALUES (new.ID, new.code, new.category, new.datas);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+DROP = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def install(connection):
+    # Idempotente: crea indice e trigger e indicizza le righe già presenti.
+    # Solo SQLite; sugli altri database find() usa LIKE.
+    if connection.dialect.name != "sqlite" or inspect(connection).has_table(FTS_TABLE):
+        return
+    for statement in DDL:
+        connection.execute(text(statement))
+
+
+def uninstall(connection):
+    for statement in DROP:
+        connection.execute(text(statement))
+
+
+def match_query(q: str) -> str:
+    # Ogni parola diventa un prefisso tra virgolette: la sintassi FTS5
+    # (AND, NEAR, colonne...) nel testo dell'utente non viene interpretata
+    terms = ['"{}"*'.format(term.replace('"', '""')) for term in q.split()]
+    return " ".join(terms)
+
+
+def _score(row: dict, prefixes: List[str]) -> int:
+    score = 0
+    for prefix in prefixes:
+        score += max((weight for field, weight in WEIGHTS.items()
+                      if any(token.startswith(prefix) for token in TOKEN_RE.findall((row[field] or "").lower()))),
+                     default=0)
+    return score
+
+
+def find(session: Session, q: str, limit: int = SEARCH_LIMIT) -> List[dict]:
+    columns = [getattr(Inventory, f) for f in Inventory.__fields__]
+    connection = session.connection()
+
+    # Il codice esatto (scansione) va sempre per primo: l'indice unico lo trova subito
+    exact = [dict(row._mapping) for row in connection.execute(
+        select(*columns).where(Inventory.code == q.strip()))]
+
+    if connection.dialect.name == "sqlite":
+        terms = match_query(q)
+        if not terms:
+            return exact
+        # bm25 calcola le frequenze su tutte le righe che corrispondono (centinaia
+        # di ms per un prefisso di una lettera su 1M articoli): FTS5 restituisce
+        # invece i candidati in streaming, prima quelli che corrispondono nel
+        # codice (digitazione di un codice: una sola parola), e la classifica si
+        # fa qui sui soli candidati
+        candidates = text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :terms LIMIT :limit")
+        ids = set()
+        if len(q.split()) == 1:
+            ids.update(connection.execute(candidates, {"terms": f"{{code}} : {terms}", "limit": limit}).scalars())
+        ids.update(connection.execute(candidates, {"terms": terms, "limit": RANK_CANDIDATES}).scalars())
+        query = select(*columns).where(Inventory.ID.in_(ids))
+    else:
+        clauses = []
+        for term in q.split():
+            pattern = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            clauses.append(or_(Inventory.code.ilike(f"{pattern}%", escape="\\"),
+                               Inventory.category.ilike(f"{pattern}%", escape="\\"),
+                               Inventory.datas.ilike(f"%{pattern}%", escape="\\")))
+        query = select(*columns).where(*clauses).order_by(Inventory.code).limit(RANK_CANDIDATES)
+
+    prefixes = TOKEN_RE.findall(q.lower())
+    exclude = {row["ID"] for row in exact}
+    rows = [dict(row._mapping) for row in connection.execute(query) if row.ID not in exclude]
+    rows.sort(key=lambda row: (-_score(row, prefixes), row["code"]))
+    return (exact + rows)[:limit]
@@ -1,9 +1,60 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt è CPU-bound (~250ms a hash con 12 round): gira in un pool di processi
+# dedicato così non blocca l'event loop né il threadpool di FastAPI
+BCRYPT_ROUNDS = int(os.environ.get("LITEERP_BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.environ.get(
+    "LITEERP_PASSWORD_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+_password_pool = None
+
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
+
+
+def _start_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def password_pool() -> ProcessPoolExecutor:
+    global _password_pool
+    if _password_pool is None:
+        # Il processo è già multi-thread (aiosqlite, to_thread, audit): un
+        # fork potrebbe ereditare lock presi e bloccarsi. forkserver avvia i
+        # worker da un processo pulito; dove non esiste (Windows) si usa
+        # spawn, che è comunque il default della piattaforma.
+        _password_pool = ProcessPoolExecutor(
+            max_workers=PASSWORD_WORKERS, mp_context=_start_context())
+    return _password_pool
+
+
+def shutdown_password_pool():
+    global _password_pool
+    if _password_pool is not None:
+        _password_pool.shutdown(cancel_futures=True)
+        _password_pool = None
+
+
+async def hash_password_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_pool(), hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        password_pool(), verify_password, plain_password, hashed_password)
+
@@ -0,0 +1,65 @@
+from typing import Callable, TypeVar
+
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm.exc import StaleDataError
+from sqlmodel import Session
+
+from models import Inventory
+import changes
+import ledger
+
+# Inventory, ProductionOrder e ProductionOrderDetails hanno una colonna
+# "version": un UPDATE su una riga modificata da un'altra transazione non
+# trova righe e solleva StaleDataError. In quel caso l'operazione viene
+# ripetuta da capo su dati freschi.
+MAX_ATTEMPTS = 5
+
+T = TypeVar("T")
+
+
+def _is_conflict(error: Exception) -> bool:
+    if isinstance(error, StaleDataError):
+        return True
+    # SQLite in WAL: snapshot superato da un altro writer
+    return isinstance(error, OperationalError) and "locked" in str(error.orig)
+
+
+def run_with_retry(session: Session, operation: Callable[[Session], T],
+                   attempts: int = MAX_ATTEMPTS) -> T:
+    for _ in range(attempts):
+        try:
+            return operation(session)
+        except (StaleDataError, OperationalError) as e:
+            if not _is_conflict(e):
+                raise
+            session.rollback()
+    raise HTTPException(
+        status_code=409, detail="Concurrent update on the same items, please retry")
+
+
+def remove_stock(session: Session, item_id: int, quantity: int) -> Inventory:
+    # Scarico atomico: il controllo della giacenza è nella stessa UPDATE
+    result = session.exec(
+        update(Inventory)
+        .where(Inventory.ID == item_id)
+        .where(Inventory.quantity_on_hand >= quantity)
+        .values(quantity_on_hand=Inventory.quantity_on_hand - quantity,
+                version=Inventory.version + 1)
+        .returning(Inventory.quantity_on_hand, Inventory.version)
+        .execution_options(synchronize_session=False)
+    )
+    row = result.first()
+    if row is None:
+        if session.get(Inventory, item_id) is None:
+            raise HTTPException(status_code=404, detail="Not found")
+        raise HTTPException(
+            status_code=400, detail="Not enough items in inventory")
+    ledger.record(session, item_id, "remove", on_hand_delta=-quantity)
+    changes.record(session, "inventory", item_id, "update",
+                   {"quantity_on_hand": row.quantity_on_hand}, row.version)
+    session.commit()
+    item = session.get(Inventory, item_id)
+    session.refresh(item)
+    return item
@@ -1,9 +1,10 @@
 // src/api/inventory.js
 import axios from 'axios';
+import { getAllPages } from './pagination';
 
 const API_URL = process.env.REACT_APP_API_URL; // Cambia se usi una porta diversa
 
-export const getInventory = () => axios.get(`${API_URL}/inventory/`);
+export const getInventory = () => getAllPages(`${API_URL}/inventory/`);
 export const createInventoryItem = (data) => axios.post(`${API_URL}/inventory/`, data);
 export const deleteInventoryItem = (id) => axios.delete(`${API_URL}/inventory/${id}`);
 export const getInventoryItem = (id) => axios.get(`${API_URL}/inventory/${id}`);
@@ -11,11 +12,27 @@ export const updateInventoryItem = (id, data) => axios.put(`${API_URL}/inventory
 export const addToInventory = (id, quantity) => axios.post(`${API_URL}/inventory/${id}/add/`, { quantity });
 export const addToInventoryByCode = (code, quantity) => axios.post(`${API_URL}/inventory/${code}/addbycode/`, { quantity });
 export const removeFromInventory = (id, quantity) => axios.post(`${API_URL}/inventory/${id}/remove/`, { quantity });
+// Ricerca per prefisso su codice, categoria e attributi (typeahead)
+export const searchInventory = (q, limit = 20) => axios.get(`${API_URL}/inventory/search`, { params: { q, limit } });
+// CSV o XLSX: risponde con il report per riga (created, updated, errors...)
+export const importInventory = (file) => {
+  const data = new FormData();
+  data.append('file', file);
+  return axios.post(`${API_URL}/inventory/import`, data);
+};
+export const uploadImage = (file) => {
+  const data = new FormData();
+  data.append('file', file);
+  return axios.post(`${API_URL}/images/`, data);
+};
+// Inventory.image contiene l'hash dell'immagine caricata
+export const imageUrl = (image, size) => {
+  if (!image || image.startsWith('data:')) return image;
+  return size ? `${API_URL}/images/${image}/thumbnail?size=${size}` : `${API_URL}/images/${image}`;
+};
 export const getInventoryLight = () => {
-  const response = axios.get(`${API_URL}/inventory/`, {
-    params: {
-      fields: 'ID,code,category'
-    }
+  const response = getAllPages(`${API_URL}/inventory/`, {
+    fields: 'ID,code,category'
   });
   return response;
 };
\ No newline at end of file
@@ -0,0 +1,19 @@
+// src/api/pagination.js
+import axios from 'axios';
+
+// Pagina massima accettata dal backend (pagination.MAX_PAGE_SIZE)
+const PAGE_SIZE = 1000;
+
+// Le liste del backend sono paginate: segue X-Next-Cursor fino all'ultima
+// pagina e restituisce una risposta con tutte le righe in data
+export const getAllPages = async (url, params = {}) => {
+  const rows = [];
+  let after;
+  let response;
+  do {
+    response = await axios.get(url, { params: { ...params, limit: PAGE_SIZE, after } });
+    rows.push(...response.data);
+    after = response.headers['x-next-cursor'];
+  } while (after);
+  return { ...response, data: rows };
+};
@@ -1,9 +1,10 @@
 // src/api/producutionOrder.js
 import axios from 'axios';
+import { getAllPages } from './pagination';
 
 const API_URL = process.env.REACT_APP_API_URL; // Cambia se usi una porta diversa
 
-export const getProductionOrders = () => axios.get(`${API_URL}/orders/`);
+export const getProductionOrders = () => getAllPages(`${API_URL}/orders/`);
 export const getProductionOrder = (id) => axios.get(`${API_URL}/orders/${id}`);
 export const createProductionOrderItem = (data) => axios.post(`${API_URL}/orders/`, data);
 export const deleteProductionOrderItem = (id) => axios.delete(`${API_URL}/orders/${id}`);
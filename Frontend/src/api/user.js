@@ -1,8 +1,9 @@
 import axios from 'axios';
+import { getAllPages } from './pagination';
 
 const API_URL = process.env.REACT_APP_API_URL;
 
-export const getUsers = () => axios.get(`${API_URL}/users/`)
+export const getUsers = () => getAllPages(`${API_URL}/users/`)
 
 export const login = async (email, password) => {
   const params = new URLSearchParams();
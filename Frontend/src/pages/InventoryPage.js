@@ -13,7 +13,7 @@ import RemoveIcon from '@mui/icons-material/Remove';
 import SearchIcon from '@mui/icons-material/Search';
 import BarcodeReaderIcon from '@mui/icons-material/BarcodeReader';
 
-import { getInventory, deleteInventoryItem, addToInventory, removeFromInventory, createInventoryItem, updateInventoryItem } from '../api/inventory';
+import { getInventory, deleteInventoryItem, addToInventory, removeFromInventory, createInventoryItem, updateInventoryItem, uploadImage, imageUrl } from '../api/inventory';
 
 const InventoryPage = () => {
   const [confirmOpen, setConfirmOpen] = useState(false);
@@ -104,11 +104,13 @@ const InventoryPage = () => {
   const handleImageChange = (e) => {
     const file = e.target.files[0];
     if (file) {
-      const reader = new FileReader();
-      reader.onloadend = () => {
-        setFormData(prev => ({ ...prev, image: reader.result }));
-      };
-      reader.readAsDataURL(file);
+      uploadImage(file)
+        .then(res => {
+          setFormData(prev => ({ ...prev, image: res.data.hash }));
+        })
+        .catch(err => {
+          console.error('Error uploading image:', err);
+        });
     }
   };
 
@@ -220,7 +222,7 @@ const InventoryPage = () => {
                 {item.image && (
                   <Box
                     component="img"
-                    src={`${item.image}`}
+                    src={imageUrl(item.image, 256)}
                     alt={item.code}
                     sx={{ width: '100%', height: 180, objectFit: 'cover' }}
                   />
@@ -311,7 +313,7 @@ const InventoryPage = () => {
 
           {formData.image && (
             <Box sx={{ mb: 2 }}>
-              <img src={formData.image} alt="Preview" style={{ maxWidth: '200px' }} />
+              <img src={imageUrl(formData.image, 256)} alt="Preview" style={{ maxWidth: '200px' }} />
             </Box>
           )}
         </DialogContent>
@@ -9,7 +9,7 @@ import DeleteIcon from '@mui/icons-material/Delete';
 import VisibilityIcon from '@mui/icons-material/Visibility';
 
 import { getProductionOrders, createProductionOrderItem, deleteProductionOrderItem } from '../api/productionOrder';
-import { getInventory } from '../api/inventory';
+import { getInventory, imageUrl } from '../api/inventory';
 import { useNavigate } from 'react-router-dom';
 
 const ProductionOrdersPage = () => {
@@ -174,7 +174,7 @@ const ProductionOrdersPage = () => {
                     return item?.image ? (
                       <Box
                         component="img"
-                        src={item.image}
+                        src={imageUrl(item.image, 256)}
                         alt={item.code}
                         sx={{ width: '100%', height: 180, objectFit: 'cover', borderRadius: 1, mb: 1 }}
                       />
@@ -20,7 +20,7 @@ import {
   updateProductionOrderDetail, deleteProductionOrderDetail
 } from '../api/productionOrderDetail';
 
-import { getInventory } from '../api/inventory';
+import { getInventory, imageUrl } from '../api/inventory';
 import { getInventoryItem } from '../api/inventory';
 
 const ProductionOrderView = () => {
@@ -192,7 +192,7 @@ const ProductionOrderView = () => {
                   return item?.image ? (
                     <Box
                       component="img"
-                      src={item.image}
+                      src={imageUrl(item.image, 256)}
                       alt={item.code}
                       sx={{ width: '100%', height: 180, objectFit: 'cover', borderRadius: 1, mb: 1 }}
                     />